@@ -1,7 +1,8 @@
 import asyncio
 import json
 import logging
-from collections.abc import AsyncIterator
+from collections.abc import AsyncGenerator, AsyncIterator
+from contextlib import aclosing
 from typing import Any, Literal, cast
 from uuid import UUID
 
@@ -56,7 +57,14 @@ from app.services.exceptions import (
 )
 from app.services.permission_manager import PermissionManager
 from app.services.queue import QueueService
-from app.utils.redis import redis_connection, redis_pubsub
+from app.services.streaming.hub import (
+    CANCELLED_STREAM_EVENT,
+    TERMINAL_STREAM_EVENTS,
+    coalesce_stream_entries,
+    read_stream_pages,
+    stream_hub,
+)
+from app.utils.redis import redis_connection
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -80,153 +88,53 @@ async def _ensure_chat_access(
         )
 
 
-async def _monitor_stream_cancellation(
-    chat_id: UUID, cancel_event: asyncio.Event, redis: "Redis[str]"
-) -> None:
-    try:
-        async with redis_pubsub(
-            redis, REDIS_KEY_CHAT_CANCEL.format(chat_id=chat_id)
-        ) as pubsub:
-            while True:
-                message = await pubsub.get_message(
-                    ignore_subscribe_messages=True, timeout=1.0
-                )
-                if message and message.get("type") == "message":
-                    logger.info("Stream cancellation received for chat %s", chat_id)
-                    cancel_event.set()
-                    break
-    except asyncio.CancelledError:
-        logger.debug("Cancellation monitor task cancelled for chat %s", chat_id)
-        raise
-    except Exception as e:
-        logger.error(
-            "Error monitoring cancellation for chat %s: %s", chat_id, e, exc_info=True
-        )
-
-
 async def _replay_stream_backlog(
-    redis: "Redis[str]", stream_name: str, min_id: str
-) -> AsyncIterator[dict[str, Any]]:
+    redis: "Redis[str]", stream_name: str, last_event_id: str | None
+) -> AsyncGenerator[list[dict[str, Any]], None]:
     # Replays missed events from Redis stream for SSE reconnection support.
-    # When a client reconnects with Last-Event-ID, this fetches all events since that ID.
-    # XRANGE returns entries between min and max IDs (inclusive). "+" means latest entry.
+    # When a client reconnects with Last-Event-ID, this fetches all events since that ID,
+    # one XRANGE page at a time; without it the whole stream is replayed.
     try:
-        backlog = await redis.xrange(stream_name, min=min_id, max="+")
+        async with aclosing(
+            read_stream_pages(redis, stream_name, last_event_id)
+        ) as pages:
+            async for page in pages:
+                yield page
     except Exception as e:
         logger.warning("Failed to replay stream backlog from %s: %s", stream_name, e)
-        backlog = []
-
-    for entry_id, fields in backlog:
-        formatted = {
-            "id": entry_id,
-            "event": fields.get("kind", "content"),
-            "data": fields.get("payload", "") or "",
-        }
-        yield formatted
-        if formatted["event"] in {"complete", "error"}:
-            return
-
-
-async def _stream_live_redis_events(
-    redis: "Redis[str]",
-    stream_name: str,
-    chat_id: UUID,
-    last_id: str,
-    cancel_event: asyncio.Event,
-) -> AsyncIterator[dict[str, Any]]:
-    # Polls Redis stream for new events using XREAD with 5s blocking timeout.
-    # Checks cancellation flag before each poll to enable responsive stream termination.
-    if (
-        await redis.get(REDIS_KEY_CHAT_REVOKED.format(chat_id=chat_id))
-        or cancel_event.is_set()
-    ):
-        logger.info("Stream already cancelled for chat %s", chat_id)
-        yield {
-            "event": "complete",
-            "data": json.dumps({"status": "cancelled"}),
-        }
-        return
-
-    while True:
-        if cancel_event.is_set():
-            logger.info("Stream cancelled for chat %s", chat_id)
-            yield {
-                "event": "complete",
-                "data": json.dumps({"status": "cancelled"}),
-            }
-            return
-
-        try:
-            # XREAD blocks up to 1s waiting for new entries after last_id.
-            # Returns immediately if new data arrives, or empty after timeout.
-            response = await redis.xread(
-                {stream_name: last_id},
-                block=1000,
-                count=10,
-            )
-        except Exception as e:
-            logger.debug("Redis xread error, retrying: %s", e)
-            await asyncio.sleep(0.5)
-            continue
-
-        if not response:
-            continue
-
-        _, messages = response[0]
-        for entry_id, fields in messages:
-            if entry_id == last_id:
-                continue
-
-            formatted = {
-                "id": entry_id,
-                "event": fields.get("kind", "content"),
-                "data": fields.get("payload", "") or "",
-            }
-            yield formatted
-            last_id = entry_id
-
-            if formatted["event"] in {"complete", "error"}:
-                return
 
 
 async def _create_event_stream(
-    chat_id: UUID, last_event_id: str | None
+    chat_id: UUID, last_event_id: str | None, coalesce: bool = False
 ) -> AsyncIterator[dict[str, Any]]:
-    # Two-phase SSE streaming: first replays any missed events (backlog), then switches
-    # to live polling. A concurrent monitor task watches for cancellation requests.
+    # Two-phase SSE streaming: first replays any missed events (backlog), then
+    # subscribes to the process-wide stream hub, which shares one XREAD cursor and
+    # one cancellation subscription between all local viewers of the chat.
     try:
         async with redis_connection() as redis:
             stream_name = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
-            min_id = f"({last_event_id})" if last_event_id else "-"
             last_id = last_event_id
 
-            async for item in _replay_stream_backlog(redis, stream_name, min_id):
-                yield item
-                last_id = item["id"]
-                if item.get("event") in {"complete", "error"}:
-                    return
-
-            if not last_id:
-                last_id = "0-0"
-
-            cancel_event = asyncio.Event()
-            monitor_task = asyncio.create_task(
-                _monitor_stream_cancellation(chat_id, cancel_event, redis)
-            )
+            async with aclosing(
+                _replay_stream_backlog(redis, stream_name, last_event_id)
+            ) as pages:
+                async for page in pages:
+                    for item in coalesce_stream_entries(page) if coalesce else page:
+                        yield item
+                        last_id = item["id"]
+                        if item["event"] in TERMINAL_STREAM_EVENTS:
+                            return
+
+            if await redis.get(REDIS_KEY_CHAT_REVOKED.format(chat_id=chat_id)):
+                logger.info("Stream already cancelled for chat %s", chat_id)
+                yield dict(CANCELLED_STREAM_EVENT)
+                return
 
-            try:
-                async for event in _stream_live_redis_events(
-                    redis, stream_name, chat_id, last_id, cancel_event
-                ):
-                    yield event
-                    if event.get("event") in {"complete", "error"}:
-                        return
-            finally:
-                monitor_task.cancel()
-                try:
-                    await monitor_task
-                except asyncio.CancelledError:
-                    pass
+        async with aclosing(
+            stream_hub.subscribe(str(chat_id), last_id or "0-0", coalesce=coalesce)
+        ) as live_events:
+            async for event in live_events:
+                yield event
 
     except Exception as exc:
         logger.error(
@@ -502,6 +410,7 @@ async def fork_chat(
 async def stream_events(
     chat_id: UUID,
     request: Request,
+    coalesce: bool = False,
     current_user: User = Depends(get_current_user),
     chat_service: ChatService = Depends(get_chat_service),
 ) -> EventSourceResponse:
@@ -512,7 +421,7 @@ async def stream_events(
     )
 
     return EventSourceResponse(
-        _create_event_stream(chat_id, last_event_id),
+        _create_event_stream(chat_id, last_event_id, coalesce),
         headers={
             "Cache-Control": "no-cache",
             "Connection": "keep-alive",
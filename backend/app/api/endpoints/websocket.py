@@ -20,7 +20,8 @@ from app.services.exceptions import UserException
 from app.services.sandbox import SandboxService
 from app.services.sandbox_providers import (
     SandboxProviderType,
-    create_sandbox_provider,
+    get_sandbox_provider,
+    sandbox_api_key,
 )
 from app.services.user import UserService
 from app.utils.queue import drain_queue, put_with_overflow
@@ -232,13 +233,8 @@ async def terminal_websocket(
         )
         return
 
-    api_key = None
-    if provider_type == SandboxProviderType.E2B:
-        api_key = e2b_api_key
-    elif provider_type == SandboxProviderType.MODAL:
-        api_key = modal_api_key
-
-    provider = create_sandbox_provider(provider_type, api_key)
+    api_key = sandbox_api_key(provider_type, e2b_api_key, modal_api_key)
+    provider = get_sandbox_provider(provider_type, api_key)
 
     sandbox_service = SandboxService(provider)
     session = TerminalSession(sandbox_service, sandbox_id, websocket)
@@ -14,7 +14,10 @@ REDIS_KEY_PERMISSION_RESPONSE: Final[str] = "permission_response:{request_id}"
 REDIS_KEY_USER_SETTINGS: Final[str] = "user_settings:{user_id}"
 REDIS_KEY_MODELS_LIST: Final[str] = "models:list:{active_only}"
 REDIS_KEY_CHAT_CONTEXT_USAGE: Final[str] = "chat:{chat_id}:context_usage"
+REDIS_KEY_CHAT_CONTEXT_RECONCILED: Final[str] = "chat:{chat_id}:context_reconciled"
 REDIS_KEY_CHAT_QUEUE: Final[str] = "chat:{chat_id}:queue"
+REDIS_KEY_CHAT_CLI_SESSION: Final[str] = "chat:{chat_id}:cli_session"
+REDIS_KEY_SANDBOX_SECRETS: Final[str] = "sandbox:{sandbox_id}:secrets"
 
 QUEUE_MESSAGE_TTL_SECONDS: Final[int] = 3600
 
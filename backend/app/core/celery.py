@@ -3,10 +3,13 @@ import logging
 from typing import Any
 
 from celery import Celery
+from celery.signals import worker_init, worker_process_init, worker_shutdown
+from prometheus_client import start_http_server
 from redis.asyncio import Redis
 
 from app.constants import REDIS_KEY_CHAT_STREAM
 from app.core.config import get_settings
+from app.utils.redis import reset_redis_pools
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -43,9 +46,39 @@ celery_app.conf.beat_schedule = {
         "task": "cleanup_expired_refresh_tokens",
         "schedule": 86400.0,
     },
+    "sweep-orphaned-chat-streams": {
+        "task": "sweep_orphaned_chat_streams",
+        "schedule": settings.STREAM_SWEEP_INTERVAL_SECONDS,
+    },
 }
 
 
+@worker_process_init.connect
+def _reset_worker_redis_pools(**_: Any) -> None:
+    # Pools are bound to the loop that uses them, so they cannot be opened here;
+    # each child starts empty and creates its pool on the first task's loop
+    reset_redis_pools()
+
+
+@worker_init.connect
+def _start_worker_metrics_exporter(**_: Any) -> None:
+    if not settings.CELERY_METRICS_PORT:
+        return
+    start_http_server(settings.CELERY_METRICS_PORT)
+    logger.info("Serving worker metrics on port %s", settings.CELERY_METRICS_PORT)
+
+
+@worker_shutdown.connect
+def _stop_shared_worker_loop(**_: Any) -> None:
+    from app.core.worker_loop import worker_loop
+    from app.services.sandbox_providers.docker_connections import (
+        close_docker_connections,
+    )
+
+    worker_loop.shutdown(timeout=settings.CELERY_ASYNC_SHUTDOWN_GRACE_SECONDS)
+    close_docker_connections()
+
+
 class SSEEventPublisher:
     def __init__(self, redis_client: "Redis[str]"):
         self.redis = redis_client
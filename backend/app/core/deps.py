@@ -20,8 +20,8 @@ from app.services.refresh_token import RefreshTokenService
 from app.services.sandbox import SandboxService
 from app.services.sandbox_providers import (
     SandboxProviderType,
-    create_docker_config,
-    create_sandbox_provider,
+    get_sandbox_provider,
+    sandbox_api_key,
 )
 from app.services.scheduler import SchedulerService
 from app.services.marketplace import MarketplaceService
@@ -158,21 +158,13 @@ async def get_sandbox_service(
     if sandbox_provider:
         provider_type = SandboxProviderType(sandbox_provider)
 
-    api_key = None
-    if provider_type == SandboxProviderType.E2B:
-        api_key = e2b_api_key
-    elif provider_type == SandboxProviderType.MODAL:
-        api_key = modal_api_key
-
-    provider = create_sandbox_provider(
-        provider_type=provider_type,
-        api_key=api_key,
-        docker_config=create_docker_config(),
-    )
+    api_key = sandbox_api_key(provider_type, e2b_api_key, modal_api_key)
+    provider = get_sandbox_provider(provider_type=provider_type, api_key=api_key)
+    sandbox_service = SandboxService(provider)
     try:
-        yield SandboxService(provider)
+        yield sandbox_service
     finally:
-        await provider.cleanup()
+        await sandbox_service.cleanup()
 
 
 async def get_storage_service(
@@ -0,0 +1,88 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+STREAM_PUBLISH_FLUSH_SIZE = Histogram(
+    "claudex_stream_publish_flush_size",
+    "Number of stream entries written per pipelined XADD flush",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+STREAM_PUBLISH_FLUSH_SECONDS = Histogram(
+    "claudex_stream_publish_flush_seconds",
+    "Latency of a pipelined XADD flush",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0),
+)
+
+REDIS_POOL_CONNECTIONS_IN_USE = Gauge(
+    "claudex_redis_pool_connections_in_use",
+    "Redis connections currently checked out of the shared pools",
+)
+REDIS_POOL_CONNECTIONS_IDLE = Gauge(
+    "claudex_redis_pool_connections_idle",
+    "Open Redis connections idle in the shared pools",
+)
+REDIS_POOL_MAX_CONNECTIONS = Gauge(
+    "claudex_redis_pool_max_connections",
+    "Configured connection limit summed over the shared Redis pools",
+)
+
+CLI_TIME_TO_FIRST_EVENT_SECONDS = Histogram(
+    "claudex_cli_time_to_first_event_seconds",
+    "Time from starting a chat turn to the first stream event from the CLI",
+    ["session"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0, 34.0),
+)
+CLI_LAUNCH_PREPARE_SECONDS = Histogram(
+    "claudex_cli_launch_prepare_seconds",
+    "Time spent preparing a chat turn's CLI launch before spawning or reusing it",
+    ["profile"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+CLI_WARM_SESSIONS = Gauge(
+    "claudex_cli_warm_sessions",
+    "Claude CLI processes kept attached between turns in this process",
+)
+
+DOCKER_EXECUTOR_QUEUE_DEPTH = Gauge(
+    "claudex_docker_executor_queue_depth",
+    "Docker calls waiting for a thread in the shared executors",
+    ["pool"],
+)
+DOCKER_EXECUTOR_ACTIVE = Gauge(
+    "claudex_docker_executor_active",
+    "Docker calls currently running in the shared executors",
+    ["pool"],
+)
+
+SANDBOX_STDOUT_STALL_SECONDS = Histogram(
+    "claudex_sandbox_stdout_stall_seconds",
+    "Time CLI stdout spent above the buffer's high watermark before draining",
+    ["transport"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+SANDBOX_STDOUT_CHUNK_LATENCY_SECONDS = Histogram(
+    "claudex_sandbox_stdout_chunk_latency_seconds",
+    "Time from a CLI stdout chunk arriving from the sandbox to the parser taking it",
+    ["transport"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0),
+)
+SANDBOX_STDOUT_BUFFERED_BYTES = Gauge(
+    "claudex_sandbox_stdout_buffered_bytes",
+    "CLI stdout read from sandboxes but not yet consumed downstream",
+    ["transport"],
+)
+
+SANDBOX_POOL_CHECKOUTS = Counter(
+    "claudex_sandbox_pool_checkouts_total",
+    "New chats served from the warm sandbox pool (hit) or without one (miss)",
+    ["provider", "result"],
+)
+SANDBOX_POOL_READY = Gauge(
+    "claudex_sandbox_pool_ready",
+    "Warm sandboxes waiting in the pool",
+    ["provider"],
+)
+SANDBOX_TIME_TO_READY_SECONDS = Histogram(
+    "claudex_sandbox_time_to_ready_seconds",
+    "Time for a new chat to get an initialized sandbox, from the pool or created",
+    ["provider", "source"],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0),
+)
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections.abc import Awaitable, Callable, Coroutine
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from app.core.config import get_settings
+from app.utils.redis import close_redis_pool
+
+if TYPE_CHECKING:
+    from celery import Task
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+class BoundTask:
+    # Celery keeps the current request on a thread-local stack, which is empty on
+    # the shared loop thread. Coroutines scheduled there get this wrapper so
+    # task.request.id and update_state() still refer to the originating task.
+    def __init__(self, task: Task[Any, Any]) -> None:
+        self._task = task
+        self.request = task.request
+
+    def update_state(
+        self,
+        task_id: str | None = None,
+        state: str | None = None,
+        meta: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> None:
+        self._task.update_state(
+            task_id=task_id or self.request.id, state=state, meta=meta, **kwargs
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._task, name)
+
+
+class SharedWorkerLoop:
+    # One long-lived event loop per worker process, running in a daemon thread.
+    # Celery pool threads hand their coroutine over and block on the result, so
+    # acks_late still acks only when the stream has finished, while every
+    # stream's I/O (Redis pool, DB engine, sandbox transports) shares one loop.
+    # At most CELERY_ASYNC_CONCURRENCY coroutines run at once; the rest queue.
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._tasks: set[asyncio.Task[Any]] = set()
+        self._shutdown_hooks: list[Callable[[], Awaitable[None]]] = []
+        self._lock = threading.Lock()
+
+    def _ensure_started(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                # Started lazily so forked pool children never inherit the thread
+                loop = asyncio.new_event_loop()
+                self._semaphore = asyncio.Semaphore(
+                    max(settings.CELERY_ASYNC_CONCURRENCY, 1)
+                )
+                self._thread = threading.Thread(
+                    target=self._run_forever,
+                    args=(loop,),
+                    name="celery-async-loop",
+                    daemon=True,
+                )
+                self._loop = loop
+                self._thread.start()
+            return self._loop
+
+    @staticmethod
+    def _run_forever(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    async def _run_limited(self, coro: Coroutine[Any, Any, T]) -> T:
+        assert self._semaphore is not None
+        current = asyncio.current_task()
+        if current is not None:
+            self._tasks.add(current)
+        try:
+            async with self._semaphore:
+                return await coro
+        finally:
+            if current is not None:
+                self._tasks.discard(current)
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        loop = self._ensure_started()
+        future: Future[T] = asyncio.run_coroutine_threadsafe(
+            self._run_limited(coro), loop
+        )
+        try:
+            return future.result()
+        except BaseException:
+            # Worker shutdown or a revoked task interrupting the waiting thread
+            future.cancel()
+            raise
+
+    @property
+    def active_count(self) -> int:
+        return len(self._tasks)
+
+    def is_current(self) -> bool:
+        # True when called from a coroutine running on the shared loop
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def add_shutdown_hook(self, hook: Callable[[], Awaitable[None]]) -> None:
+        # Awaited on the loop after running tasks have drained
+        if hook not in self._shutdown_hooks:
+            self._shutdown_hooks.append(hook)
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None or loop.is_closed():
+            return
+
+        async def drain() -> None:
+            pending = set(self._tasks)
+            if pending:
+                _, still_running = await asyncio.wait(pending, timeout=timeout)
+                for task in still_running:
+                    task.cancel()
+                if still_running:
+                    logger.warning(
+                        "Cancelled %d chat tasks still running at shutdown",
+                        len(still_running),
+                    )
+                    await asyncio.gather(*still_running, return_exceptions=True)
+            for hook in self._shutdown_hooks:
+                try:
+                    await hook()
+                except Exception as exc:
+                    logger.warning("Worker loop shutdown hook failed: %s", exc)
+            await close_redis_pool()
+
+        try:
+            asyncio.run_coroutine_threadsafe(drain(), loop).result()
+        except Exception as exc:
+            logger.warning("Error draining shared worker loop: %s", exc)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout=5)
+        if not loop.is_running():
+            loop.close()
+
+
+worker_loop = SharedWorkerLoop()
+
+
+def bind_task(task: Task[Any, Any]) -> Task[Any, Any]:
+    if settings.CELERY_ASYNC_POOL:
+        return BoundTask(task)
+    return task
+
+
+def run_in_worker_loop(coro: Coroutine[Any, Any, T]) -> T:
+    # CELERY_ASYNC_POOL runs the coroutine on the process-wide loop; otherwise
+    # it gets a private loop for the duration of the task, as before.
+    if settings.CELERY_ASYNC_POOL:
+        return worker_loop.run(coro)
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.run_until_complete(close_redis_pool())
+        loop.close()
@@ -1,2 +1,9 @@
 from app.db.base_class import Base  # noqa
-from app.models.db_models import User, Chat, Message, MessageAttachment, UserSettings  # noqa
+from app.models.db_models import (  # noqa
+    User,
+    Chat,
+    Message,
+    MessageAttachment,
+    MessageEvent,
+    UserSettings,
+)
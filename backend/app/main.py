@@ -1,6 +1,7 @@
+import asyncio
 import logging
 from collections.abc import AsyncIterator
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -28,6 +29,13 @@ from app.core.middleware import (
     setup_middleware,
 )
 from app.db.session import engine, celery_engine, SessionLocal
+from app.services.sandbox_providers.docker_connections import (
+    close_docker_connections,
+)
+from app.services.sandbox_pool import sandbox_pools
+from app.services.sandbox_providers import provider_registry
+from app.services.streaming.hub import stream_hub
+from app.utils.redis import close_redis_pool, get_redis_pool
 from app.admin.config import create_admin
 from app.admin.views import (
     UserAdmin,
@@ -45,9 +53,19 @@ settings = get_settings()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    get_redis_pool()
+    pool_sweep = asyncio.create_task(sandbox_pools.sweep())
     yield
+    pool_sweep.cancel()
+    with suppress(asyncio.CancelledError):
+        await pool_sweep
+    await stream_hub.close()
+    await sandbox_pools.close_all()
+    await provider_registry.close_all()
+    await close_redis_pool()
     await engine.dispose()
     await celery_engine.dispose()
+    close_docker_connections()
 
 
 def create_application() -> FastAPI:
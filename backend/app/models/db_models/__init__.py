@@ -6,7 +6,7 @@ from .enums import (
     TaskExecutionStatus,
     TaskStatus,
 )
-from .chat import Chat, Message, MessageAttachment
+from .chat import Chat, Message, MessageAttachment, MessageEvent
 from .refresh_token import RefreshToken
 from .scheduled_tasks import ScheduledTask, TaskExecution
 from .user import User, UserSettings
@@ -21,6 +21,7 @@ __all__ = [
     "Chat",
     "Message",
     "MessageAttachment",
+    "MessageEvent",
     "RefreshToken",
     "ScheduledTask",
     "TaskExecution",
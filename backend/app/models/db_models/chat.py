@@ -2,7 +2,15 @@ import uuid
 from datetime import datetime
 from uuid import UUID
 
-from sqlalchemy import DateTime, Float, ForeignKey, Index, Integer, String
+from sqlalchemy import (
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    UniqueConstraint,
+)
 from sqlalchemy import Enum as SQLAlchemyEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -84,6 +92,9 @@ class Message(Base):
     attachments = relationship(
         "MessageAttachment", back_populates="message", cascade="all, delete-orphan"
     )
+    event_segments = relationship(
+        "MessageEvent", back_populates="message", cascade="all, delete-orphan"
+    )
 
     __table_args__ = (
         Index("idx_messages_chat_id_created_at", "chat_id", "created_at"),
@@ -118,3 +129,26 @@ class MessageAttachment(Base):
     filename: Mapped[str | None] = mapped_column(String, nullable=True)
 
     message = relationship("Message", back_populates="attachments")
+
+
+class MessageEvent(Base):
+    # Append-only segment of an assistant message's event log. Each row holds a
+    # JSON array of consecutive stream events; concatenating segments ordered by
+    # seq yields the full log that is materialized into Message.content.
+    __tablename__ = "message_events"
+
+    id: Mapped[UUID] = mapped_column(GUID(), primary_key=True, default=uuid.uuid4)
+    message_id: Mapped[UUID] = mapped_column(
+        GUID(),
+        ForeignKey("messages.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    event_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    events: Mapped[str] = mapped_column(String, nullable=False)
+
+    message = relationship("Message", back_populates="event_segments")
+
+    __table_args__ = (
+        UniqueConstraint("message_id", "seq", name="uq_message_events_message_seq"),
+    )
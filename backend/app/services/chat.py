@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import math
+import time
 from datetime import datetime, timezone
 from typing import cast
 from uuid import UUID
@@ -11,6 +12,7 @@ from sqlalchemy.orm import selectinload
 
 from app.constants import REDIS_KEY_CHAT_TASK
 from app.core.config import get_settings
+from app.core.metrics import SANDBOX_TIME_TO_READY_SECONDS
 from app.models.db_models import (
     Chat,
     Message,
@@ -37,10 +39,11 @@ from app.services.claude_agent import ClaudeAgentService
 from app.services.exceptions import ChatException, ErrorCode
 from app.services.message import MessageService
 from app.services.sandbox import SandboxService
+from app.services.sandbox_pool import sandbox_pools
 from app.services.sandbox_providers import (
-    DockerConfig,
-    LocalDockerProvider,
     SandboxProviderType,
+    get_sandbox_provider,
+    sandbox_api_key,
 )
 from app.services.storage import StorageService
 from app.services.user import UserService
@@ -122,7 +125,18 @@ class ChatService(BaseDbService[Chat]):
         )
         self._validate_api_keys(user_settings, chat_data.model_id)
 
-        sandbox_id = await self.sandbox_service.create_sandbox()
+        started = time.monotonic()
+        sandbox_id = await sandbox_pools.checkout(
+            user_settings.sandbox_provider,
+            sandbox_api_key(
+                user_settings.sandbox_provider,
+                user_settings.e2b_api_key,
+                user_settings.modal_api_key,
+            ),
+        )
+        pooled = sandbox_id is not None
+        if sandbox_id is None:
+            sandbox_id = await self.sandbox_service.create_sandbox()
 
         github_token = user_settings.github_personal_access_token
         custom_env_vars = user_settings.custom_env_vars
@@ -144,7 +158,12 @@ class ChatService(BaseDbService[Chat]):
             auto_compact_disabled=auto_compact_disabled,
             codex_auth_json=codex_auth_json,
             custom_providers=custom_providers,
+            prepared=pooled,
         )
+        SANDBOX_TIME_TO_READY_SECONDS.labels(
+            provider=user_settings.sandbox_provider,
+            source="pool" if pooled else "created",
+        ).observe(time.monotonic() - started)
 
         async with self.session_factory() as db:
             chat = Chat(
@@ -552,15 +571,7 @@ class ChatService(BaseDbService[Chat]):
                 status_code=400,
             )
 
-        docker_config = DockerConfig(
-            image=settings.DOCKER_IMAGE,
-            network=settings.DOCKER_NETWORK,
-            host=settings.DOCKER_HOST,
-            preview_base_url=settings.DOCKER_PREVIEW_BASE_URL,
-            sandbox_domain=settings.DOCKER_SANDBOX_DOMAIN,
-            traefik_network=settings.DOCKER_TRAEFIK_NETWORK,
-        )
-        provider = LocalDockerProvider(config=docker_config)
+        provider = get_sandbox_provider(SandboxProviderType.DOCKER)
         fork_sandbox_service = SandboxService(provider)
 
         try:
@@ -638,7 +649,7 @@ class ChatService(BaseDbService[Chat]):
                     pass
                 raise
         finally:
-            await provider.cleanup()
+            await fork_sandbox_service.cleanup()
 
     async def _verify_chat_access(self, chat_id: UUID, user_id: UUID) -> bool:
         async with self.session_factory() as db:
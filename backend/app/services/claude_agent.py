@@ -1,5 +1,6 @@
 import logging
 import re
+import time
 from collections.abc import AsyncIterator, Callable
 from types import TracebackType
 from typing import Any, Literal, Self
@@ -13,10 +14,20 @@ from claude_agent_sdk import (
     UserMessage,
 )
 from app.core.config import get_settings
+from app.core.metrics import (
+    CLI_LAUNCH_PREPARE_SECONDS,
+    CLI_TIME_TO_FIRST_EVENT_SECONDS,
+)
 from app.core.security import create_chat_scoped_token
 from app.db.session import SessionLocal
 from app.models.db_models import Chat, User, UserSettings
 from app.prompts.enhance_prompt import get_enhance_prompt
+from app.services.cli_sessions import WarmCLISession, cli_session_pool
+from app.services.launch_profiles import (
+    LaunchProfile,
+    launch_profile_key,
+    launch_profiles,
+)
 from app.services.provider import ProviderService
 from app.services.exceptions import ClaudeAgentException
 from app.services.sandbox_providers import SandboxProviderType, create_docker_config
@@ -25,6 +36,7 @@ from app.services.transports import (
     E2BSandboxTransport,
     ModalSandboxTransport,
 )
+from app.services.transports.base import launch_files_missing
 from app.services.streaming.events import StreamEvent
 from app.services.streaming.processor import StreamProcessor
 from app.services.tool_handler import ToolHandlerRegistry
@@ -93,6 +105,7 @@ class ClaudeAgentService:
         self.tool_registry = ToolHandlerRegistry()
         self.session_factory = session_factory or SessionLocal
         self._total_cost_usd = 0.0
+        self._cancel_requested = False
         self._active_transport: (
             E2BSandboxTransport | DockerSandboxTransport | ModalSandboxTransport | None
         ) = None
@@ -175,34 +188,55 @@ class ClaudeAgentService:
         attachments: list[dict[str, Any]] | None = None,
         is_custom_prompt: bool = False,
     ) -> AsyncIterator[StreamEvent]:
+        started = time.perf_counter()
         chat_id = str(chat.id)
+        sandbox_id = chat.sandbox_id
+        if not sandbox_id:
+            raise ClaudeAgentException(
+                "Chat does not have an associated sandbox environment"
+            )
+        sandbox_id_str = str(sandbox_id)
+
         user_settings = await UserService(
             session_factory=self.session_factory
         ).get_user_settings(user.id)
 
         self._total_cost_usd = 0.0
+        self._cancel_requested = False
 
         sandbox_provider = user_settings.sandbox_provider
 
-        options = await self._build_claude_options(
-            user=user,
-            user_settings=user_settings,
+        profile_key = launch_profile_key(
+            user_settings,
+            sandbox=[sandbox_provider, sandbox_id_str],
             system_prompt=system_prompt,
+            is_custom_prompt=is_custom_prompt,
             permission_mode=permission_mode,
             model_id=model_id,
-            session_id=session_id,
             thinking_mode=thinking_mode,
-            chat_id=chat_id,
-            is_custom_prompt=is_custom_prompt,
         )
+        profile = launch_profiles.get(chat_id, profile_key)
+        profile_state = "hit"
+        if profile is None:
+            profile_state = "miss"
+            profile = LaunchProfile.build(
+                profile_key,
+                sandbox_provider,
+                sandbox_id_str,
+                self._build_claude_options(
+                    user_settings=user_settings,
+                    system_prompt=system_prompt,
+                    permission_mode=permission_mode,
+                    model_id=model_id,
+                    thinking_mode=thinking_mode,
+                    chat_id=chat_id,
+                    is_custom_prompt=is_custom_prompt,
+                ),
+            )
+            launch_profiles.put(chat_id, profile)
+        options = profile.options_for(session_id)
 
         user_prompt = self.prepare_user_prompt(prompt, custom_instructions, attachments)
-        sandbox_id = chat.sandbox_id
-        if not sandbox_id:
-            raise ClaudeAgentException(
-                "Chat does not have an associated sandbox environment"
-            )
-        sandbox_id_str = str(sandbox_id)
 
         prompt_message = {
             "type": "user",
@@ -210,43 +244,189 @@ class ClaudeAgentService:
             "parent_tool_use_id": None,
             "session_id": session_id,
         }
-        prompt_iterable = self._create_prompt_iterable(prompt_message)
 
-        transport = self._create_sandbox_transport(
-            sandbox_provider=sandbox_provider,
-            sandbox_id=sandbox_id_str,
-            prompt_iterable=prompt_iterable,
-            options=options,
-            user_settings=user_settings,
+        warm = cli_session_pool.enabled()
+        fingerprint = profile.fingerprint
+        CLI_LAUNCH_PREPARE_SECONDS.labels(profile=profile_state).observe(
+            time.perf_counter() - started
         )
 
-        async with transport:
+        if warm:
+            session = await cli_session_pool.checkout(chat_id, fingerprint, session_id)
+            if session is not None:
+                emitted = False
+                try:
+                    async for event in self._stream_turn(
+                        session.client,
+                        session.transport,
+                        prompt_message,
+                        options,
+                        session_callback,
+                        session,
+                        started,
+                        "warm",
+                    ):
+                        emitted = True
+                        yield event
+                    return
+                except Exception as e:
+                    # A process that died while parked fails on the first write;
+                    # fall back to spawning one, as long as nothing was streamed
+                    if emitted or self._cancel_requested:
+                        raise
+                    logger.warning(
+                        "Warm CLI session for chat %s failed, spawning a new one: %s",
+                        chat_id,
+                        e,
+                    )
+
+        rewrite_files = True
+        while True:
+            prompt_iterable = self._create_prompt_iterable(prompt_message)
+            transport = self._create_sandbox_transport(
+                sandbox_provider=sandbox_provider,
+                sandbox_id=sandbox_id_str,
+                prompt_iterable=prompt_iterable,
+                options=options,
+                user_settings=user_settings,
+            )
+            transport.persistent = warm
+            transport.launch_command = profile.command_for(session_id)
+            transport.launch_env = profile.env
+            transport.launch_files = launch_profiles.pending_files(profile)
+            client = ClaudeSDKClient(options=options, transport=transport)
             self._active_transport = transport
+            try:
+                await client.connect()
+                break
+            except ClaudeSDKError as e:
+                self._active_transport = None
+                launch_profiles.invalidate(chat_id)
+                await self._shutdown_client(client, transport)
+                # Launch files this process trusted are gone from the sandbox;
+                # the profile is still valid, so write them all and retry once
+                if rewrite_files and launch_files_missing(e):
+                    logger.warning(
+                        "Launch files missing in sandbox %s, rewriting them",
+                        sandbox_id_str,
+                    )
+                    rewrite_files = False
+                    launch_profiles.put(chat_id, profile)
+                    continue
+                raise ClaudeAgentException(f"Claude SDK error: {str(e)}")
+            except BaseException:
+                self._active_transport = None
+                await self._shutdown_client(client, transport)
+                raise
+
+        launch_profiles.mark_written(profile, transport.launch_files)
 
-            processor = StreamProcessor(
-                tool_registry=self.tool_registry,
-                session_handler=self._create_session_handler(session_callback),
+        new_session: WarmCLISession | None = None
+        if warm:
+            new_session = WarmCLISession(
+                chat_id=chat_id,
+                fingerprint=fingerprint,
+                client=client,
+                transport=transport,
             )
+            if not await cli_session_pool.claim(new_session):
+                new_session = None
 
-            try:
-                async with ClaudeSDKClient(
-                    options=options, transport=transport
-                ) as client:
-                    await client.query(prompt_iterable)
-                    async for message in client.receive_response():
-                        for event in processor.emit_events_for_message(message):
-                            if event:
-                                yield event
-                                if event.get("tool", {}).get("name") == "ExitPlanMode":
-                                    await client.set_permission_mode("auto")
-
-                self._total_cost_usd = processor.total_cost_usd
+        try:
+            async for event in self._stream_turn(
+                client,
+                transport,
+                prompt_message,
+                options,
+                session_callback,
+                new_session,
+                started,
+                "cold",
+            ):
+                yield event
+        except Exception:
+            # Rebuild the launch, and rewrite its files, for the next turn
+            if profile.files:
+                launch_profiles.invalidate(chat_id)
+            raise
+
+    async def _stream_turn(
+        self,
+        client: ClaudeSDKClient,
+        transport: E2BSandboxTransport | DockerSandboxTransport | ModalSandboxTransport,
+        prompt_message: dict[str, Any],
+        options: ClaudeAgentOptions,
+        session_callback: Callable[[str], None] | None,
+        warm_session: WarmCLISession | None,
+        started: float,
+        session_label: str,
+    ) -> AsyncIterator[StreamEvent]:
+        # Runs one turn on a connected client. Without a warm session the CLI
+        # is shut down afterwards; with one it goes back to the pool if the
+        # turn completed, and is closed otherwise (errors, cancellation).
+        current_session_id = options.resume
+
+        def track_session(new_session_id: str) -> None:
+            nonlocal current_session_id
+            current_session_id = new_session_id
+            if session_callback:
+                session_callback(new_session_id)
+
+        self._active_transport = transport
+        processor = StreamProcessor(
+            tool_registry=self.tool_registry,
+            session_handler=self._create_session_handler(track_session),
+            context_window=settings.CONTEXT_WINDOW_TOKENS,
+        )
+        first_event = True
+        completed = False
 
-            except ClaudeSDKError as e:
-                raise ClaudeAgentException(f"Claude SDK error: {str(e)}")
+        try:
+            if warm_session is not None and warm_session.turns:
+                # Undo a switch made by ExitPlanMode during an earlier turn
+                if options.permission_mode:
+                    await client.set_permission_mode(options.permission_mode)
+            await client.query(self._create_prompt_iterable(prompt_message))
+            async for message in client.receive_response():
+                for event in processor.emit_events_for_message(message):
+                    if event:
+                        if first_event:
+                            first_event = False
+                            CLI_TIME_TO_FIRST_EVENT_SECONDS.labels(
+                                session=session_label
+                            ).observe(time.perf_counter() - started)
+                        yield event
+                        if event.get("tool", {}).get("name") == "ExitPlanMode":
+                            await client.set_permission_mode("auto")
+
+            self._total_cost_usd = processor.total_cost_usd
+            completed = True
 
-            finally:
-                self._active_transport = None
+        except ClaudeSDKError as e:
+            raise ClaudeAgentException(f"Claude SDK error: {str(e)}")
+
+        finally:
+            self._active_transport = None
+            if warm_session is None:
+                await self._shutdown_client(client, transport)
+            elif completed and transport.is_alive():
+                await cli_session_pool.checkin(warm_session, current_session_id)
+            else:
+                await cli_session_pool.discard(warm_session)
+
+    async def _shutdown_client(
+        self,
+        client: ClaudeSDKClient,
+        transport: E2BSandboxTransport | DockerSandboxTransport | ModalSandboxTransport,
+    ) -> None:
+        try:
+            await client.disconnect()
+        except Exception as e:
+            logger.error("Error disconnecting Claude SDK client: %s", e)
+        try:
+            await transport.close()
+        except Exception as e:
+            logger.error("Error closing transport: %s", e)
 
     def get_total_cost_usd(self) -> float:
         return self._total_cost_usd
@@ -257,6 +437,7 @@ class ClaudeAgentService:
         return SessionHandler(session_callback)
 
     async def cancel_active_stream(self) -> None:
+        self._cancel_requested = True
         if self._active_transport:
             try:
                 await self._active_transport.close()
@@ -335,7 +516,13 @@ class ClaudeAgentService:
     def _build_permission_server(
         self, permission_mode: str, chat_id: str, sandbox_provider: str = "docker"
     ) -> dict[str, Any]:
-        chat_token = create_chat_scoped_token(chat_id)
+        expires_minutes = settings.CHAT_SCOPED_TOKEN_EXPIRE_MINUTES
+        # The token is reused for as long as the chat's launch profile is
+        expires_minutes += -(-settings.CLI_LAUNCH_PROFILE_TTL_SECONDS // 60)
+        if cli_session_pool.enabled():
+            # A warm CLI keeps this server (and token) for its whole lifetime
+            expires_minutes += -(-settings.CLI_WARM_SESSION_MAX_AGE_SECONDS // 60)
+        chat_token = create_chat_scoped_token(chat_id, expires_minutes)
 
         if settings.DOCKER_PERMISSION_API_URL:
             api_base_url = settings.DOCKER_PERMISSION_API_URL
@@ -382,16 +569,12 @@ class ClaudeAgentService:
                 )
         return servers
 
-    async def _get_mcp_servers(
+    def _get_mcp_servers(
         self,
-        user: User,
+        user_settings: UserSettings,
         permission_mode: str,
         chat_id: str,
     ) -> dict[str, Any]:
-        user_settings = await UserService(
-            session_factory=self.session_factory
-        ).get_user_settings(user.id)
-
         sandbox_provider = user_settings.sandbox_provider
         servers: dict[str, Any] = {
             "permission": self._build_permission_server(
@@ -454,15 +637,13 @@ class ClaudeAgentService:
             config["env"] = env
         return config
 
-    async def _build_claude_options(
+    def _build_claude_options(
         self,
         *,
-        user: User,
         user_settings: UserSettings,
         system_prompt: str,
         permission_mode: str,
         model_id: str,
-        session_id: str | None,
         thinking_mode: str | None,
         chat_id: str,
         is_custom_prompt: bool = False,
@@ -508,14 +689,13 @@ class ClaudeAgentService:
             permission_mode=sdk_permission_mode,
             model=actual_model_id,
             disallowed_tools=disallowed_tools,
-            mcp_servers=await self._get_mcp_servers(
-                user,
+            mcp_servers=self._get_mcp_servers(
+                user_settings,
                 permission_mode,
                 chat_id,
             ),
             cwd="/home/user",
             user="user",
-            resume=session_id,
             env=env,
             setting_sources=["local", "user", "project"],
             permission_prompt_tool_name="mcp__permission__approval_prompt",
@@ -0,0 +1,245 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Any
+
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+
+from app.constants import REDIS_KEY_CHAT_CLI_SESSION
+from app.core.config import get_settings
+from app.core.metrics import CLI_WARM_SESSIONS
+from app.core.worker_loop import worker_loop
+from app.services.transports import (
+    DockerSandboxTransport,
+    E2BSandboxTransport,
+    ModalSandboxTransport,
+)
+from app.utils.redis import redis_connection
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Rotated on every turn without changing how the CLI behaves
+VOLATILE_MCP_ENV_KEYS = frozenset({"CHAT_TOKEN"})
+
+
+def launch_fingerprint(
+    sandbox_provider: str, sandbox_id: str, options: ClaudeAgentOptions
+) -> str:
+    # Hash of everything fixed for the lifetime of a CLI process: its command
+    # line, environment and MCP servers. The resumed session id is compared
+    # separately since a warm process carries its own session forward.
+    mcp_servers: Any = options.mcp_servers
+    if isinstance(mcp_servers, dict):
+        mcp_servers = {
+            name: (
+                {
+                    **config,
+                    "env": {
+                        key: value
+                        for key, value in (config.get("env") or {}).items()
+                        if key not in VOLATILE_MCP_ENV_KEYS
+                    },
+                }
+                if isinstance(config, dict)
+                else config
+            )
+            for name, config in mcp_servers.items()
+        }
+    payload = {
+        "sandbox": [sandbox_provider, sandbox_id],
+        "system_prompt": options.system_prompt,
+        "model": options.model,
+        "permission_mode": options.permission_mode,
+        "permission_prompt_tool_name": options.permission_prompt_tool_name,
+        "allowed_tools": options.allowed_tools,
+        "disallowed_tools": options.disallowed_tools,
+        "max_thinking_tokens": options.max_thinking_tokens,
+        "mcp_servers": mcp_servers,
+        "env": options.env,
+        "cwd": str(options.cwd),
+        "user": options.user,
+        "setting_sources": options.setting_sources,
+        "extra_args": options.extra_args,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+@dataclass(eq=False)
+class WarmCLISession:
+    chat_id: str
+    fingerprint: str
+    client: ClaudeSDKClient
+    transport: E2BSandboxTransport | DockerSandboxTransport | ModalSandboxTransport
+    session_id: str | None = None
+    token: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    turns: int = 0
+
+    def expired(self, now: float) -> bool:
+        return now - self.started_at >= settings.CLI_WARM_SESSION_MAX_AGE_SECONDS
+
+    def idle(self, now: float) -> bool:
+        return now - self.last_used >= settings.CLI_WARM_SESSION_IDLE_SECONDS
+
+
+class WarmCLISessionPool:
+    # Claude CLI processes kept attached between turns, at most one per chat.
+    # Sessions live on the shared worker loop (their SDK reader tasks are bound
+    # to it) and are checked out for the length of a turn, so two turns never
+    # share a process. The next turn of a chat may land on another worker, so
+    # every freshly spawned process records its token in Redis and a checkout
+    # only reuses a process whose token is still the current one. Anything that
+    # does not match (settings, resumed session, age, health, owner) is closed
+    # and the caller spawns a fresh CLI as before.
+    def __init__(self) -> None:
+        self._sessions: dict[str, WarmCLISession] = {}
+        self._reaper: asyncio.Task[None] | None = None
+
+    @staticmethod
+    def enabled() -> bool:
+        return (
+            settings.CLI_WARM_SESSIONS
+            and settings.CELERY_ASYNC_POOL
+            and worker_loop.is_current()
+        )
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    async def checkout(
+        self, chat_id: str, fingerprint: str, resume: str | None
+    ) -> WarmCLISession | None:
+        session = self._sessions.pop(chat_id, None)
+        CLI_WARM_SESSIONS.set(len(self._sessions))
+        if session is None:
+            return None
+
+        reason: str | None = None
+        if session.fingerprint != fingerprint:
+            reason = "launch settings changed"
+        elif resume != session.session_id:
+            reason = "resumed session changed"
+        elif session.expired(time.monotonic()):
+            reason = "max age reached"
+        elif not session.transport.is_alive():
+            reason = "process exited"
+        elif not await self._is_owner(session):
+            reason = "chat ran elsewhere"
+
+        if reason is not None:
+            logger.info("Not reusing warm CLI session for chat %s: %s", chat_id, reason)
+            await self._close(session, release=False)
+            return None
+        return session
+
+    async def claim(self, session: WarmCLISession) -> bool:
+        # Called when a fresh CLI starts a turn: from now on only this process
+        # may be reused for the chat, wherever older ones are parked
+        return await self._record_owner(session)
+
+    async def checkin(self, session: WarmCLISession, session_id: str | None) -> None:
+        session.session_id = session_id
+        session.last_used = time.monotonic()
+        session.turns += 1
+
+        if not await self._record_owner(session):
+            await self._close(session, release=False)
+            return
+
+        previous = self._sessions.get(session.chat_id)
+        if previous is not None and previous is not session:
+            await self._close(previous, release=False)
+        self._sessions[session.chat_id] = session
+        CLI_WARM_SESSIONS.set(len(self._sessions))
+
+        if self._reaper is None or self._reaper.done():
+            self._reaper = asyncio.create_task(self._reap())
+            worker_loop.add_shutdown_hook(self.close_all)
+
+    async def discard(self, session: WarmCLISession) -> None:
+        if self._sessions.get(session.chat_id) is session:
+            del self._sessions[session.chat_id]
+            CLI_WARM_SESSIONS.set(len(self._sessions))
+        await self._close(session, release=True)
+
+    async def close_all(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        CLI_WARM_SESSIONS.set(0)
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
+        await asyncio.gather(
+            *(self._close(session, release=True) for session in sessions),
+            return_exceptions=True,
+        )
+
+    async def _reap(self) -> None:
+        while self._sessions:
+            await asyncio.sleep(settings.CLI_WARM_SESSION_CHECK_INTERVAL_SECONDS)
+            now = time.monotonic()
+            stale = [
+                session
+                for session in self._sessions.values()
+                if session.idle(now)
+                or session.expired(now)
+                or not session.transport.is_alive()
+            ]
+            for session in stale:
+                del self._sessions[session.chat_id]
+            CLI_WARM_SESSIONS.set(len(self._sessions))
+            for session in stale:
+                await self._close(session, release=True)
+
+    async def _record_owner(self, session: WarmCLISession) -> bool:
+        try:
+            async with redis_connection() as redis:
+                await redis.set(
+                    REDIS_KEY_CHAT_CLI_SESSION.format(chat_id=session.chat_id),
+                    session.token,
+                    ex=settings.CLI_WARM_SESSION_MAX_AGE_SECONDS,
+                )
+        except Exception as e:
+            # Without the owner token the process could miss turns run elsewhere
+            logger.warning("Failed to record warm CLI session owner: %s", e)
+            return False
+        return True
+
+    async def _is_owner(self, session: WarmCLISession) -> bool:
+        try:
+            async with redis_connection() as redis:
+                owner = await redis.get(
+                    REDIS_KEY_CHAT_CLI_SESSION.format(chat_id=session.chat_id)
+                )
+        except Exception as e:
+            logger.warning("Failed to read warm CLI session owner: %s", e)
+            return False
+        return owner == session.token
+
+    async def _close(self, session: WarmCLISession, *, release: bool) -> None:
+        try:
+            await session.client.disconnect()
+        except Exception as e:
+            logger.debug("Error disconnecting warm CLI session: %s", e)
+        try:
+            await session.transport.close()
+        except Exception as e:
+            logger.error("Error closing warm CLI session transport: %s", e)
+        if not release:
+            return
+        with suppress(Exception):
+            async with redis_connection() as redis:
+                key = REDIS_KEY_CHAT_CLI_SESSION.format(chat_id=session.chat_id)
+                if await redis.get(key) == session.token:
+                    await redis.delete(key)
+
+
+cli_session_pool = WarmCLISessionPool()
@@ -0,0 +1,163 @@
+import dataclasses
+import hashlib
+import json
+import shlex
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from claude_agent_sdk import ClaudeAgentOptions
+
+from app.core.config import get_settings
+from app.services.cli_sessions import launch_fingerprint
+from app.services.transports.base import (
+    LAUNCH_FILES_MAX_AGE_MINUTES,
+    build_cli_command,
+    build_cli_environment,
+)
+
+settings = get_settings()
+
+LAUNCH_FILE_TRUST_SECONDS = LAUNCH_FILES_MAX_AGE_MINUTES * 30
+LAUNCH_FILES_TRACKED = 4 * settings.CLI_LAUNCH_PROFILE_CACHE_SIZE
+
+# User settings that end up in the CLI's options or its transport
+LAUNCH_SETTINGS_FIELDS = (
+    "sandbox_provider",
+    "e2b_api_key",
+    "modal_api_key",
+    "github_personal_access_token",
+    "custom_providers",
+    "custom_env_vars",
+    "custom_mcps",
+)
+
+
+def launch_profile_key(user_settings: Any, **launch: Any) -> str:
+    # Hash of the user settings and per-turn inputs a launch is built from;
+    # any change to them yields a new key and so a freshly built profile
+    payload = {
+        "settings": {
+            name: getattr(user_settings, name, None) for name in LAUNCH_SETTINGS_FIELDS
+        },
+        **launch,
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+@dataclass(eq=False)
+class LaunchProfile:
+    # A chat's CLI launch built and serialized once: options without the
+    # resumed session, the command line and environment handed to the
+    # transport, the launch files the command refers to (CLI_LAUNCH_FILES)
+    # and the warm-session fingerprint
+    key: str
+    sandbox_id: str
+    options: ClaudeAgentOptions
+    command_line: str
+    env: dict[str, str]
+    fingerprint: str
+    files: dict[str, str] = field(default_factory=dict)
+    created_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def build(
+        cls,
+        key: str,
+        sandbox_provider: str,
+        sandbox_id: str,
+        options: ClaudeAgentOptions,
+    ) -> "LaunchProfile":
+        options = dataclasses.replace(options, resume=None)
+        files: dict[str, str] | None = {} if settings.CLI_LAUNCH_FILES else None
+        return cls(
+            key=key,
+            sandbox_id=sandbox_id,
+            options=options,
+            command_line=build_cli_command(options, files),
+            env=build_cli_environment(options),
+            fingerprint=launch_fingerprint(sandbox_provider, sandbox_id, options),
+            files=files or {},
+        )
+
+    def expired(self, now: float) -> bool:
+        return now - self.created_at >= settings.CLI_LAUNCH_PROFILE_TTL_SECONDS
+
+    def options_for(self, session_id: str | None) -> ClaudeAgentOptions:
+        return dataclasses.replace(self.options, resume=session_id)
+
+    def command_for(self, session_id: str | None) -> str:
+        if not session_id:
+            return self.command_line
+        return f"{self.command_line} {shlex.join(['--resume', session_id])}"
+
+
+class LaunchProfileCache:
+    # Most recently used profile per chat, bounded by
+    # CLI_LAUNCH_PROFILE_CACHE_SIZE, and the launch files this process wrote
+    # to each sandbox. A written file is trusted for half the age at which
+    # the sandbox prunes it, so it is re-sent only when its content (and so
+    # its path) is new, or before it can have been pruned. Shared by the
+    # threads of a worker.
+    def __init__(self) -> None:
+        self._profiles: OrderedDict[str, LaunchProfile] = OrderedDict()
+        self._written: OrderedDict[tuple[str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._profiles)
+
+    def get(self, chat_id: str, key: str) -> LaunchProfile | None:
+        with self._lock:
+            profile = self._profiles.get(chat_id)
+            if profile is None:
+                return None
+            if profile.key != key or profile.expired(time.monotonic()):
+                del self._profiles[chat_id]
+                return None
+            self._profiles.move_to_end(chat_id)
+            return profile
+
+    def put(self, chat_id: str, profile: LaunchProfile) -> None:
+        with self._lock:
+            self._profiles[chat_id] = profile
+            self._profiles.move_to_end(chat_id)
+            while len(self._profiles) > settings.CLI_LAUNCH_PROFILE_CACHE_SIZE:
+                self._profiles.popitem(last=False)
+
+    def pending_files(self, profile: LaunchProfile) -> dict[str, str]:
+        now = time.monotonic()
+        pending: dict[str, str] = {}
+        with self._lock:
+            for path, content in profile.files.items():
+                written_at = self._written.get((profile.sandbox_id, path))
+                if written_at is None or now - written_at >= LAUNCH_FILE_TRUST_SECONDS:
+                    pending[path] = content
+        return pending
+
+    def mark_written(self, profile: LaunchProfile, paths: Iterable[str]) -> None:
+        now = time.monotonic()
+        with self._lock:
+            for path in paths:
+                key = (profile.sandbox_id, path)
+                self._written[key] = now
+                self._written.move_to_end(key)
+            while len(self._written) > LAUNCH_FILES_TRACKED:
+                self._written.popitem(last=False)
+
+    def invalidate(self, chat_id: str) -> None:
+        # Also forgets the files written to the chat's sandbox, in case the
+        # launch failed because they are gone
+        with self._lock:
+            profile = self._profiles.pop(chat_id, None)
+            if profile is None:
+                return
+            for key in [key for key in self._written if key[0] == profile.sandbox_id]:
+                del self._written[key]
+
+
+launch_profiles = LaunchProfileCache()
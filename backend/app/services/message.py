@@ -1,3 +1,4 @@
+import json
 import logging
 from datetime import datetime, timezone
 from typing import cast
@@ -11,6 +12,7 @@ from app.core.config import get_settings
 from app.models.db_models import (
     Message,
     MessageAttachment,
+    MessageEvent,
     MessageRole,
     MessageStreamStatus,
 )
@@ -169,6 +171,8 @@ class MessageService(BaseDbService[Message]):
             has_more = len(rows) > limit
             items = rows[:limit]
 
+            await self._materialize_pending_content(db, items)
+
             next_cursor = None
             if has_more and items:
                 last = items[-1]
@@ -180,6 +184,38 @@ class MessageService(BaseDbService[Message]):
                 has_more=has_more,
             )
 
+    async def _materialize_pending_content(
+        self, db: AsyncSession, messages: list[Message]
+    ) -> None:
+        # Assistant messages that never reached a terminal save (still streaming or
+        # the worker died) only have their events in message_events segments.
+        pending = {
+            message.id: message
+            for message in messages
+            if message.role == MessageRole.ASSISTANT and not message.content
+        }
+        if not pending:
+            return
+
+        result = await db.execute(
+            select(MessageEvent.message_id, MessageEvent.events)
+            .filter(MessageEvent.message_id.in_(pending.keys()))
+            .order_by(MessageEvent.message_id, MessageEvent.seq)
+        )
+
+        events_by_message: dict[UUID, list[object]] = {}
+        for message_id, segment in result.all():
+            try:
+                events_by_message.setdefault(message_id, []).extend(json.loads(segment))
+            except json.JSONDecodeError:
+                logger.warning("Skipping corrupt event segment for %s", message_id)
+
+        for message_id, events in events_by_message.items():
+            # Only the serialized response is filled in; the row itself is
+            # rewritten by the orchestrator when the stream finishes.
+            db.expunge(pending[message_id])
+            pending[message_id].content = json.dumps(events, ensure_ascii=False)
+
     async def get_latest_assistant_message(self, chat_id: UUID) -> Message | None:
         async with self.session_factory() as db:
             query = (
@@ -3,6 +3,7 @@ import base64
 import io
 import json
 import logging
+import posixpath
 import shlex
 import uuid
 import zipfile
@@ -27,6 +28,7 @@ from app.services.sandbox_providers import (
     SandboxProvider,
 )
 from app.services.sandbox_providers.types import CommandResult
+from app.services.sandbox_secrets import sandbox_secrets
 from app.services.skill import SkillService
 from app.utils.queue import drain_queue, put_with_overflow
 
@@ -76,7 +78,6 @@ class SandboxService:
                         sandbox_id,
                         e,
                     )
-        await self.provider.cleanup()
 
     async def create_sandbox(self) -> str:
         return await self.provider.create_sandbox()
@@ -97,6 +98,11 @@ class SandboxService:
                 exc_info=True,
                 extra={"sandbox_id": sandbox_id},
             )
+            return
+        try:
+            await sandbox_secrets.forget(sandbox_id)
+        except Exception as e:
+            logger.warning("Failed to drop secrets of sandbox %s: %s", sandbox_id, e)
 
     async def get_or_connect_sandbox(self, sandbox_id: str) -> bool:
         return await self.provider.connect_sandbox(sandbox_id)
@@ -107,8 +113,7 @@ class SandboxService:
         command: str,
         background: bool = False,
     ) -> CommandResult:
-        secrets = await self.provider.get_secrets(sandbox_id)
-        envs = {s.key: s.value for s in secrets}
+        envs = await sandbox_secrets.get(self.provider, sandbox_id)
 
         return await self.provider.execute_command(
             sandbox_id, command, background=background, envs=envs
@@ -302,7 +307,7 @@ class SandboxService:
         key: str,
         value: str,
     ) -> None:
-        await self.provider.add_secret(sandbox_id, key, value)
+        await sandbox_secrets.set(self.provider, sandbox_id, key, value)
 
     async def update_secret(
         self,
@@ -310,49 +315,38 @@ class SandboxService:
         key: str,
         value: str,
     ) -> None:
-        await self.provider.delete_secret(sandbox_id, key)
-        await self.provider.add_secret(sandbox_id, key, value)
+        await sandbox_secrets.set(self.provider, sandbox_id, key, value)
 
     async def delete_secret(
         self,
         sandbox_id: str,
         key: str,
     ) -> None:
-        await self.provider.delete_secret(sandbox_id, key)
+        await sandbox_secrets.delete(self.provider, sandbox_id, key)
 
     async def get_secrets(
         self,
         sandbox_id: str,
     ) -> list[dict[str, Any]]:
-        secrets = await self.provider.get_secrets(sandbox_id)
-        return [{"key": s.key, "value": s.value} for s in secrets]
+        secrets = await sandbox_secrets.get(self.provider, sandbox_id)
+        return [{"key": key, "value": value} for key, value in secrets.items()]
 
     async def generate_zip_download(self, sandbox_id: str) -> bytes:
         metadata_items = await self.provider.list_files(sandbox_id)
+        file_paths = [item.path for item in metadata_items if item.type == "file"]
+        contents = await self.provider.read_files(sandbox_id, file_paths)
+        for file_path in file_paths:
+            if file_path not in contents:
+                logger.warning("Failed to read file %s for zip", file_path)
 
         zip_buffer = io.BytesIO()
 
         with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for item in metadata_items:
-                if item.type == "file":
-                    file_path = item.path
-
-                    try:
-                        content = await self.provider.read_file(sandbox_id, file_path)
-
-                        if content.is_binary:
-                            zip_file.writestr(
-                                file_path, base64.b64decode(content.content)
-                            )
-                        else:
-                            zip_file.writestr(
-                                file_path, content.content.encode("utf-8")
-                            )
-                    except Exception as e:
-                        logger.warning(
-                            "Failed to write file %s to zip: %s", file_path, e
-                        )
-                        continue
+            for file_path, content in contents.items():
+                if content.is_binary:
+                    zip_file.writestr(file_path, base64.b64decode(content.content))
+                else:
+                    zip_file.writestr(file_path, content.content.encode("utf-8"))
 
         zip_buffer.seek(0)
         return zip_buffer.read()
@@ -378,88 +372,80 @@ class SandboxService:
         if not enabled_skills and not enabled_commands and not enabled_agents:
             return
 
-        zip_buffer = io.BytesIO()
-        has_content = False
+        files: dict[str, str | bytes] = {}
+        executables: list[str] = []
 
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
-            for skill in enabled_skills:
-                skill_name = skill["name"]
-                local_zip_path = Path(skill["path"])
+        for skill in enabled_skills:
+            skill_name = skill["name"]
+            local_zip_path = Path(skill["path"])
 
-                if not local_zip_path.exists():
-                    logger.warning(
-                        "Skill ZIP not found: %s at %s", skill_name, local_zip_path
-                    )
-                    continue
+            if not local_zip_path.exists():
+                logger.warning(
+                    "Skill ZIP not found: %s at %s", skill_name, local_zip_path
+                )
+                continue
 
-                with zipfile.ZipFile(local_zip_path, "r") as skill_zip:
-                    for item in skill_zip.namelist():
-                        content = skill_zip.read(item)
-                        zf.writestr(f".claude/skills/{skill_name}/{item}", content)
-                        has_content = True
+            skill_dir = f"/home/user/.claude/skills/{skill_name}"
+            with zipfile.ZipFile(local_zip_path, "r") as skill_zip:
+                for info in skill_zip.infolist():
+                    if info.is_dir():
+                        continue
+                    path = posixpath.normpath(f"{skill_dir}/{info.filename}")
+                    if not path.startswith(f"{skill_dir}/"):
+                        logger.warning(
+                            "Skipping %s outside of skill %s", info.filename, skill_name
+                        )
+                        continue
+                    files[path] = skill_zip.read(info)
+                    # Unix permission bits, which unzip used to restore
+                    if (info.external_attr >> 16) & 0o111:
+                        executables.append(path)
 
-            for command in enabled_commands:
-                command_name = command["name"]
-                local_path = Path(command["path"])
+        for command in enabled_commands:
+            command_name = command["name"]
+            local_path = Path(command["path"])
 
-                if not local_path.exists():
-                    logger.warning(
-                        "Command not found: %s at %s", command_name, local_path
-                    )
-                    continue
+            if not local_path.exists():
+                logger.warning("Command not found: %s at %s", command_name, local_path)
+                continue
 
-                command_content = local_path.read_text(encoding="utf-8")
-                zf.writestr(f".claude/commands/{command_name}.md", command_content)
-                has_content = True
+            files[f"/home/user/.claude/commands/{command_name}.md"] = (
+                local_path.read_text(encoding="utf-8")
+            )
 
-            for agent in enabled_agents:
-                agent_name = agent["name"]
-                local_path = Path(agent["path"])
+        for agent in enabled_agents:
+            agent_name = agent["name"]
+            local_path = Path(agent["path"])
 
-                if not local_path.exists():
-                    logger.warning("Agent not found: %s at %s", agent_name, local_path)
-                    continue
+            if not local_path.exists():
+                logger.warning("Agent not found: %s at %s", agent_name, local_path)
+                continue
 
-                agent_content = local_path.read_text(encoding="utf-8")
-                zf.writestr(f".claude/agents/{agent_name}.md", agent_content)
-                has_content = True
+            files[f"/home/user/.claude/agents/{agent_name}.md"] = local_path.read_text(
+                encoding="utf-8"
+            )
 
-        if not has_content:
+        if not files:
             return
 
-        zip_buffer.seek(0)
-        zip_content = zip_buffer.getvalue()
-        encoded_content = base64.b64encode(zip_content).decode("utf-8")
-
-        remote_zip_path = f"/home/user/_resources_{uuid.uuid4().hex[:8]}.zip"
-        temp_b64_path = f"{remote_zip_path}.b64tmp"
-
         try:
-            await self.write_file(sandbox_id, temp_b64_path, encoded_content)
-            decode_and_extract_cmd = (
-                f"base64 -d {shlex.quote(temp_b64_path)} > {shlex.quote(remote_zip_path)} && "
-                f"unzip -q -o {shlex.quote(remote_zip_path)} -d /home/user && "
-                f"rm -f {shlex.quote(remote_zip_path)} {shlex.quote(temp_b64_path)}"
-            )
-            await self.execute_command(sandbox_id, decode_and_extract_cmd)
+            await self.provider.write_files(sandbox_id, files)
+            if executables:
+                await self.execute_command(
+                    sandbox_id, f"chmod +x -- {shlex.join(executables)}"
+                )
 
             resource_count = (
                 len(enabled_skills) + len(enabled_commands) + len(enabled_agents)
             )
             logger.info(
-                "Copied %d resources to sandbox %s in single upload",
+                "Copied %d resources (%d files) to sandbox %s in one batch",
                 resource_count,
+                len(files),
                 sandbox_id,
             )
         except Exception as e:
             logger.error("Failed to copy resources to sandbox %s: %s", sandbox_id, e)
-            cleanup_cmd = (
-                f"rm -f {shlex.quote(remote_zip_path)} {shlex.quote(temp_b64_path)}"
-            )
-            try:
-                await self.execute_command(sandbox_id, cleanup_cmd)
-            except Exception:
-                pass
             raise SandboxException(f"Failed to copy resources to sandbox: {e}") from e
 
     async def _add_env_vars_parallel(
@@ -470,21 +456,15 @@ class SandboxService:
         async with asyncio.TaskGroup() as tg:
             for env_var in custom_env_vars:
                 tg.create_task(
-                    self.provider.add_secret(
-                        sandbox_id, env_var["key"], env_var["value"]
-                    )
+                    self.add_secret(sandbox_id, env_var["key"], env_var["value"])
                 )
 
     async def _setup_github_token(self, sandbox_id: str, github_token: str) -> None:
         script_content = '#!/bin/sh\\necho "$GITHUB_TOKEN"'
         async with asyncio.TaskGroup() as tg:
+            tg.create_task(self.add_secret(sandbox_id, "GITHUB_TOKEN", github_token))
             tg.create_task(
-                self.provider.add_secret(sandbox_id, "GITHUB_TOKEN", github_token)
-            )
-            tg.create_task(
-                self.provider.add_secret(
-                    sandbox_id, "GIT_ASKPASS", "/home/user/.git-askpass.sh"
-                )
+                self.add_secret(sandbox_id, "GIT_ASKPASS", "/home/user/.git-askpass.sh")
             )
 
         setup_cmd = (
@@ -497,9 +477,7 @@ class SandboxService:
         self, sandbox_id: str, openrouter_api_key: str, skip_secret: bool = False
     ) -> None:
         if not skip_secret:
-            await self.provider.add_secret(
-                sandbox_id, "OPENROUTER_API_KEY", openrouter_api_key
-            )
+            await self.add_secret(sandbox_id, "OPENROUTER_API_KEY", openrouter_api_key)
 
         start_cmd = f"OPENROUTER_API_KEY={shlex.quote(openrouter_api_key)} anthropic-bridge --port 3456 --host 0.0.0.0"
         start_result = await self.execute_command(
@@ -558,6 +536,10 @@ class SandboxService:
         await self.execute_command(sandbox_id, f"mkdir -p {codex_dir}")
         await self.write_file(sandbox_id, f"{codex_dir}/auth.json", codex_auth_json)
 
+    async def prepare_sandbox(self, sandbox_id: str) -> None:
+        # The part of initialization that does not depend on the user
+        await self._start_openvscode_server(sandbox_id)
+
     async def initialize_sandbox(
         self,
         sandbox_id: str,
@@ -571,14 +553,19 @@ class SandboxService:
         codex_auth_json: str | None = None,
         custom_providers: list[CustomProviderDict] | None = None,
         is_fork: bool = False,
+        prepared: bool = False,
     ) -> None:
-        tasks: list[Coroutine[None, None, None]] = [
-            self._start_openvscode_server(sandbox_id),
-        ]
+        # prepared: the sandbox came from the warm pool and prepare_sandbox()
+        # already ran on it
+        tasks: list[Coroutine[None, None, None]] = []
+        if not prepared:
+            tasks.append(self.prepare_sandbox(sandbox_id))
 
         # Forks skip filesystem-based setup (env vars in .bashrc, config files, skills/commands/agents)
         # since these are preserved when cloning the container. Only processes need restarting.
+        # Their secrets are read from the cloned .bashrc on first use.
         if not is_fork:
+            await sandbox_secrets.reset(sandbox_id)
             tasks.append(self._setup_claude_config(sandbox_id, auto_compact_disabled))
 
             if custom_env_vars:
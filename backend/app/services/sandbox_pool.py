@@ -0,0 +1,280 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import deque
+from collections.abc import Coroutine
+from contextlib import suppress
+from typing import Any
+
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.core.metrics import SANDBOX_POOL_CHECKOUTS, SANDBOX_POOL_READY
+from app.db.session import SessionLocal
+from app.models.db_models import Chat
+from app.services.sandbox import SandboxService
+from app.services.sandbox_providers import (
+    LocalDockerProvider,
+    SandboxProvider,
+    SandboxProviderType,
+    get_sandbox_provider,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Set on sandboxes created for a pool, with their creation time (Unix seconds)
+SANDBOX_POOL_LABEL = "claudex.pool"
+
+
+def sandbox_pool_key(provider_type: str, api_key: str | None) -> str:
+    # Pooled sandboxes are interchangeable only within one provider account
+    # and image
+    image = (
+        settings.E2B_TEMPLATE_ID
+        if provider_type == SandboxProviderType.E2B.value
+        else settings.DOCKER_IMAGE
+    )
+    credentials = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+    return f"{provider_type}:{image}:{credentials}"
+
+
+class SandboxPool:
+    # Sandboxes of one provider account created ahead of time, with
+    # SandboxService.prepare_sandbox() already run on them. The target size is
+    # the number of checkouts in the last SANDBOX_POOL_DEMAND_WINDOW_SECONDS,
+    # within SANDBOX_POOL_MIN_SIZE and SANDBOX_POOL_MAX_SIZE, or zero without
+    # any. A background task refills the pool after each checkout, deletes
+    # sandboxes idle for longer than SANDBOX_POOL_MAX_IDLE_SECONDS, and stops
+    # once the pool is empty and demand has gone.
+    def __init__(self, provider_type: str, provider: SandboxProvider) -> None:
+        self.provider_type = provider_type
+        self.provider = provider
+        self._service = SandboxService(provider)
+        self._ready: deque[tuple[str, float]] = deque()
+        self._checkouts: deque[float] = deque()
+        self._refill_task: asyncio.Task[None] | None = None
+        # Deletions of discarded sandboxes, awaited by close()
+        self._tasks: set[asyncio.Task[None]] = set()
+        self._demand = asyncio.Event()
+        self._ready_gauge = SANDBOX_POOL_READY.labels(provider=provider_type)
+        self._hits = SANDBOX_POOL_CHECKOUTS.labels(provider=provider_type, result="hit")
+        self._misses = SANDBOX_POOL_CHECKOUTS.labels(
+            provider=provider_type, result="miss"
+        )
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    @property
+    def idle(self) -> bool:
+        return not self._ready and (
+            self._refill_task is None or self._refill_task.done()
+        )
+
+    def target_size(self, now: float) -> int:
+        window = settings.SANDBOX_POOL_DEMAND_WINDOW_SECONDS
+        while self._checkouts and now - self._checkouts[0] > window:
+            self._checkouts.popleft()
+        if not self._checkouts:
+            return 0
+        return min(
+            settings.SANDBOX_POOL_MAX_SIZE,
+            max(settings.SANDBOX_POOL_MIN_SIZE, len(self._checkouts)),
+        )
+
+    async def checkout(self) -> str | None:
+        # A running pooled sandbox, or None when the caller has to create one
+        now = time.monotonic()
+        self._checkouts.append(now)
+        self._demand.set()
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+        while self._ready:
+            sandbox_id, ready_at = self._take()
+            if now - ready_at < settings.SANDBOX_POOL_MAX_IDLE_SECONDS:
+                try:
+                    running = await self.provider.is_running(sandbox_id)
+                except Exception as e:
+                    logger.warning("Pooled sandbox %s check failed: %s", sandbox_id, e)
+                    running = False
+                if running:
+                    self._hits.inc()
+                    return sandbox_id
+            self._discard(sandbox_id)
+
+        self._misses.inc()
+        return None
+
+    async def close(self) -> None:
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._refill_task
+            self._refill_task = None
+        while self._ready:
+            self._discard(self._take()[0])
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _take(self) -> tuple[str, float]:
+        self._ready_gauge.dec()
+        return self._ready.popleft()
+
+    def _discard(self, sandbox_id: str) -> None:
+        task = asyncio.create_task(self._delete(sandbox_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _delete(self, sandbox_id: str) -> None:
+        try:
+            await self.provider.delete_sandbox(sandbox_id)
+        except Exception as e:
+            logger.warning("Failed to delete pooled sandbox %s: %s", sandbox_id, e)
+
+    async def _refill(self) -> None:
+        while True:
+            self._demand.clear()
+            now = time.monotonic()
+            while (
+                self._ready
+                and now - self._ready[0][1] >= settings.SANDBOX_POOL_MAX_IDLE_SECONDS
+            ):
+                self._discard(self._take()[0])
+
+            target = self.target_size(now)
+            while len(self._ready) > target:
+                self._discard(self._take()[0])
+            if not target:
+                return
+
+            missing = min(
+                target - len(self._ready), settings.SANDBOX_POOL_REFILL_CONCURRENCY
+            )
+            if missing > 0:
+                results = await asyncio.gather(
+                    *(self._warm() for _ in range(missing)), return_exceptions=True
+                )
+                failures = [r for r in results if isinstance(r, Exception)]
+                if len(failures) < missing:
+                    continue
+                logger.warning(
+                    "Failed to refill %s sandbox pool: %s",
+                    self.provider_type,
+                    failures[0],
+                )
+
+            # Wait for the next checkout, or re-check sizes and idle ages
+            with suppress(TimeoutError):
+                async with asyncio.timeout(
+                    settings.SANDBOX_POOL_CHECK_INTERVAL_SECONDS
+                ):
+                    await self._demand.wait()
+
+    async def _warm(self) -> None:
+        sandbox_id = await self.provider.create_sandbox(
+            labels={SANDBOX_POOL_LABEL: str(int(time.time()))}
+        )
+        try:
+            await self._service.prepare_sandbox(sandbox_id)
+        except BaseException:
+            self._discard(sandbox_id)
+            raise
+        self._ready.append((sandbox_id, time.monotonic()))
+        self._ready_gauge.inc()
+
+
+class SandboxPoolManager:
+    # One SandboxPool per provider account and image in this process, using
+    # the registry's provider for that account. Pools that have gone idle are
+    # dropped when another one is created.
+    def __init__(self) -> None:
+        self._pools: dict[str, SandboxPool] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    @staticmethod
+    def enabled(provider_type: str) -> bool:
+        return (
+            settings.SANDBOX_POOL_MAX_SIZE > 0
+            and provider_type in settings.SANDBOX_POOL_PROVIDERS
+        )
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+    async def checkout(self, provider_type: str, api_key: str | None) -> str | None:
+        if not self.enabled(provider_type):
+            return None
+        key = sandbox_pool_key(provider_type, api_key)
+        pool = self._pools.get(key)
+        if pool is None:
+            for stale_key in [k for k, p in self._pools.items() if p.idle]:
+                self._spawn(self._pools.pop(stale_key).close())
+            try:
+                provider = get_sandbox_provider(provider_type, api_key=api_key)
+            except Exception as e:
+                logger.warning("Sandbox pool unavailable for %s: %s", provider_type, e)
+                return None
+            pool = self._pools[key] = SandboxPool(provider_type, provider)
+        return await pool.checkout()
+
+    async def close_all(self) -> None:
+        pools = list(self._pools.values())
+        self._pools.clear()
+        await asyncio.gather(
+            *(pool.close() for pool in pools), *self._tasks, return_exceptions=True
+        )
+
+    async def sweep(self) -> int:
+        # Deletes pooled Docker sandboxes left behind by processes that exited
+        # without close_all(): labelled, older than SANDBOX_POOL_MAX_IDLE_SECONDS
+        # and not the sandbox of any chat. Run once at startup.
+        provider_type = SandboxProviderType.DOCKER.value
+        if not self.enabled(provider_type):
+            return 0
+        try:
+            provider = get_sandbox_provider(provider_type)
+            if not isinstance(provider, LocalDockerProvider):
+                return 0
+            pooled = await provider.find_sandboxes(SANDBOX_POOL_LABEL)
+            cutoff = time.time() - settings.SANDBOX_POOL_MAX_IDLE_SECONDS
+            expired = [
+                sandbox_id
+                for sandbox_id, created_at in pooled.items()
+                if _label_time(created_at) < cutoff
+            ]
+            if not expired:
+                return 0
+            async with SessionLocal() as db:
+                result = await db.execute(
+                    select(Chat.sandbox_id).filter(Chat.sandbox_id.in_(expired))
+                )
+                taken = set(result.scalars().all())
+        except Exception as e:
+            logger.warning("Failed to look up stale pooled sandboxes: %s", e)
+            return 0
+
+        stale = [sandbox_id for sandbox_id in expired if sandbox_id not in taken]
+        await asyncio.gather(
+            *(provider.delete_sandbox(sandbox_id) for sandbox_id in stale),
+            return_exceptions=True,
+        )
+        if stale:
+            logger.info("Deleted %d stale pooled sandboxes", len(stale))
+        return len(stale)
+
+    def _spawn(self, coroutine: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+def _label_time(value: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+
+sandbox_pools = SandboxPoolManager()
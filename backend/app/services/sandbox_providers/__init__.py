@@ -4,6 +4,11 @@ from app.services.sandbox_providers.factory import (
     create_docker_config,
     create_sandbox_provider,
 )
+from app.services.sandbox_providers.registry import (
+    get_sandbox_provider,
+    provider_registry,
+    sandbox_api_key,
+)
 from app.services.sandbox_providers.types import (
     CheckpointInfo,
     CommandResult,
@@ -23,6 +28,9 @@ __all__ = [
     "LocalDockerProvider",
     "create_docker_config",
     "create_sandbox_provider",
+    "get_sandbox_provider",
+    "provider_registry",
+    "sandbox_api_key",
     "SandboxProviderType",
     "CommandResult",
     "FileMetadata",
@@ -3,9 +3,10 @@ import base64
 import logging
 import shlex
 from abc import ABC, abstractmethod
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path, PurePosixPath
-from typing import Any, Awaitable, Callable, TypeVar
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
 
 import posixpath
 
@@ -17,6 +18,7 @@ from app.constants import (
     SANDBOX_RESTORE_EXCLUDE_PATTERNS,
     SANDBOX_SYSTEM_VARIABLES,
 )
+from app.core.config import get_settings
 from app.services.sandbox_providers.types import (
     CheckpointInfo,
     CommandResult,
@@ -31,8 +33,14 @@ from app.services.sandbox_providers.types import (
 
 logger = logging.getLogger(__name__)
 
+settings = get_settings()
+
 T = TypeVar("T")
 
+# SDK sandbox handles kept by a provider; providers are long-lived (see
+# registry.py), so the oldest are dropped beyond this many
+SANDBOX_HANDLE_CACHE_SIZE = 256
+
 LISTENING_PORTS_COMMAND = "ss -tuln | grep LISTEN | awk '{print $5}' | sed 's/.*://g' | grep -E '^[0-9]+$' | sort -u"
 
 
@@ -81,6 +89,29 @@ class SandboxProvider(ABC):
         except asyncio.TimeoutError:
             raise TimeoutError(error_msg or f"Operation timed out after {timeout}s")
 
+    @staticmethod
+    async def _gather_bounded(
+        operations: Iterable[Awaitable[T]],
+    ) -> list[T | BaseException]:
+        # At most SANDBOX_FILE_TRANSFER_CONCURRENCY operations in flight;
+        # results (or exceptions) in order
+        semaphore = asyncio.Semaphore(settings.SANDBOX_FILE_TRANSFER_CONCURRENCY)
+
+        async def run(operation: Awaitable[T]) -> T:
+            async with semaphore:
+                return await operation
+
+        return await asyncio.gather(
+            *(run(operation) for operation in operations), return_exceptions=True
+        )
+
+    async def _make_parent_dirs(self, sandbox_id: str, paths: Iterable[str]) -> None:
+        parents = sorted({posixpath.dirname(self.normalize_path(p)) for p in paths})
+        if parents:
+            await self.execute_command(
+                sandbox_id, f"mkdir -p -- {shlex.join(parents)}", timeout=30
+            )
+
     @staticmethod
     def _parse_listening_ports(stdout: str) -> set[int]:
         return {int(p) for p in stdout.strip().splitlines() if p.isdigit()}
@@ -124,6 +155,13 @@ class SandboxProvider(ABC):
 
         return deleted_count
 
+    @staticmethod
+    def _cache_handle(handles: OrderedDict[str, T], sandbox_id: str, handle: T) -> None:
+        handles[sandbox_id] = handle
+        handles.move_to_end(sandbox_id)
+        while len(handles) > SANDBOX_HANDLE_CACHE_SIZE:
+            handles.popitem(last=False)
+
     def _get_pty_session(
         self, sandbox_id: str, session_id: str
     ) -> dict[str, Any] | None:
@@ -145,7 +183,9 @@ class SandboxProvider(ABC):
             logger.error("Error cleaning up PTY session %s: %s", session_id, e)
 
     @abstractmethod
-    async def create_sandbox(self) -> str:
+    async def create_sandbox(self, labels: dict[str, str] | None = None) -> str:
+        # labels are attached to the sandbox where the provider supports it
+        # (Docker labels, E2B metadata, Modal tags)
         pass
 
     @abstractmethod
@@ -195,6 +235,40 @@ class SandboxProvider(ABC):
     ) -> FileContent:
         pass
 
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+    ) -> None:
+        # Missing parent directories are created in one command, then the
+        # files are written in parallel
+        if not files:
+            return
+        await self._make_parent_dirs(sandbox_id, files)
+        results = await self._gather_bounded(
+            self.write_file(sandbox_id, path, content)
+            for path, content in files.items()
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
+    async def read_files(
+        self,
+        sandbox_id: str,
+        paths: list[str],
+    ) -> dict[str, FileContent]:
+        # Keyed by the requested path; files that could not be read (missing,
+        # directories) are left out
+        results = await self._gather_bounded(
+            self.read_file(sandbox_id, path) for path in paths
+        )
+        return {
+            path: result
+            for path, result in zip(paths, results, strict=True)
+            if isinstance(result, FileContent)
+        }
+
     async def list_files(
         self,
         sandbox_id: str,
@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, TypeVar
+
+from app.core.config import get_settings
+from app.core.metrics import DOCKER_EXECUTOR_ACTIVE, DOCKER_EXECUTOR_QUEUE_DEPTH
+from app.services.sandbox_providers.docker_events import (
+    DockerEvents,
+    get_docker_events,
+)
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DockerConnectionError(Exception):
+    pass
+
+
+class InstrumentedExecutor(ThreadPoolExecutor):
+    # Reports how many submitted calls are waiting for a thread and how many
+    # are running, per pool, so saturation of the shared pools is visible
+    def __init__(self, pool: str, max_workers: int) -> None:
+        super().__init__(max_workers=max_workers, thread_name_prefix=f"docker-{pool}")
+        self._queued = DOCKER_EXECUTOR_QUEUE_DEPTH.labels(pool=pool)
+        self._active = DOCKER_EXECUTOR_ACTIVE.labels(pool=pool)
+
+    def submit(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> Future[T]:
+        queued, active = self._queued, self._active
+
+        def run() -> T:
+            queued.dec()
+            active.inc()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                active.dec()
+
+        queued.inc()
+        try:
+            future = super().submit(run)
+        except BaseException:
+            queued.dec()
+            raise
+        # Cancelled before a thread picked it up
+        future.add_done_callback(lambda f: queued.dec() if f.cancelled() else None)
+        return future
+
+
+class DockerConnectionManager:
+    # Everything the Docker providers and transports need to talk to one
+    # daemon, shared by the whole process: a single DockerClient (and so one
+    # HTTP connection pool), a bounded executor for API calls, a separate pool
+    # for blocking socket reads that can wait indefinitely (PTY output, exec
+    # output on sockets the event loop cannot poll) so they never starve API
+    # calls, and handles of containers known to be running. A cached handle is
+    # dropped when the daemon's shared events stream (get_docker_events)
+    # reports the container died, was paused or removed; while that stream is
+    # up handles are trusted for DOCKER_CONTAINER_STATE_TTL_SECONDS, otherwise
+    # (and as a fallback for missed events) for
+    # DOCKER_CONTAINER_CACHE_TTL_SECONDS.
+    def __init__(self, host: str | None) -> None:
+        self._host = host
+        self._lock = threading.Lock()
+        self._client: Any = None
+        self._executor: InstrumentedExecutor | None = None
+        self._stream_executor: InstrumentedExecutor | None = None
+        self._containers: dict[str, tuple[Any, float]] = {}
+        # Bumped on every invalidation, so a lookup that raced with one is
+        # not cached
+        self._generation = 0
+        self._events: DockerEvents | None = None
+
+    @property
+    def client(self) -> Any:
+        with self._lock:
+            if self._client is None:
+                try:
+                    import docker
+
+                    pool_size = settings.DOCKER_EXECUTOR_MAX_WORKERS
+                    if self._host:
+                        self._client = docker.DockerClient(
+                            base_url=self._host, max_pool_size=pool_size
+                        )
+                    else:
+                        self._client = docker.from_env(max_pool_size=pool_size)
+                except ImportError:
+                    raise DockerConnectionError(
+                        "Docker SDK not installed. Run: pip install docker"
+                    )
+                except Exception as e:
+                    raise DockerConnectionError(f"Failed to connect to Docker: {e}")
+            return self._client
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = InstrumentedExecutor(
+                    "api", settings.DOCKER_EXECUTOR_MAX_WORKERS
+                )
+            return self._executor
+
+    @property
+    def stream_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._stream_executor is None:
+                self._stream_executor = InstrumentedExecutor(
+                    "stream", settings.DOCKER_STREAM_EXECUTOR_MAX_WORKERS
+                )
+            return self._stream_executor
+
+    def cached_container(self, sandbox_id: str) -> Any | None:
+        # Non-blocking: the handle of a container known to be running, if any
+        events = self._events
+        ttl = (
+            settings.DOCKER_CONTAINER_STATE_TTL_SECONDS
+            if events is not None and events.connected
+            else settings.DOCKER_CONTAINER_CACHE_TTL_SECONDS
+        )
+        with self._lock:
+            cached = self._containers.get(sandbox_id)
+        if cached is None or time.monotonic() - cached[1] >= ttl:
+            return None
+        return cached[0]
+
+    def get_container(self, sandbox_id: str, ensure_running: bool = True) -> Any:
+        # Blocking; run it on the executor unless cached_container() had it
+        cached = self.cached_container(sandbox_id)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            generation = self._generation
+        container = self.client.containers.get(f"claudex-sandbox-{sandbox_id}")
+        if container.status != "running":
+            if not ensure_running:
+                return container
+            container.start()
+            container.reload()
+        self._cache(sandbox_id, container, generation)
+        return container
+
+    def cache_container(self, sandbox_id: str, container: Any) -> None:
+        with self._lock:
+            generation = self._generation
+        self._cache(sandbox_id, container, generation)
+
+    def _cache(self, sandbox_id: str, container: Any, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._containers[sandbox_id] = (container, time.monotonic())
+            events = None
+            if self._events is None and settings.DOCKER_CONTAINER_STATE_TTL_SECONDS:
+                self._events = events = get_docker_events(self._host)
+        if events is not None:
+            events.add_listener(self.invalidate)
+
+    def invalidate(self, sandbox_id: str | None) -> None:
+        # None drops every handle
+        with self._lock:
+            self._generation += 1
+            if sandbox_id is None:
+                self._containers.clear()
+            else:
+                self._containers.pop(sandbox_id, None)
+
+    def close(self) -> None:
+        with self._lock:
+            client, self._client = self._client, None
+            executors = (self._executor, self._stream_executor)
+            self._executor = self._stream_executor = None
+            events, self._events = self._events, None
+            self._containers.clear()
+        if events is not None:
+            events.remove_listener(self.invalidate)
+        for executor in executors:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+        if client is not None:
+            try:
+                client.close()
+            except Exception as e:
+                logger.debug("Error closing Docker client: %s", e)
+
+
+_connections: dict[str | None, DockerConnectionManager] = {}
+_connections_lock = threading.Lock()
+
+
+def get_docker_connections(host: str | None) -> DockerConnectionManager:
+    with _connections_lock:
+        connections = _connections.get(host)
+        if connections is None:
+            connections = _connections[host] = DockerConnectionManager(host)
+        return connections
+
+
+def close_docker_connections() -> None:
+    with _connections_lock:
+        managers = list(_connections.values())
+        _connections.clear()
+    for manager in managers:
+        manager.close()
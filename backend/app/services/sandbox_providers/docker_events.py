@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+EVENTS_RECONNECT_DELAY_SECONDS = 1.0
+# Lifecycle events after which a container can no longer run execs
+CONTAINER_STOPPED_EVENTS = ("die", "destroy", "pause")
+SANDBOX_CONTAINER_PREFIX = "claudex-sandbox-"
+
+
+class DockerEvents:
+    # A single Docker events subscription per daemon, shared by everything in
+    # the process: exec_die resolves the future a transport registered for its
+    # exec id, and die/destroy/pause of a sandbox container is reported to the
+    # listeners as on_stopped(sandbox_id). on_stopped(None) means events may
+    # have been missed (the stream is connecting or went down), so anything
+    # derived from them should be dropped; connected is only true while the
+    # stream is up. The stream is consumed by a daemon thread (docker-py only
+    # offers a blocking generator) that exits when nobody is waiting or
+    # listening, and is restarted by the next wait() or add_listener().
+    def __init__(self, host: str | None) -> None:
+        self._host = host
+        self._lock = threading.Lock()
+        self._waiters: dict[
+            str, tuple[asyncio.AbstractEventLoop, asyncio.Future[int | None]]
+        ] = {}
+        self._listeners: list[Callable[[str | None], None]] = []
+        self._thread: threading.Thread | None = None
+        self._stream: Any = None
+        self.connected = False
+
+    def wait(self, exec_id: str) -> asyncio.Future[int | None]:
+        # Resolves with the exit code from the event, or None when the daemon
+        # does not report one and the caller has to inspect the exec
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[int | None] = loop.create_future()
+        with self._lock:
+            self._waiters[exec_id] = (loop, future)
+            self._start_consumer()
+        return future
+
+    def discard(self, exec_id: str) -> None:
+        with self._lock:
+            self._waiters.pop(exec_id, None)
+
+    def add_listener(self, on_stopped: Callable[[str | None], None]) -> None:
+        with self._lock:
+            self._listeners.append(on_stopped)
+            self._start_consumer()
+
+    def remove_listener(self, on_stopped: Callable[[str | None], None]) -> None:
+        with self._lock:
+            if on_stopped in self._listeners:
+                self._listeners.remove(on_stopped)
+            # Nothing left to deliver: unblock the thread so it exits
+            stream = self._stream if self._idle() else None
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def _idle(self) -> bool:
+        return not self._waiters and not self._listeners
+
+    def _start_consumer(self) -> None:
+        # Called with the lock held
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._consume, name="docker-events", daemon=True
+            )
+            self._thread.start()
+
+    def _client(self) -> Any:
+        import docker
+
+        if self._host:
+            return docker.DockerClient(base_url=self._host)
+        return docker.from_env()
+
+    def _consume(self) -> None:
+        while True:
+            with self._lock:
+                if self._idle():
+                    self._thread = None
+                    return
+            client = None
+            stream = None
+            try:
+                client = self._client()
+                stream = client.events(
+                    decode=True,
+                    filters={
+                        "type": "container",
+                        "event": ["exec_die", *CONTAINER_STOPPED_EVENTS],
+                    },
+                )
+                with self._lock:
+                    self._stream = stream
+                # Anything that happened before the stream was up is unknown
+                self._notify(None)
+                self.connected = True
+                for event in stream:
+                    self._dispatch(event)
+                    with self._lock:
+                        if self._idle():
+                            break
+            except Exception as e:
+                with self._lock:
+                    idle = self._idle()
+                if not idle:
+                    logger.warning("Docker events stream interrupted: %s", e)
+                    time.sleep(EVENTS_RECONNECT_DELAY_SECONDS)
+            finally:
+                self.connected = False
+                self._notify(None)
+                with self._lock:
+                    if self._stream is stream:
+                        self._stream = None
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+                if client is not None:
+                    try:
+                        client.close()
+                    except Exception:
+                        pass
+
+    def _notify(self, sandbox_id: str | None) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for on_stopped in listeners:
+            on_stopped(sandbox_id)
+
+    def _dispatch(self, event: dict[str, Any]) -> None:
+        attributes = (event.get("Actor") or {}).get("Attributes") or {}
+        if event.get("Action", event.get("status")) in CONTAINER_STOPPED_EVENTS:
+            name = attributes.get("name") or ""
+            if name.startswith(SANDBOX_CONTAINER_PREFIX):
+                self._notify(name.removeprefix(SANDBOX_CONTAINER_PREFIX))
+            return
+
+        exec_id = attributes.get("execID")
+        if not exec_id:
+            return
+        with self._lock:
+            waiter = self._waiters.pop(exec_id, None)
+        if waiter is None:
+            return
+
+        exit_code: int | None
+        try:
+            exit_code = int(attributes["exitCode"])
+        except (KeyError, TypeError, ValueError):
+            exit_code = None
+
+        loop, future = waiter
+
+        def resolve() -> None:
+            if not future.done():
+                future.set_result(exit_code)
+
+        try:
+            loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            # The waiting loop has already been closed
+            pass
+
+
+_events: dict[str | None, DockerEvents] = {}
+_events_lock = threading.Lock()
+
+
+def get_docker_events(host: str | None) -> DockerEvents:
+    with _events_lock:
+        events = _events.get(host)
+        if events is None:
+            events = _events[host] = DockerEvents(host)
+        return events
@@ -1,10 +1,9 @@
 import asyncio
 import io
 import logging
-import shlex
 import tarfile
+import time
 import uuid
-from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any
 
@@ -16,6 +15,11 @@ from app.constants import (
 )
 from app.services.exceptions import SandboxException
 from app.services.sandbox_providers.base import LISTENING_PORTS_COMMAND, SandboxProvider
+from app.services.sandbox_providers.docker_connections import (
+    DockerConnectionError,
+    get_docker_connections,
+)
+from app.services.sandbox_providers.docker_events import SANDBOX_CONTAINER_PREFIX
 from app.services.sandbox_providers.types import (
     CommandResult,
     DockerConfig,
@@ -28,32 +32,24 @@ from app.services.sandbox_providers.types import (
 
 logger = logging.getLogger(__name__)
 
+# Paths per tar exec in read_files, well under the argument length limit
+READ_FILES_CHUNK_SIZE = 500
+
 
 class LocalDockerProvider(SandboxProvider):
     def __init__(self, config: DockerConfig) -> None:
         self.config = config
-        self._executor = ThreadPoolExecutor(max_workers=10)
-        self._containers: dict[str, Any] = {}
+        # Client, executors and container handles are shared process-wide
+        self._docker = get_docker_connections(config.host)
+        self._executor = self._docker.executor
         self._pty_sessions: dict[str, dict[str, Any]] = {}
         self._port_mappings: dict[str, dict[int, int]] = {}
-        self._docker_client: Any = None
 
     def _get_docker_client(self) -> Any:
-        if self._docker_client is None:
-            try:
-                import docker
-
-                if self.config.host:
-                    self._docker_client = docker.DockerClient(base_url=self.config.host)
-                else:
-                    self._docker_client = docker.from_env()
-            except ImportError:
-                raise SandboxException(
-                    "Docker SDK not installed. Run: pip install docker"
-                )
-            except Exception as e:
-                raise SandboxException(f"Failed to connect to Docker: {e}")
-        return self._docker_client
+        try:
+            return self._docker.client
+        except DockerConnectionError as e:
+            raise SandboxException(str(e))
 
     def _build_traefik_labels(self, sandbox_id: str) -> dict[str, str]:
         """
@@ -97,15 +93,17 @@ class LocalDockerProvider(SandboxProvider):
 
         return labels
 
-    def _create_container(self, sandbox_id: str) -> Any:
+    def _create_container(
+        self, sandbox_id: str, extra_labels: dict[str, str] | None = None
+    ) -> Any:
         client = self._get_docker_client()
-        labels = self._build_traefik_labels(sandbox_id)
+        labels = {**self._build_traefik_labels(sandbox_id), **(extra_labels or {})}
         network = self.config.traefik_network or self.config.network
 
         container = client.containers.run(
             self.config.image,
             command="/bin/bash",
-            name=f"claudex-sandbox-{sandbox_id}",
+            name=f"{SANDBOX_CONTAINER_PREFIX}{sandbox_id}",
             hostname="sandbox",
             user="user",
             working_dir=self.config.user_home,
@@ -127,15 +125,15 @@ class LocalDockerProvider(SandboxProvider):
         )
         return container
 
-    async def create_sandbox(self) -> str:
+    async def create_sandbox(self, labels: dict[str, str] | None = None) -> str:
         loop = asyncio.get_running_loop()
         sandbox_id = str(uuid.uuid4())[:12]
 
         try:
             container = await loop.run_in_executor(
-                self._executor, lambda: self._create_container(sandbox_id)
+                self._executor, lambda: self._create_container(sandbox_id, labels)
             )
-            self._containers[sandbox_id] = container
+            self._docker.cache_container(sandbox_id, container)
 
             port_map = await loop.run_in_executor(
                 self._executor, lambda: self._extract_port_mappings(container)
@@ -168,67 +166,78 @@ class LocalDockerProvider(SandboxProvider):
         return bool(container.status == "running")
 
     def _get_container_by_id(self, sandbox_id: str) -> Any | None:
-        client = self._get_docker_client()
+        self._get_docker_client()
         try:
-            return client.containers.get(f"claudex-sandbox-{sandbox_id}")
+            return self._docker.get_container(sandbox_id, ensure_running=False)
         except Exception:
             return None
 
     async def connect_sandbox(self, sandbox_id: str) -> bool:
-        if sandbox_id in self._containers:
-            container = self._containers[sandbox_id]
-            loop = asyncio.get_running_loop()
-
-            is_running = await loop.run_in_executor(
-                self._executor, lambda: self._is_container_running(container)
-            )
-            if is_running:
-                return True
-            del self._containers[sandbox_id]
-
         loop = asyncio.get_running_loop()
 
         container = await loop.run_in_executor(
             self._executor, lambda: self._get_container_by_id(sandbox_id)
         )
-        if container:
-            self._containers[sandbox_id] = container
+        if not container:
+            return False
+
+        if sandbox_id not in self._port_mappings:
             port_mappings = await loop.run_in_executor(
                 self._executor, lambda: self._extract_port_mappings(container)
             )
             self._port_mappings[sandbox_id] = port_mappings
-            return True
-
-        return False
+        return True
 
     async def delete_sandbox(self, sandbox_id: str) -> None:
-        container = self._containers.get(sandbox_id)
-
-        if not container:
-            try:
-                container = await self._find_container_by_name(sandbox_id)
-            except Exception:
-                return
+        try:
+            container = await self._find_container_by_name(sandbox_id)
+        except Exception:
+            self._docker.invalidate(sandbox_id)
+            return
 
         await self._destroy_container(container)
+        self._docker.invalidate(sandbox_id)
         await self._cleanup_docker_resources()
 
-        if sandbox_id in self._containers:
-            del self._containers[sandbox_id]
         if sandbox_id in self._port_mappings:
             del self._port_mappings[sandbox_id]
 
         logger.info("Successfully deleted Docker sandbox %s", sandbox_id)
 
+    def _list_labeled_containers(self, label: str) -> dict[str, str]:
+        client = self._get_docker_client()
+        containers = client.containers.list(all=True, filters={"label": label})
+        return {
+            container.name.removeprefix(SANDBOX_CONTAINER_PREFIX): container.labels[
+                label
+            ]
+            for container in containers
+            if container.name.startswith(SANDBOX_CONTAINER_PREFIX)
+        }
+
+    async def find_sandboxes(self, label: str) -> dict[str, str]:
+        # Sandboxes created with the label, mapped to its value
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, lambda: self._list_labeled_containers(label)
+        )
+
     async def is_running(self, sandbox_id: str) -> bool:
-        container = self._containers.get(sandbox_id)
+        if self._docker.cached_container(sandbox_id) is not None:
+            return True
+        loop = asyncio.get_running_loop()
+        container = await loop.run_in_executor(
+            self._executor, lambda: self._get_container_by_id(sandbox_id)
+        )
         if not container:
             return False
 
-        loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(
+        running = await loop.run_in_executor(
             self._executor, lambda: self._is_container_running(container)
         )
+        if not running:
+            self._docker.invalidate(sandbox_id)
+        return running
 
     def _run_command(
         self,
@@ -264,35 +273,50 @@ class LocalDockerProvider(SandboxProvider):
 
         effective_timeout = timeout or SANDBOX_DEFAULT_COMMAND_TIMEOUT
 
-        exit_code, output = await self._execute_with_timeout(
-            loop.run_in_executor(
-                self._executor,
-                lambda: self._run_command(container, command, env_list, background),
-            ),
-            effective_timeout,
-            f"Command execution timed out after {effective_timeout}s",
-        )
+        try:
+            exit_code, output = await self._execute_with_timeout(
+                loop.run_in_executor(
+                    self._executor,
+                    lambda: self._run_command(container, command, env_list, background),
+                ),
+                effective_timeout,
+                f"Command execution timed out after {effective_timeout}s",
+            )
+        except Exception:
+            # The container may have stopped before its event arrived
+            self._docker.invalidate(sandbox_id)
+            raise
 
         output_str = output.decode("utf-8", errors="replace")
         return CommandResult(stdout=output_str, stderr="", exit_code=exit_code)
 
-    def _write_container_file(
-        self,
-        container: Any,
-        normalized_path: str,
-        content_bytes: bytes,
-    ) -> None:
+    @staticmethod
+    def _write_container_files(container: Any, files: dict[str, bytes]) -> None:
+        # One archive extracted at / for every file (keyed by normalized path),
+        # after creating their parent directories as the container user, who
+        # also owns the files
+        parents = sorted({str(Path(path).parent) for path in files})
+        result = container.exec_run(
+            ["sh", "-c", 'mkdir -p -- "$@" && id -u && id -g', "sh", *parents]
+        )
+        if result.exit_code != 0:
+            raise SandboxException(
+                "Failed to create parent directories: "
+                + (result.output or b"").decode("utf-8", errors="replace").strip()
+            )
+        ids = result.output.split()
+        uid, gid = int(ids[0]), int(ids[1])
+
         tar_stream = io.BytesIO()
+        mtime = int(time.time())
         with tarfile.open(fileobj=tar_stream, mode="w") as tar:
-            file_data = io.BytesIO(content_bytes)
-            info = tarfile.TarInfo(name=Path(normalized_path).name)
-            info.size = len(content_bytes)
-            tar.addfile(info, file_data)
-        tar_stream.seek(0)
-
-        parent_dir = str(Path(normalized_path).parent)
-        container.exec_run(f"mkdir -p {shlex.quote(parent_dir)}")
-        container.put_archive(parent_dir, tar_stream.read())
+            for normalized_path, content_bytes in files.items():
+                info = tarfile.TarInfo(name=normalized_path.lstrip("/"))
+                info.size = len(content_bytes)
+                info.mtime = mtime
+                info.uid, info.gid = uid, gid
+                tar.addfile(info, io.BytesIO(content_bytes))
+        container.put_archive("/", tar_stream.getvalue())
 
     async def write_file(
         self,
@@ -300,20 +324,27 @@ class LocalDockerProvider(SandboxProvider):
         path: str,
         content: str | bytes,
     ) -> None:
+        await self.write_files(sandbox_id, {path: content})
+
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+    ) -> None:
+        if not files:
+            return
         container = await self._get_container(sandbox_id)
-        normalized_path = self.normalize_path(path)
         loop = asyncio.get_running_loop()
-
-        if isinstance(content, str):
-            content_bytes = content.encode("utf-8")
-        else:
-            content_bytes = content
+        archive_files = {
+            self.normalize_path(path): (
+                content.encode("utf-8") if isinstance(content, str) else content
+            )
+            for path, content in files.items()
+        }
 
         await loop.run_in_executor(
             self._executor,
-            lambda: self._write_container_file(
-                container, normalized_path, content_bytes
-            ),
+            lambda: self._write_container_files(container, archive_files),
         )
 
     def _read_container_file(self, container: Any, normalized_path: str) -> bytes:
@@ -355,6 +386,86 @@ class LocalDockerProvider(SandboxProvider):
             is_binary=is_binary,
         )
 
+    @staticmethod
+    def _read_container_files(
+        container: Any, normalized_paths: list[str]
+    ) -> dict[str, bytes]:
+        # One tar of the regular files among the paths (symlinks followed),
+        # streamed out of a single exec. It runs as root, as get_archive does,
+        # so files the sandbox user cannot read are still returned. Missing
+        # paths are skipped by tar, which then exits with 1 or 2 but still
+        # writes the archive; no archive or any other status means tar failed
+        result = container.exec_run(
+            [
+                "tar",
+                "-chf",
+                "-",
+                "--no-recursion",
+                "-C",
+                "/",
+                "--",
+                *(path.lstrip("/") for path in normalized_paths),
+            ],
+            demux=True,
+            user="root",
+        )
+        stdout, stderr = result.output or (None, None)
+        if result.exit_code not in (0, 1, 2) or (result.exit_code and not stdout):
+            raise SandboxException(
+                f"Failed to read files (tar exited with {result.exit_code}): "
+                + (stderr or b"").decode("utf-8", errors="replace").strip()
+            )
+        contents: dict[str, bytes] = {}
+        if not stdout:
+            return contents
+        with tarfile.open(fileobj=io.BytesIO(stdout), mode="r") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                f = tar.extractfile(member)
+                if f:
+                    contents[f"/{member.name}"] = f.read()
+        return contents
+
+    async def read_files(
+        self,
+        sandbox_id: str,
+        paths: list[str],
+    ) -> dict[str, FileContent]:
+        if not paths:
+            return {}
+        container = await self._get_container(sandbox_id)
+        loop = asyncio.get_running_loop()
+        normalized = {path: self.normalize_path(path) for path in paths}
+        unique_paths = sorted(set(normalized.values()))
+        chunks = [
+            unique_paths[i : i + READ_FILES_CHUNK_SIZE]
+            for i in range(0, len(unique_paths), READ_FILES_CHUNK_SIZE)
+        ]
+
+        async def read_chunk(chunk: list[str]) -> dict[str, bytes]:
+            return await loop.run_in_executor(
+                self._executor, lambda: self._read_container_files(container, chunk)
+            )
+
+        results = await self._gather_bounded(read_chunk(chunk) for chunk in chunks)
+        contents: dict[str, bytes] = {}
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            contents.update(result)
+
+        files: dict[str, FileContent] = {}
+        for path, normalized_path in normalized.items():
+            content_bytes = contents.get(normalized_path)
+            if content_bytes is None:
+                continue
+            content, is_binary = self._encode_file_content(path, content_bytes)
+            files[path] = FileContent(
+                path=path, content=content, type="file", is_binary=is_binary
+            )
+        return files
+
     def _create_pty_exec(self, container: Any) -> tuple[dict[str, Any], Any]:
         exec_id = container.client.api.exec_create(
             container.id,
@@ -431,7 +542,11 @@ class LocalDockerProvider(SandboxProvider):
 
         try:
             while True:
-                data = await loop.run_in_executor(self._executor, read_socket)
+                # Blocks until the shell prints something, so it runs on the
+                # stream pool rather than holding an API thread
+                data = await loop.run_in_executor(
+                    self._docker.stream_executor, read_socket
+                )
                 if data is None or len(data) == 0:
                     break
                 await on_data(data)
@@ -531,7 +646,9 @@ class LocalDockerProvider(SandboxProvider):
             listening_ports=mapped_ports,
             url_builder=(
                 (
-                    lambda port: f"https://sandbox-{sandbox_id}-{port}.{self.config.sandbox_domain}"
+                    lambda port: (
+                        f"https://sandbox-{sandbox_id}-{port}.{self.config.sandbox_domain}"
+                    )
                 )
                 if self.config.sandbox_domain
                 else (lambda port: f"{self.config.preview_base_url}:{port_map[port]}")
@@ -540,11 +657,11 @@ class LocalDockerProvider(SandboxProvider):
         )
 
     async def _find_container_by_name(self, sandbox_id: str) -> Any:
-        client = self._get_docker_client()
+        self._get_docker_client()
         loop = asyncio.get_running_loop()
         return await loop.run_in_executor(
             self._executor,
-            lambda: client.containers.get(f"claudex-sandbox-{sandbox_id}"),
+            lambda: self._docker.get_container(sandbox_id, ensure_running=False),
         )
 
     async def _destroy_container(self, container: Any) -> None:
@@ -577,25 +694,26 @@ class LocalDockerProvider(SandboxProvider):
         except Exception:
             pass
 
-    @staticmethod
-    def _ensure_running(container: Any) -> None:
-        container.reload()
-        if container.status != "running":
-            container.start()
-
     async def _get_container(self, sandbox_id: str) -> Any:
-        if sandbox_id not in self._containers:
+        if sandbox_id not in self._port_mappings:
             connected = await self.connect_sandbox(sandbox_id)
             if not connected:
                 raise SandboxException(f"Container {sandbox_id} not found")
 
-        container = self._containers[sandbox_id]
-        loop = asyncio.get_running_loop()
+        # A container known to be running goes straight to the caller's exec
+        container = self._docker.cached_container(sandbox_id)
+        if container is not None:
+            return container
 
-        await loop.run_in_executor(
-            self._executor, lambda: self._ensure_running(container)
-        )
-        return container
+        # Otherwise looked up and started if needed
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                self._executor, lambda: self._docker.get_container(sandbox_id)
+            )
+        except Exception:
+            self._docker.invalidate(sandbox_id)
+            raise
 
     async def get_ide_url(self, sandbox_id: str) -> str | None:
         if self.config.sandbox_domain:
@@ -634,7 +752,7 @@ class LocalDockerProvider(SandboxProvider):
         container = client.containers.run(
             image,
             command="/bin/bash",
-            name=f"claudex-sandbox-{sandbox_id}",
+            name=f"{SANDBOX_CONTAINER_PREFIX}{sandbox_id}",
             hostname="sandbox",
             user="user",
             working_dir=self.config.user_home,
@@ -672,7 +790,7 @@ class LocalDockerProvider(SandboxProvider):
                 self._executor,
                 lambda: self._create_container_from_image(new_sandbox_id, temp_image),
             )
-            self._containers[new_sandbox_id] = new_container
+            self._docker.cache_container(new_sandbox_id, new_container)
 
             port_map = await loop.run_in_executor(
                 self._executor, lambda: self._extract_port_mappings(new_container)
@@ -684,8 +802,7 @@ class LocalDockerProvider(SandboxProvider):
 
             return new_sandbox_id
         except Exception:
-            if new_sandbox_id in self._containers:
-                del self._containers[new_sandbox_id]
+            self._docker.invalidate(new_sandbox_id)
             if new_sandbox_id in self._port_mappings:
                 del self._port_mappings[new_sandbox_id]
             if new_container is not None:
@@ -705,8 +822,5 @@ class LocalDockerProvider(SandboxProvider):
                 pass
 
     async def cleanup(self) -> None:
+        # The shared client and executors outlive this provider
         await super().cleanup()
-        self._executor.shutdown(wait=False)
-        if self._docker_client:
-            self._docker_client.close()
-            self._docker_client = None
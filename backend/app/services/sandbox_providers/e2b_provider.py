@@ -1,5 +1,6 @@
 import logging
 import uuid
+from collections import OrderedDict
 from typing import Any, Callable
 
 from e2b import AsyncSandbox
@@ -37,6 +38,8 @@ settings = get_settings()
 
 MAX_RETRIES = 3
 RETRY_BASE_DELAY = 1.0
+# Files per multipart upload in write_files
+WRITE_FILES_BATCH_SIZE = 100
 
 E2B_SYSTEM_VARIABLES = SANDBOX_SYSTEM_VARIABLES + ["E2B_SANDBOX"]
 
@@ -66,13 +69,13 @@ def normalize_e2b_pty_data(data: Any) -> bytes:
 class E2BSandboxProvider(SandboxProvider):
     def __init__(self, api_key: str) -> None:
         self.api_key = api_key
-        self._active_sandboxes: dict[str, AsyncSandbox] = {}
+        self._active_sandboxes: OrderedDict[str, AsyncSandbox] = OrderedDict()
         self._pty_sessions: dict[str, dict[str, Any]] = {}
 
     def _get_system_variables(self) -> list[str]:
         return E2B_SYSTEM_VARIABLES
 
-    async def create_sandbox(self) -> str:
+    async def create_sandbox(self, labels: dict[str, str] | None = None) -> str:
         try:
             sandbox = await self._retry_operation(
                 AsyncSandbox.create,
@@ -80,6 +83,7 @@ class E2BSandboxProvider(SandboxProvider):
                 api_key=self.api_key,
                 template=settings.E2B_TEMPLATE_ID,
                 auto_pause=True,
+                metadata=labels,
             )
         except Exception as e:
             error_msg = str(e)
@@ -94,7 +98,7 @@ class E2BSandboxProvider(SandboxProvider):
                 error_code=ErrorCode.SANDBOX_CREATE_FAILED,
             )
 
-        self._active_sandboxes[sandbox.sandbox_id] = sandbox
+        self._cache_handle(self._active_sandboxes, sandbox.sandbox_id, sandbox)
         return str(sandbox.sandbox_id)
 
     async def connect_sandbox(self, sandbox_id: str) -> bool:
@@ -111,7 +115,7 @@ class E2BSandboxProvider(SandboxProvider):
             auto_pause=True,
             timeout=SANDBOX_AUTO_PAUSE_TIMEOUT,
         )
-        self._active_sandboxes[sandbox_id] = sandbox
+        self._cache_handle(self._active_sandboxes, sandbox_id, sandbox)
         return True
 
     async def delete_sandbox(self, sandbox_id: str) -> None:
@@ -200,6 +204,33 @@ class E2BSandboxProvider(SandboxProvider):
         normalized_path = self.normalize_path(path)
         await self._retry_operation(sandbox.files.write, normalized_path, content)
 
+    async def write_files(
+        self,
+        sandbox_id: str,
+        files: dict[str, str | bytes],
+    ) -> None:
+        # envd accepts many files in one multipart upload and creates their
+        # parent directories; batches are uploaded in parallel
+        if not files:
+            return
+        sandbox = await self._get_sandbox(sandbox_id)
+        # Plain dicts: this SDK version reads entries as file["path"] and
+        # file["data"], which its WriteEntry dataclass does not support
+        entries: list[Any] = [
+            {"path": self.normalize_path(path), "data": content}
+            for path, content in files.items()
+        ]
+        batches = [
+            entries[i : i + WRITE_FILES_BATCH_SIZE]
+            for i in range(0, len(entries), WRITE_FILES_BATCH_SIZE)
+        ]
+        results = await self._gather_bounded(
+            self._retry_operation(sandbox.files.write, batch) for batch in batches
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+
     async def read_file(
         self,
         sandbox_id: str,
@@ -365,7 +396,7 @@ class E2BSandboxProvider(SandboxProvider):
             auto_pause=True,
             timeout=SANDBOX_AUTO_PAUSE_TIMEOUT,
         )
-        self._active_sandboxes[sandbox_id] = sandbox
+        self._cache_handle(self._active_sandboxes, sandbox_id, sandbox)
         return sandbox
 
     async def _retry_operation(
@@ -2,6 +2,7 @@ import asyncio
 import logging
 import os
 import uuid
+from collections import OrderedDict
 from typing import Any, Callable
 
 import modal
@@ -66,7 +67,7 @@ RETRY_CONFIG: dict[str, Any] = {
 class ModalSandboxProvider(SandboxProvider):
     def __init__(self, api_key: str) -> None:
         self.api_key = api_key
-        self._active_sandboxes: dict[str, modal.Sandbox] = {}
+        self._active_sandboxes: OrderedDict[str, modal.Sandbox] = OrderedDict()
         self._pty_sessions: dict[str, dict[str, Any]] = {}
         self._app: modal.App | None = None
         self._setup_auth()
@@ -89,7 +90,7 @@ class ModalSandboxProvider(SandboxProvider):
             )
         return self._app
 
-    async def create_sandbox(self) -> str:
+    async def create_sandbox(self, labels: dict[str, str] | None = None) -> str:
         try:
             app = await self._get_app()
             image = modal.Image.from_registry(settings.DOCKER_IMAGE)
@@ -98,6 +99,7 @@ class ModalSandboxProvider(SandboxProvider):
                 modal.Sandbox.create.aio,
                 app=app,
                 image=image,
+                tags=labels,
                 timeout=SANDBOX_DEFAULT_TIMEOUT,
                 cpu=2,
                 memory=4096,
@@ -127,7 +129,7 @@ class ModalSandboxProvider(SandboxProvider):
             )
 
         sandbox_id = str(sandbox.object_id)
-        self._active_sandboxes[sandbox_id] = sandbox
+        self._cache_handle(self._active_sandboxes, sandbox_id, sandbox)
         return sandbox_id
 
     async def connect_sandbox(self, sandbox_id: str) -> bool:
@@ -139,7 +141,7 @@ class ModalSandboxProvider(SandboxProvider):
                 modal.Sandbox.from_id.aio,
                 sandbox_id,
             )
-            self._active_sandboxes[sandbox_id] = sandbox
+            self._cache_handle(self._active_sandboxes, sandbox_id, sandbox)
             return True
         except Exception as e:
             logger.warning("Failed to connect to sandbox %s: %s", sandbox_id, e)
@@ -245,8 +247,21 @@ class ModalSandboxProvider(SandboxProvider):
             content if isinstance(content, bytes) else content.encode("utf-8")
         )
 
+        # Blocking client calls, kept off the event loop so that write_files
+        # runs them in parallel
+        await asyncio.to_thread(
+            self._write_sandbox_file, sandbox, normalized_path, content_bytes
+        )
+
+    @staticmethod
+    def _write_sandbox_file(sandbox: Any, normalized_path: str, data: bytes) -> None:
         with sandbox.open(normalized_path, "wb") as f:
-            f.write(content_bytes)
+            f.write(data)
+
+    @staticmethod
+    def _read_sandbox_file(sandbox: Any, normalized_path: str) -> bytes:
+        with sandbox.open(normalized_path, "rb") as f:
+            return bytes(f.read())
 
     async def read_file(
         self,
@@ -256,8 +271,9 @@ class ModalSandboxProvider(SandboxProvider):
         sandbox = await self._get_sandbox(sandbox_id)
         normalized_path = self.normalize_path(path)
 
-        with sandbox.open(normalized_path, "rb") as f:
-            content_bytes = f.read()
+        content_bytes = await asyncio.to_thread(
+            self._read_sandbox_file, sandbox, normalized_path
+        )
 
         content, is_binary = self._encode_file_content(path, content_bytes)
 
@@ -427,7 +443,7 @@ class ModalSandboxProvider(SandboxProvider):
             modal.Sandbox.from_id.aio,
             sandbox_id,
         )
-        self._active_sandboxes[sandbox_id] = sandbox
+        self._cache_handle(self._active_sandboxes, sandbox_id, sandbox)
         return sandbox
 
     async def _retry_operation(
@@ -0,0 +1,138 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.config import get_settings
+from app.services.sandbox_providers.base import SandboxProvider
+from app.services.sandbox_providers.factory import (
+    create_docker_config,
+    create_sandbox_provider,
+)
+from app.services.sandbox_providers.types import DockerConfig, SandboxProviderType
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+ProviderKey = tuple[str, str]
+
+
+def provider_key(
+    provider_type: SandboxProviderType | str,
+    api_key: str | None = None,
+    docker_config: DockerConfig | None = None,
+) -> ProviderKey:
+    # Provider type and a hash of what it authenticates and connects with, so a
+    # rotated API key maps to a new provider and the key itself is not kept
+    provider_type = SandboxProviderType(provider_type)
+    if provider_type == SandboxProviderType.DOCKER:
+        config = docker_config or create_docker_config()
+        credentials = json.dumps(dataclasses.asdict(config), sort_keys=True)
+    else:
+        credentials = api_key or ""
+    return provider_type.value, hashlib.sha256(credentials.encode()).hexdigest()
+
+
+class SandboxProviderRegistry:
+    # Long-lived providers shared by every request, terminal, chat task and
+    # scheduled task in the process, one per provider key and event loop
+    # (SDK handles such as E2B's HTTP clients belong to the loop they were
+    # created on). Providers unused for SANDBOX_PROVIDER_IDLE_SECONDS, beyond
+    # SANDBOX_PROVIDER_CACHE_SIZE per loop, retired after a key rotation or
+    # left on a closed loop (Celery tasks outside the shared worker loop) are
+    # dropped without cleanup(): whoever still holds one finishes with it, and
+    # PTY sessions are closed by the SandboxService that opened them.
+    def __init__(self) -> None:
+        self._providers: dict[
+            asyncio.AbstractEventLoop,
+            OrderedDict[ProviderKey, tuple[SandboxProvider, float]],
+        ] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(providers) for providers in self._providers.values())
+
+    def get(
+        self,
+        provider_type: SandboxProviderType | str,
+        api_key: str | None = None,
+        docker_config: DockerConfig | None = None,
+    ) -> SandboxProvider:
+        key = provider_key(provider_type, api_key, docker_config)
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        with self._lock:
+            for closed in [other for other in self._providers if other.is_closed()]:
+                del self._providers[closed]
+            providers = self._providers.setdefault(loop, OrderedDict())
+            while providers:
+                oldest_key, (_, last_used) = next(iter(providers.items()))
+                if now - last_used < settings.SANDBOX_PROVIDER_IDLE_SECONDS:
+                    break
+                del providers[oldest_key]
+
+            cached = providers.get(key)
+            if cached is not None:
+                providers[key] = (cached[0], now)
+                providers.move_to_end(key)
+                return cached[0]
+
+        provider = create_sandbox_provider(
+            provider_type, api_key=api_key, docker_config=docker_config
+        )
+        with self._lock:
+            providers = self._providers.setdefault(loop, OrderedDict())
+            providers[key] = (provider, now)
+            while len(providers) > settings.SANDBOX_PROVIDER_CACHE_SIZE:
+                providers.popitem(last=False)
+        return provider
+
+    def retire(
+        self, provider_type: SandboxProviderType | str, api_key: str | None
+    ) -> None:
+        # Called when credentials change; this process stops handing out the
+        # old provider right away, others once it has been idle long enough
+        key = provider_key(provider_type, api_key)
+        with self._lock:
+            for providers in self._providers.values():
+                providers.pop(key, None)
+
+    async def close_all(self) -> None:
+        # Providers of the running loop, on shutdown
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            providers = self._providers.pop(loop, OrderedDict())
+        for provider, _ in providers.values():
+            try:
+                await provider.cleanup()
+            except Exception as e:
+                logger.warning("Failed to clean up sandbox provider: %s", e)
+
+
+provider_registry = SandboxProviderRegistry()
+
+
+def sandbox_api_key(
+    provider_type: SandboxProviderType | str,
+    e2b_api_key: str | None = None,
+    modal_api_key: str | None = None,
+) -> str | None:
+    # The credential get_sandbox_provider needs for a provider type; Docker has none
+    if provider_type == SandboxProviderType.E2B:
+        return e2b_api_key
+    if provider_type == SandboxProviderType.MODAL:
+        return modal_api_key
+    return None
+
+
+def get_sandbox_provider(
+    provider_type: SandboxProviderType | str,
+    api_key: str | None = None,
+    docker_config: DockerConfig | None = None,
+) -> SandboxProvider:
+    return provider_registry.get(provider_type, api_key, docker_config)
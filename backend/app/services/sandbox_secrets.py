@@ -0,0 +1,203 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import suppress
+from typing import cast
+
+from cryptography.fernet import InvalidToken
+
+from app.constants import REDIS_KEY_SANDBOX_SECRETS
+from app.core.config import get_settings
+from app.core.security import decrypt_value, encrypt_value
+from app.services.sandbox_providers import SandboxProvider
+from app.utils.redis import redis_connection
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Hash field marking that the entry holds every secret of the sandbox;
+# environment variable names cannot be empty
+SECRETS_COMPLETE_FIELD = ""
+
+
+class SandboxSecretsStore:
+    # Authoritative copy of each sandbox's secrets, encrypted in a Redis hash
+    # shared by every process, so commands get them as exec environment
+    # without reading ~/.bashrc in the sandbox first. The file is still
+    # written (for terminals and the CLI), but only when a secret changes.
+    # Sandboxes without an entry (created before the store, or cloned) are
+    # seeded from ~/.bashrc once. Each process trusts its own copy for
+    # SANDBOX_SECRETS_CACHE_TTL_SECONDS when running commands, so changes made
+    # by another process show up within that time; writes always compare
+    # against Redis. Entries neither read nor written for
+    # SANDBOX_SECRETS_RETENTION_SECONDS expire (sandboxes deleted without
+    # going through SandboxService) and are seeded again if still needed.
+    # Without Redis, reads fall back to ~/.bashrc.
+    def __init__(self) -> None:
+        self._cache: OrderedDict[str, tuple[dict[str, str], float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    async def get(self, provider: SandboxProvider, sandbox_id: str) -> dict[str, str]:
+        with self._lock:
+            cached = self._cache.get(sandbox_id)
+        if (
+            cached is not None
+            and time.monotonic() - cached[1]
+            < settings.SANDBOX_SECRETS_CACHE_TTL_SECONDS
+        ):
+            return dict(cached[0])
+        return await self._fetch(provider, sandbox_id)
+
+    async def _fetch(
+        self, provider: SandboxProvider, sandbox_id: str
+    ) -> dict[str, str]:
+        try:
+            secrets = await self._load(sandbox_id)
+        except Exception as e:
+            logger.warning("Failed to read secrets of sandbox %s: %s", sandbox_id, e)
+            return await self._read_sandbox(provider, sandbox_id)
+        if secrets is None:
+            secrets = await self._read_sandbox(provider, sandbox_id)
+            try:
+                await self._store(sandbox_id, secrets, only_new=True)
+            except Exception as e:
+                logger.warning(
+                    "Failed to store secrets of sandbox %s: %s", sandbox_id, e
+                )
+                return secrets
+        self._remember(sandbox_id, secrets)
+        return dict(secrets)
+
+    async def set(
+        self, provider: SandboxProvider, sandbox_id: str, key: str, value: str
+    ) -> None:
+        # Not the cached copy: another process may have changed the secret
+        secrets = await self._fetch(provider, sandbox_id)
+        current = secrets.get(key)
+        if current == value:
+            return
+        if current is not None:
+            await provider.delete_secret(sandbox_id, key)
+        await provider.add_secret(sandbox_id, key, value)
+        try:
+            await self._store(sandbox_id, {key: value})
+        except Exception as e:
+            await self._discard(sandbox_id, e)
+            return
+        self._update(sandbox_id, key, value)
+
+    async def delete(
+        self, provider: SandboxProvider, sandbox_id: str, key: str
+    ) -> None:
+        await provider.delete_secret(sandbox_id, key)
+        try:
+            async with redis_connection() as redis:
+                await redis.hdel(
+                    REDIS_KEY_SANDBOX_SECRETS.format(sandbox_id=sandbox_id), key
+                )
+        except Exception as e:
+            await self._discard(sandbox_id, e)
+            return
+        self._update(sandbox_id, key, None)
+
+    async def reset(self, sandbox_id: str) -> None:
+        # A new sandbox: nothing in ~/.bashrc to seed from
+        try:
+            await self._store(sandbox_id, {}, replace=True)
+        except Exception as e:
+            logger.warning("Failed to reset secrets of sandbox %s: %s", sandbox_id, e)
+            return
+        self._remember(sandbox_id, {})
+
+    async def forget(self, sandbox_id: str) -> None:
+        with self._lock:
+            self._cache.pop(sandbox_id, None)
+        async with redis_connection() as redis:
+            await redis.delete(REDIS_KEY_SANDBOX_SECRETS.format(sandbox_id=sandbox_id))
+
+    async def _discard(self, sandbox_id: str, error: Exception) -> None:
+        # The sandbox file changed but the store could not follow; drop the
+        # entry so it is seeded from the file again
+        logger.warning(
+            "Failed to store secrets of sandbox %s, re-reading them from the "
+            "sandbox: %s",
+            sandbox_id,
+            error,
+        )
+        with suppress(Exception):
+            await self.forget(sandbox_id)
+
+    async def _load(self, sandbox_id: str) -> dict[str, str] | None:
+        # Reading an entry also extends its retention
+        key = REDIS_KEY_SANDBOX_SECRETS.format(sandbox_id=sandbox_id)
+        async with redis_connection() as redis:
+            async with redis.pipeline(transaction=False) as pipe:
+                pipe.hgetall(key)
+                pipe.expire(key, settings.SANDBOX_SECRETS_RETENTION_SECONDS)
+                results = await pipe.execute()
+        fields = cast(dict[str, str], results[0])
+        if SECRETS_COMPLETE_FIELD not in fields:
+            return None
+        secrets: dict[str, str] = {}
+        for key, encrypted in fields.items():
+            if key == SECRETS_COMPLETE_FIELD:
+                continue
+            try:
+                secrets[key] = decrypt_value(encrypted)
+            except InvalidToken:
+                logger.warning("Undecryptable secret %s in sandbox %s", key, sandbox_id)
+        return secrets
+
+    async def _store(
+        self,
+        sandbox_id: str,
+        secrets: dict[str, str],
+        *,
+        only_new: bool = False,
+        replace: bool = False,
+    ) -> None:
+        # only_new: seeding, which must not overwrite values written meanwhile
+        key = REDIS_KEY_SANDBOX_SECRETS.format(sandbox_id=sandbox_id)
+        async with redis_connection() as redis:
+            async with redis.pipeline(transaction=True) as pipe:
+                if replace:
+                    pipe.delete(key)
+                for name, value in secrets.items():
+                    if only_new:
+                        pipe.hsetnx(key, name, encrypt_value(value))
+                    else:
+                        pipe.hset(key, name, encrypt_value(value))
+                pipe.hset(key, SECRETS_COMPLETE_FIELD, "1")
+                pipe.expire(key, settings.SANDBOX_SECRETS_RETENTION_SECONDS)
+                await pipe.execute()
+
+    @staticmethod
+    async def _read_sandbox(
+        provider: SandboxProvider, sandbox_id: str
+    ) -> dict[str, str]:
+        return {s.key: s.value for s in await provider.get_secrets(sandbox_id)}
+
+    def _remember(self, sandbox_id: str, secrets: dict[str, str]) -> None:
+        with self._lock:
+            self._cache[sandbox_id] = (dict(secrets), time.monotonic())
+            self._cache.move_to_end(sandbox_id)
+            while len(self._cache) > settings.SANDBOX_SECRETS_CACHE_SIZE:
+                self._cache.popitem(last=False)
+
+    def _update(self, sandbox_id: str, key: str, value: str | None) -> None:
+        with self._lock:
+            cached = self._cache.get(sandbox_id)
+            if cached is None:
+                return
+            secrets = cached[0]
+            if value is None:
+                secrets.pop(key, None)
+            else:
+                secrets[key] = value
+
+
+sandbox_secrets = SandboxSecretsStore()
@@ -23,10 +23,7 @@ from app.models.db_models import (
 from app.services.scheduler.execution import update_task_after_execution
 from app.services.user import UserService
 from app.services.sandbox import SandboxService
-from app.services.sandbox_providers import (
-    SandboxProviderType,
-    create_sandbox_provider,
-)
+from app.services.sandbox_providers import get_sandbox_provider, sandbox_api_key
 from app.utils.validators import APIKeyValidationError, validate_model_api_keys
 
 logger = logging.getLogger(__name__)
@@ -108,14 +105,13 @@ async def create_and_initialize_sandbox(
     user: User,
     session_factory: Any,
 ) -> tuple[SandboxService, str]:
-    api_key = None
-    if user_settings.sandbox_provider == SandboxProviderType.E2B.value:
-        api_key = user_settings.e2b_api_key
-    elif user_settings.sandbox_provider == SandboxProviderType.MODAL.value:
-        api_key = user_settings.modal_api_key
-    provider = create_sandbox_provider(
+    provider = get_sandbox_provider(
         provider_type=user_settings.sandbox_provider,
-        api_key=api_key,
+        api_key=sandbox_api_key(
+            user_settings.sandbox_provider,
+            user_settings.e2b_api_key,
+            user_settings.modal_api_key,
+        ),
     )
     sandbox_service = SandboxService(provider, session_factory=session_factory)
     sandbox_id = await sandbox_service.create_sandbox()
@@ -1,6 +1,8 @@
 from app.services.streaming.cancellation import CancellationHandler, StreamCancelled
 from app.services.streaming.context_usage import ContextUsageTracker
+from app.services.streaming.event_log import MessageEventLog
 from app.services.streaming.events import ActiveToolState, StreamEvent, ToolPayload
+from app.services.streaming.hub import StreamHub, stream_hub
 from app.services.streaming.orchestrator import (
     StreamContext,
     StreamOrchestrator,
@@ -8,6 +10,7 @@ from app.services.streaming.orchestrator import (
     initialize_and_run_chat,
 )
 from app.services.streaming.processor import StreamProcessor
+from app.services.streaming.progress import ProgressReporter
 from app.services.streaming.publisher import StreamPublisher
 from app.services.streaming.queue_injector import QueueInjector
 from app.services.streaming.session import SessionUpdateCallback, hydrate_chat
@@ -16,11 +19,14 @@ __all__ = [
     "ActiveToolState",
     "CancellationHandler",
     "ContextUsageTracker",
+    "MessageEventLog",
+    "ProgressReporter",
     "QueueInjector",
     "SessionUpdateCallback",
     "StreamCancelled",
     "StreamContext",
     "StreamEvent",
+    "StreamHub",
     "StreamOrchestrator",
     "StreamOutcome",
     "StreamProcessor",
@@ -28,4 +34,5 @@ __all__ = [
     "ToolPayload",
     "hydrate_chat",
     "initialize_and_run_chat",
+    "stream_hub",
 ]
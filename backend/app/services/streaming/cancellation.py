@@ -6,8 +6,9 @@ from typing import TYPE_CHECKING
 
 from redis.asyncio import Redis
 
-from app.constants import REDIS_KEY_CHAT_REVOKED
+from app.constants import REDIS_KEY_CHAT_CANCEL, REDIS_KEY_CHAT_REVOKED
 from app.core.config import get_settings
+from app.utils.redis import redis_pubsub
 
 if TYPE_CHECKING:
     from app.services.claude_agent import ClaudeAgentService
@@ -43,11 +44,46 @@ class CancellationHandler:
             return False
 
     async def wait_for_revocation(self) -> None:
+        # The stop endpoint sets the revoked key and publishes on the cancel
+        # channel. Waiting on the channel delivers the cancel immediately; the
+        # key is only re-read every REVOCATION_FALLBACK_POLL_SECONDS in case a
+        # message is lost (e.g. published before we subscribed or during a
+        # reconnect). Without pub/sub we fall back to fast polling.
+        if self._redis is not None:
+            try:
+                await self._wait_for_cancel_message(self._redis)
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(
+                    "Revocation pub/sub failed for chat %s, polling instead: %s",
+                    self.chat_id,
+                    exc,
+                )
+
         while True:
             if await self.check_revoked():
                 return
             await asyncio.sleep(settings.REVOCATION_POLL_INTERVAL_SECONDS)
 
+    async def _wait_for_cancel_message(self, redis: Redis[str]) -> None:
+        async with redis_pubsub(
+            redis, REDIS_KEY_CHAT_CANCEL.format(chat_id=self.chat_id)
+        ) as pubsub:
+            # Subscribed first, so a revocation cannot slip in between
+            if await self.check_revoked():
+                return
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=settings.REVOCATION_FALLBACK_POLL_SECONDS,
+                )
+                if message and message.get("type") == "message":
+                    return
+                if message is None and await self.check_revoked():
+                    return
+
     async def cancel_stream(self, ai_service: ClaudeAgentService) -> None:
         if self.cancel_requested:
             return
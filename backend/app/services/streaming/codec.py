@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import base64
+import logging
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Stream entries without a "v" field carry the payload as plain JSON text.
+# Version 2 stores base64(zstd(json_text)); the base64 layer keeps the field
+# readable through the decode_responses=True clients used everywhere else.
+STREAM_PAYLOAD_VERSION_ZSTD = "2"
+
+
+@lru_cache(maxsize=1)
+def _zstd() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        logger.warning(
+            "STREAM_PAYLOAD_COMPRESSION is enabled but zstandard is not installed; "
+            "storing stream payloads as plain JSON"
+        )
+        return None
+    return zstandard
+
+
+def encode_stream_payload(payload: str) -> dict[str, str]:
+    if (
+        not settings.STREAM_PAYLOAD_COMPRESSION
+        or len(payload) < settings.STREAM_PAYLOAD_COMPRESSION_MIN_BYTES
+    ):
+        return {"payload": payload}
+
+    zstandard = _zstd()
+    if zstandard is None:
+        return {"payload": payload}
+
+    compressed = zstandard.ZstdCompressor(
+        level=settings.STREAM_PAYLOAD_COMPRESSION_LEVEL
+    ).compress(payload.encode("utf-8"))
+    return {
+        "v": STREAM_PAYLOAD_VERSION_ZSTD,
+        "payload": base64.b64encode(compressed).decode("ascii"),
+    }
+
+
+def decode_stream_payload(fields: dict[str, str]) -> str:
+    payload = fields.get("payload", "") or ""
+    version = fields.get("v")
+    if not version or not payload:
+        return payload
+
+    if version != STREAM_PAYLOAD_VERSION_ZSTD:
+        raise ValueError(f"Unsupported stream payload version: {version}")
+
+    zstandard = _zstd()
+    if zstandard is None:
+        raise RuntimeError("zstandard is required to decode compressed stream entries")
+
+    data = zstandard.ZstdDecompressor().decompress(base64.b64decode(payload))
+    return str(data.decode("utf-8"))
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import json
 import logging
 from typing import TYPE_CHECKING, Any
@@ -10,16 +9,19 @@ from redis.asyncio import Redis
 from sqlalchemy import select
 
 from app.constants import (
+    REDIS_KEY_CHAT_CONTEXT_RECONCILED,
     REDIS_KEY_CHAT_CONTEXT_USAGE,
     REDIS_KEY_CHAT_REVOKED,
+    REDIS_KEY_CHAT_STREAM,
     REDIS_KEY_CHAT_TASK,
 )
 from app.core.config import get_settings
 from app.db.session import get_celery_session
 from app.models.db_models import Chat
-from app.services.streaming.events import StreamEvent
+from app.services.streaming.events import StreamEvent, context_usage_data
 from app.services.streaming.publisher import StreamPublisher
 from app.services.user import UserService
+from app.utils.redis import get_redis_client
 
 if TYPE_CHECKING:
     from app.models.types import JSONDict
@@ -29,7 +31,35 @@ logger = logging.getLogger(__name__)
 settings = get_settings()
 
 
+async def save_context_usage(
+    chat_id: str,
+    context_data: JSONDict,
+    redis_client: Redis[str],
+    session_factory: Any,
+) -> None:
+    async with session_factory() as db:
+        result = await db.execute(select(Chat).filter(Chat.id == UUID(chat_id)))
+        chat_to_update = result.scalar_one_or_none()
+        if chat_to_update:
+            chat_to_update.context_token_usage = context_data["tokens_used"]
+            db.add(chat_to_update)
+            await db.commit()
+
+    cache_key = REDIS_KEY_CHAT_CONTEXT_USAGE.format(chat_id=chat_id)
+    await redis_client.setex(
+        cache_key,
+        settings.CONTEXT_USAGE_CACHE_TTL_SECONDS,
+        json.dumps(context_data),
+    )
+
+
 class ContextUsageTracker:
+    # Live usage comes from the stream itself (StreamProcessor). This runs
+    # the CLI's /context command, which costs a CLI launch in the sandbox, to
+    # reconcile it: queued by run_chat_stream once a run has completed, at most
+    # once per CONTEXT_USAGE_RECONCILE_INTERVAL_SECONDS per chat, and skipped if
+    # a newer run is already streaming. context_window is the one the model
+    # reported during the run, as used for the live figures.
     def __init__(
         self,
         chat_id: str,
@@ -37,12 +67,14 @@ class ContextUsageTracker:
         sandbox_id: str,
         user_id: str,
         model_id: str,
+        context_window: int | None = None,
     ) -> None:
         self.chat_id = chat_id
         self.session_id = session_id
         self.sandbox_id = sandbox_id
         self.user_id = user_id
         self.model_id = model_id
+        self.context_window = context_window or settings.CONTEXT_WINDOW_TOKENS
 
     async def fetch_and_broadcast(
         self,
@@ -64,44 +96,23 @@ class ContextUsageTracker:
             if token_usage is None:
                 return None
 
-            context_window = settings.CONTEXT_WINDOW_TOKENS
-            percentage = (
-                min((token_usage / context_window) * 100, 100.0)
-                if context_window > 0
-                else 0.0
-            )
-
-            context_data: JSONDict = {
-                "tokens_used": token_usage,
-                "context_window": context_window,
-                "percentage": percentage,
-            }
-
-            async with session_factory() as db:
-                result = await db.execute(
-                    select(Chat).filter(Chat.id == UUID(self.chat_id))
-                )
-                chat_to_update = result.scalar_one_or_none()
-                if chat_to_update:
-                    chat_to_update.context_token_usage = token_usage
-                    db.add(chat_to_update)
-                    await db.commit()
-
-            cache_key = REDIS_KEY_CHAT_CONTEXT_USAGE.format(chat_id=self.chat_id)
-            await redis_client.setex(
-                cache_key,
-                settings.CONTEXT_USAGE_CACHE_TTL_SECONDS,
-                json.dumps(context_data),
+            context_data = context_usage_data(token_usage, self.context_window)
+            await save_context_usage(
+                self.chat_id, context_data, redis_client, session_factory
             )
 
-            system_event: StreamEvent = {
-                "type": "system",
-                "data": {"context_usage": context_data, "chat_id": self.chat_id},
-            }
-
-            publisher = StreamPublisher(self.chat_id)
-            publisher._redis = redis_client
-            await publisher.publish_event(system_event)
+            # An expired stream is not re-created: XADD would leave it without a TTL
+            stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=self.chat_id)
+            if await redis_client.exists(stream_key):
+                system_event: StreamEvent = {
+                    "type": "system",
+                    "data": {"context_usage": context_data, "chat_id": self.chat_id},
+                }
+                publisher = StreamPublisher(self.chat_id, batching=False)
+                publisher._redis = redis_client
+                await publisher.publish_event(system_event)
+                # Re-arms the TTL should the key have expired in between
+                await publisher.apply_retention()
 
             return context_data
 
@@ -117,21 +128,32 @@ class ContextUsageTracker:
             task_key = REDIS_KEY_CHAT_TASK.format(chat_id=self.chat_id)
             revoked_key = REDIS_KEY_CHAT_REVOKED.format(chat_id=self.chat_id)
 
-            task_exists = (await redis_client.get(task_key)) is not None
-            is_revoked = (await redis_client.get(revoked_key)) in ("1", b"1")
+            task_id, revoked = await redis_client.mget(task_key, revoked_key)
 
-            return task_exists and not is_revoked
+            return task_id is not None and revoked not in ("1", b"1")
         except Exception:
             return False
 
-    async def poll_while_streaming(self) -> None:
+    async def _claim_reconcile(self, redis_client: Redis[str]) -> bool:
+        key = REDIS_KEY_CHAT_CONTEXT_RECONCILED.format(chat_id=self.chat_id)
+        claimed = await redis_client.set(
+            key, "1", nx=True, ex=settings.CONTEXT_USAGE_RECONCILE_INTERVAL_SECONDS
+        )
+        return bool(claimed)
+
+    async def reconcile(self) -> None:
         # Local import to avoid circular import
         from app.services.claude_agent import ClaudeAgentService
 
         redis_client: Redis[str] | None = None
 
         try:
-            redis_client = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+            redis_client = get_redis_client()
+            # A newer run reconciles once it completes
+            if await self._is_stream_active(redis_client):
+                return
+            if not await self._claim_reconcile(redis_client):
+                return
 
             async with get_celery_session() as (session_factory, _):
                 async with session_factory() as db:
@@ -153,21 +175,13 @@ class ContextUsageTracker:
                 async with ClaudeAgentService(
                     session_factory=session_factory
                 ) as ai_service:
-                    while True:
-                        await self.fetch_and_broadcast(
-                            ai_service, redis_client, session_factory
-                        )
-
-                        if not await self._is_stream_active(redis_client):
-                            break
-
-                        await asyncio.sleep(
-                            settings.CONTEXT_USAGE_POLL_INTERVAL_SECONDS
-                        )
+                    await self.fetch_and_broadcast(
+                        ai_service, redis_client, session_factory
+                    )
 
         except Exception as e:
             logger.error(
-                "Context usage polling failed for chat %s: %s", self.chat_id, e
+                "Context usage reconciliation failed for chat %s: %s", self.chat_id, e
             )
         finally:
             if redis_client:
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+import logging
+from typing import Any
+from uuid import UUID
+
+from app.core.config import get_settings
+from app.models.db_models import MessageEvent
+from app.services.streaming.events import StreamEvent
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class MessageEventLog:
+    # Append-only persistence for the events of a single assistant message.
+    # Events are buffered in memory and written as one message_events row per
+    # batch, so a long run costs one INSERT per batch instead of rewriting the
+    # whole serialized event list. Message.content is materialized from the full
+    # list once the message reaches a terminal state.
+    def __init__(
+        self,
+        message_id: str | None,
+        session_factory: Any,
+        batch_size: int | None = None,
+    ) -> None:
+        self.message_id = message_id
+        self._session_factory = session_factory
+        self._batch_size = max(batch_size or settings.MESSAGE_EVENT_BATCH_SIZE, 1)
+        self._pending: list[StreamEvent] = []
+        self._next_seq = 0
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def append(self, event: StreamEvent) -> bool:
+        self._pending.append(event)
+        return len(self._pending) >= self._batch_size
+
+    async def flush(self) -> None:
+        if not self.message_id or not self._pending:
+            return
+
+        batch = self._pending
+        self._pending = []
+
+        try:
+            async with self._session_factory() as db:
+                db.add(
+                    MessageEvent(
+                        message_id=UUID(self.message_id),
+                        seq=self._next_seq,
+                        event_count=len(batch),
+                        events=json.dumps(batch, ensure_ascii=False),
+                    )
+                )
+                await db.commit()
+            self._next_seq += 1
+        except Exception as exc:
+            # Keep the batch so the next flush retries it in order
+            self._pending = batch + self._pending
+            logger.error(
+                "Failed to append event segment for message %s: %s",
+                self.message_id,
+                exc,
+            )
+
+    def reset(self, message_id: str | None) -> None:
+        self.message_id = message_id
+        self._pending = []
+        self._next_seq = 0
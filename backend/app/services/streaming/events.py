@@ -59,3 +59,14 @@ class ActiveToolState:
             "input": self.input or None,
         }
         return payload
+
+
+def context_usage_data(tokens_used: int, context_window: int) -> JSONDict:
+    percentage = (
+        min((tokens_used / context_window) * 100, 100.0) if context_window > 0 else 0.0
+    )
+    return {
+        "tokens_used": tokens_used,
+        "context_window": context_window,
+        "percentage": percentage,
+    }
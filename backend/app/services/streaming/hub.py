@@ -0,0 +1,336 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from collections.abc import AsyncGenerator
+from contextlib import aclosing, suppress
+from typing import Any
+
+from redis.asyncio import Redis
+
+from app.constants import REDIS_KEY_CHAT_CANCEL, REDIS_KEY_CHAT_STREAM
+from app.core.config import get_settings
+from app.services.streaming.codec import decode_stream_payload
+from app.utils.redis import get_stream_redis_client, redis_pubsub
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+TERMINAL_STREAM_EVENTS = frozenset({"complete", "error"})
+CANCELLED_STREAM_EVENT: dict[str, Any] = {
+    "event": "complete",
+    "data": json.dumps({"status": "cancelled"}),
+}
+CANCEL_MONITOR_RETRY_SECONDS = 1.0
+
+
+def format_stream_entry(entry_id: str, fields: dict[str, str]) -> dict[str, Any]:
+    try:
+        data = decode_stream_payload(fields)
+    except Exception as e:
+        logger.error("Failed to decode stream entry %s: %s", entry_id, e)
+        data = fields.get("payload", "") or ""
+    return {
+        "id": entry_id,
+        "event": fields.get("kind", "content"),
+        "data": data,
+    }
+
+
+def stream_id_key(entry_id: str) -> tuple[int, int]:
+    # Redis stream IDs are "<ms>-<seq>"; compare them numerically, not as strings
+    ms, _, seq = entry_id.partition("-")
+    try:
+        return int(ms), int(seq or 0)
+    except ValueError:
+        return 0, 0
+
+
+async def read_stream_pages(
+    redis: Redis[str], stream_name: str, after_id: str | None, max_id: str = "+"
+) -> AsyncGenerator[list[dict[str, Any]], None]:
+    # Pages through XRANGE after after_id (or from the start), so replaying a long
+    # backlog holds at most one page of entries at a time
+    page_size = max(settings.STREAM_REPLAY_PAGE_SIZE, 1)
+    min_id = f"({after_id}" if after_id else "-"
+    while True:
+        entries = await redis.xrange(
+            stream_name, min=min_id, max=max_id, count=page_size
+        )
+        if not entries:
+            return
+        yield [format_stream_entry(entry_id, fields) for entry_id, fields in entries]
+        if len(entries) < page_size:
+            return
+        min_id = f"({entries[-1][0]}"
+
+
+def coalesce_stream_entries(
+    entries: list[dict[str, Any]], max_events: int | None = None
+) -> list[dict[str, Any]]:
+    # Merges runs of consecutive "content" entries into a single "content_batch"
+    # frame whose data is a JSON array of the individual payloads. The frame keeps
+    # the id of its last entry, so Last-Event-ID resumption works unchanged.
+    limit = max(max_events or settings.STREAM_SSE_COALESCE_MAX_EVENTS, 1)
+    frames: list[dict[str, Any]] = []
+    run: list[dict[str, Any]] = []
+
+    def close_run() -> None:
+        if len(run) == 1:
+            frames.append(run[0])
+        elif run:
+            frames.append(
+                {
+                    "id": run[-1]["id"],
+                    "event": "content_batch",
+                    "data": "[" + ",".join(item["data"] for item in run) + "]",
+                }
+            )
+        run.clear()
+
+    for entry in entries:
+        if entry["event"] == "content" and entry["data"]:
+            run.append(entry)
+            if len(run) >= limit:
+                close_run()
+        else:
+            close_run()
+            frames.append(entry)
+    close_run()
+    return frames
+
+
+class _Subscription:
+    def __init__(self) -> None:
+        # Each item is one XREAD batch; None wakes the consumer on cancellation
+        self.queue: asyncio.Queue[list[dict[str, Any]] | None] = asyncio.Queue(
+            maxsize=settings.STREAM_HUB_SUBSCRIBER_QUEUE_SIZE
+        )
+        self.lagged = False
+
+
+class _ChatChannel:
+    def __init__(self, chat_id: str, cursor: str) -> None:
+        self.chat_id = chat_id
+        self.stream_name = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        self.cursor = cursor
+        self.cancelled = False
+        self.subscribers: set[_Subscription] = set()
+        self.reader_task: asyncio.Task[None] | None = None
+        self.monitor_task: asyncio.Task[None] | None = None
+
+    def broadcast(self, batch: list[dict[str, Any]] | None) -> None:
+        for subscription in list(self.subscribers):
+            try:
+                subscription.queue.put_nowait(batch)
+            except asyncio.QueueFull:
+                # Slow consumer: detach it; it resyncs from XRANGE once drained
+                subscription.lagged = True
+                self.subscribers.discard(subscription)
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        self.broadcast(None)
+
+
+class StreamHub:
+    # Per-process fan-out for chat streams. Every chat with at least one local SSE
+    # subscriber gets a single XREAD cursor and a single cancellation pub/sub
+    # subscription; entries are pushed to subscribers through bounded in-memory
+    # queues. Backlog replay for late joiners still comes from XRANGE, and a
+    # subscriber that falls behind the shared cursor fills the gap the same way.
+    def __init__(self) -> None:
+        self._redis: Redis[str] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._channels: dict[str, _ChatChannel] = {}
+
+    def _get_redis(self) -> Redis[str]:
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._loop is not loop:
+            # Clients and tasks are bound to the loop that created them
+            self._redis = get_stream_redis_client()
+            self._loop = loop
+            self._channels = {}
+        return self._redis
+
+    async def subscribe(
+        self, chat_id: str, last_id: str, coalesce: bool = False
+    ) -> AsyncGenerator[dict[str, Any], None]:
+        # Yields entries after last_id until a terminal entry or a cancellation.
+        # With coalesce, each backlog page and everything already queued is merged
+        # into as few SSE frames as possible (see coalesce_stream_entries).
+        redis = self._get_redis()
+
+        while True:
+            channel, subscription = self._attach(chat_id, last_id)
+            try:
+                async with aclosing(
+                    self._batches(redis, channel, subscription, last_id, coalesce)
+                ) as batches:
+                    async for entries in batches:
+                        fresh = [
+                            entry
+                            for entry in entries
+                            if stream_id_key(entry["id"]) > stream_id_key(last_id)
+                        ]
+                        frames = coalesce_stream_entries(fresh) if coalesce else fresh
+                        for frame in frames:
+                            yield frame
+                            last_id = frame["id"]
+                            if frame["event"] in TERMINAL_STREAM_EVENTS:
+                                return
+
+                if channel.cancelled:
+                    logger.info("Stream cancelled for chat %s", chat_id)
+                    yield dict(CANCELLED_STREAM_EVENT)
+                    return
+            finally:
+                await self._detach(channel, subscription)
+
+            logger.debug("Subscriber for chat %s lagged, resyncing", chat_id)
+
+    async def _batches(
+        self,
+        redis: Redis[str],
+        channel: _ChatChannel,
+        subscription: _Subscription,
+        last_id: str,
+        drain: bool,
+    ) -> AsyncGenerator[list[dict[str, Any]], None]:
+        # Backlog up to the shared cursor comes from XRANGE, page by page; anything
+        # after it is already on its way into the subscription queue. Ends on
+        # cancellation, or once a lagged subscription has drained its queue.
+        backlog_end = channel.cursor
+        if stream_id_key(backlog_end) > stream_id_key(last_id):
+            async with aclosing(
+                read_stream_pages(redis, channel.stream_name, last_id, backlog_end)
+            ) as pages:
+                async for page in pages:
+                    yield page
+
+        while not channel.cancelled:
+            if subscription.lagged and subscription.queue.empty():
+                return
+            yield await self._next_entries(subscription, drain)
+
+    async def _next_entries(
+        self, subscription: _Subscription, drain: bool
+    ) -> list[dict[str, Any]]:
+        batch = await subscription.queue.get()
+        entries = list(batch or [])
+        while drain and batch is not None and not subscription.queue.empty():
+            batch = subscription.queue.get_nowait()
+            entries.extend(batch or [])
+        return entries
+
+    def _attach(self, chat_id: str, last_id: str) -> tuple[_ChatChannel, _Subscription]:
+        channel = self._channels.get(chat_id)
+        if channel is None:
+            channel = _ChatChannel(chat_id, last_id)
+            channel.reader_task = asyncio.create_task(self._read_stream(channel))
+            channel.monitor_task = asyncio.create_task(
+                self._monitor_cancellation(channel)
+            )
+            self._channels[chat_id] = channel
+
+        subscription = _Subscription()
+        channel.subscribers.add(subscription)
+        return channel, subscription
+
+    async def _detach(self, channel: _ChatChannel, subscription: _Subscription) -> None:
+        channel.subscribers.discard(subscription)
+        if channel.subscribers:
+            return
+        if self._channels.get(channel.chat_id) is channel:
+            del self._channels[channel.chat_id]
+        await self._stop_channel(channel)
+
+    async def _stop_channel(self, channel: _ChatChannel) -> None:
+        for task in (channel.reader_task, channel.monitor_task):
+            if task and not task.done():
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+
+    async def _read_stream(self, channel: _ChatChannel) -> None:
+        # XREAD blocks for a long tail since cancellation arrives via pub/sub, and
+        # count adapts to the producer: it doubles whenever a batch comes back full
+        # and decays back once bursts subside.
+        redis = self._get_redis()
+        min_count = max(settings.STREAM_HUB_XREAD_COUNT, 1)
+        max_count = max(settings.STREAM_HUB_XREAD_MAX_COUNT, min_count)
+        count = min_count
+        while True:
+            try:
+                response = await redis.xread(
+                    {channel.stream_name: channel.cursor},
+                    block=settings.STREAM_HUB_XREAD_BLOCK_MS,
+                    count=count,
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.debug("Redis xread error, retrying: %s", e)
+                await asyncio.sleep(0.5)
+                continue
+
+            if not response:
+                continue
+
+            _, entries = response[0]
+            if not entries:
+                continue
+            channel.cursor = entries[-1][0]
+            channel.broadcast(
+                [format_stream_entry(entry_id, fields) for entry_id, fields in entries]
+            )
+
+            if len(entries) >= count:
+                count = min(count * 2, max_count)
+            elif len(entries) < count // 4:
+                count = max(count // 2, min_count)
+
+    async def _monitor_cancellation(self, channel: _ChatChannel) -> None:
+        # Resubscribes after errors, e.g. a pool timeout while every stream
+        # connection is taken, instead of leaving the chat uncancellable
+        channel_name = REDIS_KEY_CHAT_CANCEL.format(chat_id=channel.chat_id)
+        while True:
+            try:
+                async with redis_pubsub(self._get_redis(), channel_name) as pubsub:
+                    while True:
+                        message = await pubsub.get_message(
+                            ignore_subscribe_messages=True, timeout=1.0
+                        )
+                        if message and message.get("type") == "message":
+                            logger.info(
+                                "Stream cancellation received for chat %s",
+                                channel.chat_id,
+                            )
+                            channel.cancel()
+                            return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "Error monitoring cancellation for chat %s, retrying: %s",
+                    channel.chat_id,
+                    e,
+                )
+                await asyncio.sleep(CANCEL_MONITOR_RETRY_SECONDS)
+
+    async def close(self) -> None:
+        channels = list(self._channels.values())
+        self._channels = {}
+        for channel in channels:
+            await self._stop_channel(channel)
+        if self._redis is not None:
+            try:
+                await self._redis.close()
+            except Exception as e:
+                logger.debug("Error closing stream hub Redis client: %s", e)
+            self._redis = None
+            self._loop = None
+
+
+stream_hub = StreamHub()
@@ -4,24 +4,33 @@ import asyncio
 import json
 import logging
 from contextlib import asynccontextmanager, suppress
-from copy import deepcopy
 from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, Any, AsyncIterator, Callable
 from uuid import UUID
 
 from celery.exceptions import Ignore
-from sqlalchemy import select
+from sqlalchemy import delete, select
 
 from app.db.session import get_celery_session
-from app.models.db_models import Chat, Message, MessageRole, MessageStreamStatus, User
+from app.models.db_models import (
+    Chat,
+    Message,
+    MessageEvent,
+    MessageRole,
+    MessageStreamStatus,
+    User,
+)
 from app.prompts.system_prompt import build_system_prompt_for_chat
 from app.services.exceptions import ClaudeAgentException, UserException
 from app.services.message import MessageService
 from app.services.queue import QueueService, serialize_message_attachments
 from app.services.sandbox import SandboxService
-from app.services.sandbox_providers import SandboxProviderType, create_sandbox_provider
+from app.services.sandbox_providers import get_sandbox_provider, sandbox_api_key
 from app.services.streaming.cancellation import CancellationHandler, StreamCancelled
+from app.services.streaming.context_usage import save_context_usage
+from app.services.streaming.event_log import MessageEventLog
 from app.services.streaming.events import StreamEvent
+from app.services.streaming.progress import ProgressReporter
 from app.services.streaming.publisher import StreamPublisher
 from app.services.streaming.queue_injector import QueueInjector
 from app.services.streaming.session import SessionUpdateCallback, hydrate_chat
@@ -31,6 +40,8 @@ from app.utils.redis import redis_connection
 if TYPE_CHECKING:
     from celery import Task
 
+    from app.models.types import JSONDict
+
     from app.services.claude_agent import ClaudeAgentService
 
 SessionFactoryType = Callable[[], Any]
@@ -48,7 +59,9 @@ class StreamContext:
     sandbox_service: SandboxService | None
     chat: Chat
     session_factory: Any
+    event_log: MessageEventLog
     events: list[StreamEvent] = field(default_factory=list)
+    context_usage: JSONDict | None = None
 
 
 @dataclass
@@ -56,6 +69,8 @@ class StreamOutcome:
     events: list[StreamEvent]
     final_content: str
     total_cost: float
+    # A queued message was started as a continuation of this run
+    continued: bool = False
 
 
 class StreamOrchestrator:
@@ -102,13 +117,15 @@ class StreamOrchestrator:
             )
 
             if ctx.assistant_message_id and ctx.events:
-                await self._save_message_content(
+                saved = await self._save_message_content(
                     ctx.assistant_message_id,
-                    ctx.events,
+                    json.dumps(ctx.events, ensure_ascii=False),
                     ctx.ai_service.get_total_cost_usd(),
                     MessageStreamStatus.FAILED,
                     ctx.session_factory,
                 )
+                if saved:
+                    await self.publisher.apply_retention()
 
             raise
 
@@ -120,6 +137,7 @@ class StreamOrchestrator:
         )
 
         queue_injector: QueueInjector | None = None
+        progress = ProgressReporter(ctx.task)
 
         try:
             while True:
@@ -133,7 +151,18 @@ class StreamOrchestrator:
                         break
                     raise
 
-                ctx.events.append(deepcopy(event))
+                # Status notices (context usage) are published to the live
+                # stream but are not part of the message
+                if event.get("type") == "system":
+                    await self._publish_system_event(ctx, event)
+                    continue
+
+                # Events are freshly built by StreamProcessor and never mutated
+                # after being yielded, so the orchestrator takes ownership of the
+                # dict instead of copying it.
+                ctx.events.append(event)
+                if ctx.event_log.append(event):
+                    await ctx.event_log.flush()
                 await self.publisher.publish_event(event)
 
                 if QueueInjector.should_try_injection(event):
@@ -147,27 +176,38 @@ class StreamOrchestrator:
                                 if ctx.assistant_message_id and ctx.events:
                                     await self._save_message_content(
                                         ctx.assistant_message_id,
-                                        ctx.events,
+                                        json.dumps(ctx.events, ensure_ascii=False),
                                         ctx.ai_service.get_total_cost_usd(),
                                         MessageStreamStatus.COMPLETED,
                                         ctx.session_factory,
                                     )
                                 await self.publisher.clear_stream()
                                 ctx.assistant_message_id = new_assistant_id
+                                ctx.event_log.reset(new_assistant_id)
                                 ctx.events.clear()
                         except Exception as e:
                             logger.warning("Queue injection failed: %s", e)
 
-                ctx.task.update_state(
-                    state="PROGRESS",
-                    meta={"status": "Processing", "events_emitted": len(ctx.events)},
-                )
+                progress.report(len(ctx.events))
         finally:
+            progress.flush(len(ctx.events))
             if revocation_task:
                 revocation_task.cancel()
                 with suppress(asyncio.CancelledError):
                     await revocation_task
 
+    async def _publish_system_event(
+        self, ctx: StreamContext, event: StreamEvent
+    ) -> None:
+        data = event.get("data")
+        if data is None:
+            return
+        data["chat_id"] = ctx.chat_id
+        context_usage = data.get("context_usage")
+        if isinstance(context_usage, dict):
+            ctx.context_usage = context_usage
+        await self.publisher.publish_event(event)
+
     def _create_queue_injector(self, ctx: StreamContext) -> QueueInjector | None:
         transport = ctx.ai_service.get_active_transport()
         if not transport:
@@ -187,15 +227,18 @@ class StreamOrchestrator:
         total_cost = ctx.ai_service.get_total_cost_usd()
         final_content = json.dumps(ctx.events, ensure_ascii=False)
 
+        saved = False
         if ctx.assistant_message_id and ctx.events:
-            await self._save_message_content(
+            saved = await self._save_message_content(
                 ctx.assistant_message_id,
-                ctx.events,
+                final_content,
                 total_cost,
                 status,
                 ctx.session_factory,
             )
 
+        await self._save_context_usage(ctx)
+
         if status == MessageStreamStatus.COMPLETED:
             await self._create_checkpoint_if_needed(
                 ctx.sandbox_service,
@@ -207,14 +250,31 @@ class StreamOrchestrator:
             if not queue_processed:
                 await self.publisher.publish_complete()
         else:
+            queue_processed = False
             await self.publisher.publish_complete()
 
+        # A queue continuation keeps streaming into the same key
+        if saved and not queue_processed:
+            await self.publisher.apply_retention()
+
         return StreamOutcome(
             events=ctx.events,
             final_content=final_content,
             total_cost=total_cost,
+            continued=queue_processed,
         )
 
+    async def _save_context_usage(self, ctx: StreamContext) -> None:
+        redis = self.publisher.redis
+        if ctx.context_usage is None or redis is None:
+            return
+        try:
+            await save_context_usage(
+                ctx.chat_id, ctx.context_usage, redis, ctx.session_factory
+            )
+        except Exception as exc:
+            logger.warning("Failed to save context usage: %s", exc)
+
     async def _update_message_status(
         self,
         assistant_message_id: str | None,
@@ -241,13 +301,15 @@ class StreamOrchestrator:
     async def _save_message_content(
         self,
         assistant_message_id: str,
-        events: list[StreamEvent],
+        content: str,
         total_cost_usd: float,
         stream_status: MessageStreamStatus,
         session_factory: Any,
-    ) -> None:
-        if not assistant_message_id or not events:
-            return
+    ) -> bool:
+        # Materializes the full event log into Message.content once the message
+        # reaches a terminal state; the incremental segments become redundant.
+        if not assistant_message_id or not content:
+            return False
 
         try:
             async with session_factory() as db:
@@ -257,13 +319,20 @@ class StreamOrchestrator:
                 message = result.scalar_one_or_none()
 
                 if message:
-                    message.content = json.dumps(events, ensure_ascii=False)
+                    message.content = content
                     message.total_cost_usd = total_cost_usd
                     message.stream_status = stream_status
                     db.add(message)
+                    await db.execute(
+                        delete(MessageEvent).where(
+                            MessageEvent.message_id == message_uuid
+                        )
+                    )
                     await db.commit()
+                    return True
         except Exception as exc:
             logger.error("Failed to save message content: %s", exc)
+        return False
 
     async def _create_checkpoint_if_needed(
         self,
@@ -448,6 +517,7 @@ async def run_chat_stream(
 
     publisher = StreamPublisher(chat_id)
     result: str = ""
+    reconcile_args: dict[str, Any] | None = None
 
     try:
         await publisher.connect(task, skip_stream_delete=is_queue_continuation)
@@ -466,10 +536,6 @@ async def run_chat_stream(
                     assistant_message_id=assistant_message_id,
                     session_factory=session_local,
                     session_container=session_container,
-                    sandbox_id=str(chat.sandbox_id) if chat.sandbox_id else "",
-                    user_id=str(chat.user_id),
-                    model_id=model_id,
-                    context_usage_trigger=context_usage_trigger,
                 )
 
                 user = User(id=chat.user_id)
@@ -489,16 +555,6 @@ async def run_chat_stream(
                     is_custom_prompt=is_custom_prompt,
                 )
 
-                sandbox_id_str = str(chat.sandbox_id) if chat.sandbox_id else ""
-                if session_id and sandbox_id_str and context_usage_trigger:
-                    context_usage_trigger(
-                        chat_id=chat_id,
-                        session_id=session_id,
-                        sandbox_id=sandbox_id_str,
-                        user_id=str(chat.user_id),
-                        model_id=model_id,
-                    )
-
                 ctx = StreamContext(
                     chat_id=chat_id,
                     stream=stream,
@@ -508,6 +564,7 @@ async def run_chat_stream(
                     sandbox_service=sandbox_service,
                     chat=chat,
                     session_factory=session_local,
+                    event_log=MessageEventLog(assistant_message_id, session_local),
                     events=events,
                 )
 
@@ -526,9 +583,28 @@ async def run_chat_stream(
                 )
 
                 result = outcome.final_content
+
+                # A continuation reconciles when it completes in turn
+                current_session_id = session_container["session_id"]
+                if chat.sandbox_id and current_session_id and not outcome.continued:
+                    usage = ctx.context_usage or {}
+                    window = usage.get("context_window")
+                    reconcile_args = {
+                        "chat_id": chat_id,
+                        "session_id": current_session_id,
+                        "sandbox_id": str(chat.sandbox_id),
+                        "user_id": str(chat.user_id),
+                        "model_id": model_id,
+                        "context_window": window if isinstance(window, int) else None,
+                    }
     finally:
         await publisher.cleanup()
 
+    # Queued only once cleanup has dropped the task key, so the /context probe
+    # never runs alongside the CLI that served this run
+    if reconcile_args and context_usage_trigger:
+        context_usage_trigger(**reconcile_args)
+
     return result
 
 
@@ -559,14 +635,13 @@ async def initialize_and_run_chat(
                 raise UserException("User settings not found")
 
             provider_type = user_settings.sandbox_provider
-            api_key = None
-            if provider_type == SandboxProviderType.E2B.value:
-                api_key = user_settings.e2b_api_key
-            elif provider_type == SandboxProviderType.MODAL.value:
-                api_key = user_settings.modal_api_key
-            provider = create_sandbox_provider(
+            provider = get_sandbox_provider(
                 provider_type=provider_type,
-                api_key=api_key,
+                api_key=sandbox_api_key(
+                    provider_type,
+                    user_settings.e2b_api_key,
+                    user_settings.modal_api_key,
+                ),
             )
 
         sandbox_service = SandboxService(
@@ -14,8 +14,13 @@ from claude_agent_sdk import (
     ThinkingBlock,
     SystemMessage,
 )
+from app.models.types import JSONDict
 from app.services.tool_handler import ToolHandlerRegistry
-from app.services.streaming.events import StreamEvent, StreamEventType
+from app.services.streaming.events import (
+    StreamEvent,
+    StreamEventType,
+    context_usage_data,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -27,16 +32,27 @@ PROMPT_SUGGESTIONS_PATTERN = re.compile(
 
 MessageType: TypeAlias = AssistantMessage | UserMessage | ResultMessage | SystemMessage
 
+# Everything a request reads or writes stays in the context for the next one
+CONTEXT_USAGE_FIELDS = (
+    "input_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+    "output_tokens",
+)
+
 
 class StreamProcessor:
     def __init__(
         self,
         tool_registry: ToolHandlerRegistry,
         session_handler: Callable[[str], None] | None = None,
+        context_window: int = 0,
     ) -> None:
         self._tool_registry = tool_registry
         self._session_handler = session_handler
+        self._context_window = context_window
         self.total_cost_usd = 0.0
+        self.context_tokens: int | None = None
 
     def _process_session_init(self, message: SystemMessage) -> None:
         if message.subtype != "init" or not self._session_handler:
@@ -62,6 +78,13 @@ class StreamProcessor:
         if isinstance(message, ResultMessage):
             if message.total_cost_usd is not None:
                 self.total_cost_usd = message.total_cost_usd
+            yield from self._reconcile_context_window(message)
+
+    @property
+    def context_usage(self) -> JSONDict | None:
+        if self.context_tokens is None:
+            return None
+        return context_usage_data(self.context_tokens, self._context_window)
 
     def _emit_assistant_events(
         self, message: AssistantMessage
@@ -70,6 +93,44 @@ class StreamProcessor:
         for block in message.content:
             yield from self._emit_block_events(block, parent_tool_use_id)
 
+        # Sub-agents run in a context of their own
+        usage = getattr(message, "usage", None)
+        if usage and not parent_tool_use_id:
+            tokens = sum(int(usage.get(key) or 0) for key in CONTEXT_USAGE_FIELDS)
+            yield from self._emit_context_usage(tokens, self._context_window)
+
+    def _reconcile_context_window(
+        self, message: ResultMessage
+    ) -> Iterable[StreamEvent]:
+        # The result reports the real window of each model the turn used
+        model_usage = getattr(message, "model_usage", None)
+        if self.context_tokens is None or not isinstance(model_usage, dict):
+            return
+        windows = [
+            usage["contextWindow"]
+            for usage in model_usage.values()
+            if isinstance(usage, dict)
+            and isinstance(usage.get("contextWindow"), int)
+            and usage["contextWindow"] > 0
+        ]
+        if windows:
+            yield from self._emit_context_usage(self.context_tokens, max(windows))
+
+    def _emit_context_usage(
+        self, tokens: int, context_window: int
+    ) -> Iterable[StreamEvent]:
+        # Assistant messages are split per content block and repeat the usage
+        # of their request, so only changes are published
+        if tokens == self.context_tokens and context_window == self._context_window:
+            return
+        self.context_tokens = tokens
+        self._context_window = context_window
+        event: StreamEvent = {
+            "type": "system",
+            "data": {"context_usage": context_usage_data(tokens, context_window)},
+        }
+        yield event
+
     def _emit_block_events(
         self, block: Any, parent_tool_use_id: str | None = None
     ) -> Iterable[StreamEvent]:
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import TYPE_CHECKING, Any
+
+from app.core.config import get_settings
+
+if TYPE_CHECKING:
+    from celery import Task
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class ProgressReporter:
+    # Every update_state call is a synchronous write to the Celery result backend,
+    # so PROGRESS is reported at most once per STREAM_PROGRESS_EVERY_EVENTS events
+    # or STREAM_PROGRESS_INTERVAL_MS, whichever comes first.
+    def __init__(
+        self,
+        task: Task[Any, Any],
+        every_events: int | None = None,
+        interval_ms: float | None = None,
+    ) -> None:
+        self._task = task
+        self._every_events = max(
+            every_events or settings.STREAM_PROGRESS_EVERY_EVENTS, 1
+        )
+        self._interval = (
+            interval_ms
+            if interval_ms is not None
+            else settings.STREAM_PROGRESS_INTERVAL_MS
+        ) / 1000
+        self._unreported = 0
+        self._last_reported_at = time.monotonic()
+
+    def report(self, events_emitted: int) -> None:
+        self._unreported += 1
+        now = time.monotonic()
+        if (
+            self._unreported < self._every_events
+            and now - self._last_reported_at < self._interval
+        ):
+            return
+        self._update(events_emitted, now)
+
+    def flush(self, events_emitted: int) -> None:
+        if self._unreported:
+            self._update(events_emitted, time.monotonic())
+
+    def _update(self, events_emitted: int, now: float) -> None:
+        self._unreported = 0
+        self._last_reported_at = now
+        try:
+            self._task.update_state(
+                state="PROGRESS",
+                meta={"status": "Processing", "events_emitted": events_emitted},
+            )
+        except Exception as exc:
+            logger.debug("Failed to report stream progress: %s", exc)
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
+import time
+from contextlib import suppress
 from typing import TYPE_CHECKING, Any
 
 from redis.asyncio import Redis
@@ -12,7 +15,10 @@ from app.constants import (
     REDIS_KEY_CHAT_TASK,
 )
 from app.core.config import get_settings
+from app.core.metrics import STREAM_PUBLISH_FLUSH_SECONDS, STREAM_PUBLISH_FLUSH_SIZE
+from app.services.streaming.codec import encode_stream_payload
 from app.services.streaming.events import StreamEvent
+from app.utils.redis import get_redis_client
 
 if TYPE_CHECKING:
     from celery import Task
@@ -24,19 +30,35 @@ STREAM_MAX_LEN = 10_000
 
 
 class StreamPublisher:
-    def __init__(self, chat_id: str) -> None:
+    # With batching enabled, "content" entries are buffered and written through a
+    # single non-transactional pipeline once STREAM_PUBLISH_BATCH_SIZE entries are
+    # pending or STREAM_PUBLISH_FLUSH_INTERVAL_MS has elapsed. Every other kind
+    # (complete, error, queue events) flushes immediately so ordering is kept and
+    # terminal entries are never delayed.
+    def __init__(self, chat_id: str, batching: bool | None = None) -> None:
         self.chat_id = chat_id
         self._redis: Redis[str] | None = None
+        self._stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        self._batching = (
+            settings.STREAM_PUBLISH_BATCHING if batching is None else batching
+        )
+        self._batch_size = max(settings.STREAM_PUBLISH_BATCH_SIZE, 1)
+        self._flush_interval = settings.STREAM_PUBLISH_FLUSH_INTERVAL_MS / 1000
+        self._buffer: list[dict[str, str | int | float]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task[None] | None = None
 
     async def connect(
         self, task: Task[Any, Any], skip_stream_delete: bool = False
     ) -> None:
         try:
-            self._redis = Redis.from_url(settings.REDIS_URL, decode_responses=True)
-            if not skip_stream_delete:
-                await self._redis.delete(
-                    REDIS_KEY_CHAT_STREAM.format(chat_id=self.chat_id)
-                )
+            self._redis = get_redis_client()
+            if skip_stream_delete:
+                # A queue continuation keeps appending to the previous stream,
+                # which may already carry a retention TTL
+                await self._redis.persist(self._stream_key)
+            else:
+                await self._redis.delete(self._stream_key)
             await self._redis.setex(
                 REDIS_KEY_CHAT_TASK.format(chat_id=self.chat_id),
                 settings.TASK_TTL_SECONDS,
@@ -58,14 +80,21 @@ class StreamPublisher:
 
         fields: dict[str, str | int | float] = {"kind": kind}
         if payload is not None:
-            if isinstance(payload, str):
-                fields["payload"] = payload
-            else:
-                fields["payload"] = json.dumps(payload, ensure_ascii=False)
+            if not isinstance(payload, str):
+                payload = json.dumps(payload, ensure_ascii=False)
+            fields.update(encode_stream_payload(payload))
+
+        if self._batching:
+            self._buffer.append(fields)
+            if kind != "content" or len(self._buffer) >= self._batch_size:
+                await self.flush()
+            elif self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flush_after_interval())
+            return
 
         try:
             await self._redis.xadd(
-                REDIS_KEY_CHAT_STREAM.format(chat_id=self.chat_id),
+                self._stream_key,
                 fields,
                 maxlen=STREAM_MAX_LEN,
                 approximate=True,
@@ -75,6 +104,40 @@ class StreamPublisher:
                 "Failed to append stream entry for chat %s: %s", self.chat_id, exc
             )
 
+    async def _flush_after_interval(self) -> None:
+        await asyncio.sleep(self._flush_interval)
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self._buffer or not self._redis:
+                return
+
+            batch = self._buffer
+            self._buffer = []
+            started = time.perf_counter()
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for fields in batch:
+                        pipe.xadd(
+                            self._stream_key,
+                            fields,
+                            maxlen=STREAM_MAX_LEN,
+                            approximate=True,
+                        )
+                    await pipe.execute()
+            except Exception as exc:
+                logger.warning(
+                    "Failed to flush %d stream entries for chat %s: %s",
+                    len(batch),
+                    self.chat_id,
+                    exc,
+                )
+                return
+            finally:
+                STREAM_PUBLISH_FLUSH_SECONDS.observe(time.perf_counter() - started)
+            STREAM_PUBLISH_FLUSH_SIZE.observe(len(batch))
+
     async def publish_event(self, event: StreamEvent) -> None:
         await self.publish("content", {"event": event})
 
@@ -110,15 +173,49 @@ class StreamPublisher:
     async def clear_stream(self) -> None:
         if not self._redis:
             return
+        async with self._flush_lock:
+            # Anything still buffered belongs to the stream being cleared
+            self._buffer.clear()
         try:
-            await self._redis.delete(REDIS_KEY_CHAT_STREAM.format(chat_id=self.chat_id))
+            await self._redis.delete(self._stream_key)
         except Exception as exc:
             logger.warning("Failed to clear stream for chat %s: %s", self.chat_id, exc)
 
+    async def apply_retention(self) -> None:
+        # Called once the assistant message is persisted: the stream only has to
+        # serve clients reconnecting shortly after the run, so keep a small tail
+        # and let the key expire instead of waiting for the next run to delete it.
+        if not self._redis:
+            return
+        tail = settings.STREAM_RETENTION_TAIL
+        ttl = settings.STREAM_RETENTION_TTL_SECONDS
+        if tail <= 0 and ttl <= 0:
+            return
+
+        await self.flush()
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                if tail > 0:
+                    pipe.xtrim(self._stream_key, maxlen=tail, approximate=False)
+                if ttl > 0:
+                    pipe.expire(self._stream_key, ttl)
+                await pipe.execute()
+        except Exception as exc:
+            logger.warning(
+                "Failed to apply stream retention for chat %s: %s", self.chat_id, exc
+            )
+
     async def cleanup(self) -> None:
         if not self._redis:
             return
 
+        await self.flush()
+        if self._flush_task:
+            self._flush_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+
         try:
             await self._redis.delete(REDIS_KEY_CHAT_TASK.format(chat_id=self.chat_id))
             await self._redis.delete(
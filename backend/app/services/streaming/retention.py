@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import logging
+import time
+from typing import Any
+from uuid import UUID
+
+from redis.asyncio import Redis
+from sqlalchemy import select
+
+from app.constants import REDIS_KEY_CHAT_STREAM, REDIS_KEY_CHAT_TASK
+from app.core.config import get_settings
+from app.db.session import get_celery_session
+from app.models.db_models import Chat
+from app.utils.redis import redis_connection
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+STREAM_KEY_PATTERN = REDIS_KEY_CHAT_STREAM.format(chat_id="*")
+SWEEP_SCAN_COUNT = 500
+
+
+def _chat_id_from_key(key: str) -> UUID | None:
+    try:
+        return UUID(key.split(":")[1])
+    except (IndexError, ValueError):
+        return None
+
+
+async def _live_chat_ids(chat_ids: list[UUID]) -> set[UUID]:
+    if not chat_ids:
+        return set()
+    async with get_celery_session() as (session_factory, _):
+        async with session_factory() as db:
+            result = await db.execute(
+                select(Chat.id).filter(Chat.id.in_(chat_ids), Chat.deleted_at.is_(None))
+            )
+            return set(result.scalars().all())
+
+
+async def _sweep_batch(redis: Redis[str], keys: list[str]) -> tuple[int, int]:
+    chat_ids = {key: _chat_id_from_key(key) for key in keys}
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.exists(REDIS_KEY_CHAT_TASK.format(chat_id=chat_ids[key] or ""))
+            pipe.xrevrange(key, count=1)
+        results = await pipe.execute()
+
+    now_ms = time.time() * 1000
+    idle_cutoff_ms = settings.STREAM_SWEEP_IDLE_SECONDS * 1000
+    live_chats = await _live_chat_ids([c for c in chat_ids.values() if c])
+
+    orphaned: list[str] = []
+    for index, key in enumerate(keys):
+        has_task, latest = results[index * 2], results[index * 2 + 1]
+        if has_task:
+            continue
+        last_ms = int(latest[0][0].split("-")[0]) if latest else 0
+        if chat_ids[key] not in live_chats or now_ms - last_ms >= idle_cutoff_ms:
+            orphaned.append(key)
+
+    if not orphaned:
+        return 0, 0
+
+    # Estimated from the server's default sample of entries, in one round trip;
+    # MEMORY USAGE may be disabled, the keys are still removed
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in orphaned:
+            pipe.memory_usage(key)
+        usages = await pipe.execute(raise_on_error=False)
+    reclaimed = sum(usage for usage in usages if isinstance(usage, int))
+    await redis.unlink(*orphaned)
+    return len(orphaned), reclaimed
+
+
+async def sweep_orphaned_streams() -> dict[str, Any]:
+    # Removes chat streams that no run will read again: the chat was deleted, or
+    # no task is active and the newest entry is older than STREAM_SWEEP_IDLE_SECONDS.
+    scanned = deleted = reclaimed_bytes = 0
+    try:
+        async with redis_connection() as redis:
+            batch: list[str] = []
+            async for key in redis.scan_iter(
+                match=STREAM_KEY_PATTERN, count=SWEEP_SCAN_COUNT, _type="stream"
+            ):
+                batch.append(key)
+                if len(batch) >= SWEEP_SCAN_COUNT:
+                    removed, reclaimed = await _sweep_batch(redis, batch)
+                    scanned += len(batch)
+                    deleted += removed
+                    reclaimed_bytes += reclaimed
+                    batch = []
+            if batch:
+                removed, reclaimed = await _sweep_batch(redis, batch)
+                scanned += len(batch)
+                deleted += removed
+                reclaimed_bytes += reclaimed
+    except Exception as e:
+        logger.error("Error sweeping orphaned chat streams: %s", e)
+        return {"error": str(e)}
+
+    logger.info(
+        "Swept %s of %s chat streams, reclaimed %s bytes",
+        deleted,
+        scanned,
+        reclaimed_bytes,
+    )
+    return {"scanned": scanned, "deleted": deleted, "reclaimed_bytes": reclaimed_bytes}
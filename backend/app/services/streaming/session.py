@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
-from typing import Any, Callable
+from typing import Any
 from uuid import UUID
 
 from sqlalchemy import select
@@ -29,33 +29,16 @@ class SessionUpdateCallback:
         assistant_message_id: str | None,
         session_factory: Any,
         session_container: dict[str, Any],
-        sandbox_id: str,
-        user_id: str,
-        model_id: str,
-        context_usage_trigger: Callable[..., Any] | None = None,
     ) -> None:
         self.chat_id = chat_id
         self.assistant_message_id = assistant_message_id
         self.session_factory = session_factory
         self.session_container = session_container
-        self.sandbox_id = sandbox_id
-        self.user_id = user_id
-        self.model_id = model_id
-        self._context_usage_trigger = context_usage_trigger
 
     def __call__(self, new_session_id: str) -> None:
         self.session_container["session_id"] = new_session_id
         asyncio.create_task(self._update_session_id(new_session_id))
 
-        if self.sandbox_id and self._context_usage_trigger:
-            self._context_usage_trigger(
-                chat_id=self.chat_id,
-                session_id=new_session_id,
-                sandbox_id=self.sandbox_id,
-                user_id=self.user_id,
-                model_id=self.model_id,
-            )
-
     async def _update_session_id(self, session_id: str) -> None:
         if not self.session_factory:
             return
@@ -1,26 +1,242 @@
 import asyncio
+import hashlib
+import io
 import json
-import re
 import shlex
+import tarfile
+import time
 from abc import ABC, abstractmethod
 from collections.abc import AsyncIterable, AsyncIterator
 from contextlib import suppress
 from dataclasses import asdict
 from types import TracebackType
-from typing import Any, Self
+from typing import Any, NamedTuple, Self
 
-from claude_agent_sdk._errors import CLIConnectionError, CLIJSONDecodeError
+from claude_agent_sdk._errors import CLIConnectionError, ProcessError
 from claude_agent_sdk._internal.transport import Transport
 from claude_agent_sdk._version import __version__ as sdk_version
 from claude_agent_sdk.types import ClaudeAgentOptions
 
+from app.services.transports.buffer import StdoutBuffer
+from app.services.transports.framing import JsonLineFramer
+
 DEFAULT_MAX_BUFFER_SIZE = 1024 * 1024 * 10  # 10MB
-STDOUT_QUEUE_MAXSIZE = 32
-ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+# Unconsumed CLI output: readers pause above the high watermark and resume
+# below the low one; push-based readers fail the turn past the hard limit
+STDOUT_HIGH_WATERMARK = 4 * 1024 * 1024
+STDOUT_LOW_WATERMARK = 1024 * 1024
+STDOUT_HARD_LIMIT = 64 * 1024 * 1024
+STDOUT_COALESCE_MAX_BYTES = 1024 * 1024
+# Content-addressed files holding large launch arguments (system prompt, MCP
+# and agent JSON). Files older than LAUNCH_FILES_MAX_AGE_MINUTES are pruned
+# whenever new ones are written; writers trust a file they wrote for less
+# than half that.
+LAUNCH_FILES_DIR = "/home/user/.claudex/launch"
+LAUNCH_FILES_MAX_AGE_MINUTES = 24 * 60
+# Exit status of a launch whose files are gone from the sandbox; checked
+# before the CLI starts, since a missing file would otherwise pass an empty
+# argument
+LAUNCH_FILES_MISSING_EXIT_CODE = 97
+SANDBOX_USER_UID = 1000
+
+
+class LaunchFileRef(NamedTuple):
+    # An argument read from a launch file when the command runs
+    path: str
+
+
+def launch_file_path(content: str, suffix: str) -> str:
+    digest = hashlib.sha256(content.encode()).hexdigest()
+    return f"{LAUNCH_FILES_DIR}/{digest}{suffix}"
+
+
+def launch_files_tar(files: dict[str, str]) -> bytes:
+    # Archive rooted at / that creates the launch directory and files owned
+    # by the sandbox user, for put_archive or `tar -x -C /`
+    mtime = time.time()
+    stream = io.BytesIO()
+    with tarfile.open(fileobj=stream, mode="w") as tar:
+        directories = ["home/user/.claudex", LAUNCH_FILES_DIR.lstrip("/")]
+        for directory in directories:
+            info = tarfile.TarInfo(directory)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o700
+            info.mtime = mtime
+            info.uid = info.gid = SANDBOX_USER_UID
+            tar.addfile(info)
+        for path, content in files.items():
+            data = content.encode()
+            info = tarfile.TarInfo(path.lstrip("/"))
+            info.size = len(data)
+            info.mode = 0o600
+            info.mtime = mtime
+            info.uid = info.gid = SANDBOX_USER_UID
+            tar.addfile(info, io.BytesIO(data))
+    return stream.getvalue()
+
+
+def launch_files_prune_command() -> list[str]:
+    return [
+        "find",
+        LAUNCH_FILES_DIR,
+        "-type",
+        "f",
+        "-mmin",
+        f"+{LAUNCH_FILES_MAX_AGE_MINUTES}",
+        "-delete",
+    ]
+
+
+def launch_files_missing(error: BaseException) -> bool:
+    return (
+        isinstance(error, ProcessError)
+        and error.exit_code == LAUNCH_FILES_MISSING_EXIT_CODE
+    )
+
+
+def build_cli_command(
+    options: ClaudeAgentOptions, launch_files: dict[str, str] | None = None
+) -> str:
+    # With launch_files, the system prompt, MCP config and agents go into
+    # content-addressed files (collected there) and the command only refers
+    # to their paths, exiting with LAUNCH_FILES_MISSING_EXIT_CODE if one is
+    # missing. The command execs the CLI, so it must come last in a shell.
+    def from_file(content: str, suffix: str) -> str | LaunchFileRef:
+        if launch_files is None:
+            return content
+        path = launch_file_path(content, suffix)
+        launch_files[path] = content
+        return LaunchFileRef(path)
+
+    cli_binary = str(options.cli_path) if options.cli_path else "claude"
+    cmd: list[str | LaunchFileRef] = [
+        cli_binary,
+        "--output-format",
+        "stream-json",
+        "--verbose",
+    ]
+
+    if options.system_prompt is None:
+        pass
+    elif isinstance(options.system_prompt, str):
+        cmd.extend(["--system-prompt", from_file(options.system_prompt, ".txt")])
+    else:
+        if (
+            options.system_prompt.get("type") == "preset"
+            and "append" in options.system_prompt
+        ):
+            cmd.extend(
+                [
+                    "--append-system-prompt",
+                    from_file(options.system_prompt["append"], ".txt"),
+                ]
+            )
+
+    if options.allowed_tools:
+        cmd.extend(["--allowedTools", ",".join(options.allowed_tools)])
+
+    if options.max_turns:
+        cmd.extend(["--max-turns", str(options.max_turns)])
+
+    if options.disallowed_tools:
+        cmd.extend(["--disallowedTools", ",".join(options.disallowed_tools)])
+
+    if options.model:
+        cmd.extend(["--model", options.model])
+
+    if options.permission_prompt_tool_name:
+        cmd.extend(["--permission-prompt-tool", options.permission_prompt_tool_name])
+
+    if options.permission_mode:
+        cmd.extend(["--permission-mode", options.permission_mode])
+
+    if options.continue_conversation:
+        cmd.append("--continue")
+
+    if options.resume:
+        cmd.extend(["--resume", options.resume])
+
+    if options.settings:
+        cmd.extend(["--settings", options.settings])
+
+    for directory in options.add_dirs:
+        cmd.extend(["--add-dir", str(directory)])
+
+    if options.mcp_servers:
+        if isinstance(options.mcp_servers, dict):
+            servers_for_cli: dict[str, Any] = {}
+            for name, config in options.mcp_servers.items():
+                if isinstance(config, dict) and config.get("type") == "sdk":
+                    servers_for_cli[name] = {
+                        key: value for key, value in config.items() if key != "instance"
+                    }
+                else:
+                    servers_for_cli[name] = config
+            if servers_for_cli:
+                mcp_config = json.dumps({"mcpServers": servers_for_cli})
+                # The CLI reads --mcp-config from a path as well
+                if launch_files is not None:
+                    path = launch_file_path(mcp_config, ".json")
+                    launch_files[path] = mcp_config
+                    cmd.extend(["--mcp-config", path])
+                else:
+                    cmd.extend(["--mcp-config", mcp_config])
+        else:
+            cmd.extend(["--mcp-config", str(options.mcp_servers)])
+
+    if options.include_partial_messages:
+        cmd.append("--include-partial-messages")
+
+    if options.fork_session:
+        cmd.append("--fork-session")
+
+    if options.max_thinking_tokens:
+        cmd.extend(["--max-thinking-tokens", str(options.max_thinking_tokens)])
+
+    if options.agents:
+        agents_dict = {
+            name: {k: v for k, v in asdict(agent_def).items() if v is not None}
+            for name, agent_def in options.agents.items()
+        }
+        cmd.extend(["--agents", from_file(json.dumps(agents_dict), ".json")])
+
+    sources_value = (
+        ",".join(options.setting_sources) if options.setting_sources is not None else ""
+    )
+    cmd.extend(["--setting-sources", sources_value])
+
+    for flag, value in options.extra_args.items():
+        if value is None:
+            cmd.append(f"--{flag}")
+        else:
+            cmd.extend([f"--{flag}", str(value)])
+
+    cmd.extend(["--input-format", "stream-json"])
+    command_line = "exec " + " ".join(
+        f'"$(cat {shlex.quote(arg.path)})"'
+        if isinstance(arg, LaunchFileRef)
+        else shlex.quote(arg)
+        for arg in cmd
+    )
+    if not launch_files:
+        return command_line
+    checks = " && ".join(f"[ -r {shlex.quote(path)} ]" for path in launch_files)
+    return f"{{ {checks}; }} || exit {LAUNCH_FILES_MISSING_EXIT_CODE}; {command_line}"
+
+
+def build_cli_environment(options: ClaudeAgentOptions) -> dict[str, str]:
+    envs = {
+        "CLAUDE_CODE_ENTRYPOINT": "sdk-py",
+        "CLAUDE_AGENT_SDK_VERSION": sdk_version,
+        "CLAUDE_CODE_SANDBOX": "1",
+        "PYTHONUNBUFFERED": "1",
+    }
+    envs.update(options.env or {})
+    return envs
 
 
 class BaseSandboxTransport(Transport, ABC):
-    _SENTINEL = object()
+    _stdout_label = "sandbox"
 
     def __init__(
         self,
@@ -37,14 +253,27 @@ class BaseSandboxTransport(Transport, ABC):
             if options.max_buffer_size is not None
             else DEFAULT_MAX_BUFFER_SIZE
         )
-        self._json_decoder = json.JSONDecoder()
         self._monitor_task: asyncio.Task[None] | None = None
-        self._stdout_queue: asyncio.Queue[str | object] = asyncio.Queue(
-            maxsize=STDOUT_QUEUE_MAXSIZE
+        self._stdout_buffer = StdoutBuffer(
+            label=self._stdout_label,
+            high_watermark=STDOUT_HIGH_WATERMARK,
+            low_watermark=STDOUT_LOW_WATERMARK,
+            hard_limit=max(STDOUT_HARD_LIMIT, 2 * self._max_buffer_size),
+            coalesce_limit=STDOUT_COALESCE_MAX_BYTES,
         )
         self._ready = False
         self._exit_error: Exception | None = None
         self._stdin_closed = False
+        # Persistent transports keep reading after a "result" so the same CLI
+        # process can serve the next turn
+        self.persistent = False
+        # Command line and environment serialized ahead of time (a cached
+        # LaunchProfile), used instead of rebuilding them from the options
+        self.launch_command: str | None = None
+        self.launch_env: dict[str, str] | None = None
+        # Launch files the command refers to that the sandbox may not have yet;
+        # written by connect() before the CLI starts
+        self.launch_files: dict[str, str] = {}
 
     async def __aenter__(self) -> Self:
         return self
@@ -71,13 +300,11 @@ class BaseSandboxTransport(Transport, ABC):
         pass
 
     def _prepare_environment(self) -> tuple[dict[str, str], str, str]:
-        envs = {
-            "CLAUDE_CODE_ENTRYPOINT": "sdk-py",
-            "CLAUDE_AGENT_SDK_VERSION": sdk_version,
-            "CLAUDE_CODE_SANDBOX": "1",
-            "PYTHONUNBUFFERED": "1",
-        }
-        envs.update(self._options.env or {})
+        envs = (
+            dict(self.launch_env)
+            if self.launch_env is not None
+            else build_cli_environment(self._options)
+        )
         cwd = str(self._options.cwd) if self._options.cwd else "/home/user"
         user = self._options.user or "user"
         return envs, cwd, user
@@ -92,16 +319,14 @@ class BaseSandboxTransport(Transport, ABC):
         if self._stdin_closed:
             raise CLIConnectionError("Cannot write after input has been closed")
 
-    async def _put_sentinel(self) -> None:
-        try:
-            self._stdout_queue.put_nowait(self._SENTINEL)
-        except asyncio.QueueFull:
-            pass
-
     @abstractmethod
     async def connect(self) -> None:
         pass
 
+    @abstractmethod
+    async def _write_launch_files(self) -> None:
+        pass
+
     @abstractmethod
     async def _cleanup_resources(self) -> None:
         pass
@@ -126,7 +351,7 @@ class BaseSandboxTransport(Transport, ABC):
         self._monitor_task = None
         await self._cleanup_resources()
         self._stdin_closed = False
-        await self._put_sentinel()
+        self._stdout_buffer.close(discard=True)
 
     async def write(self, data: str) -> None:
         if not self._ready or not self._is_connection_ready():
@@ -159,208 +384,53 @@ class BaseSandboxTransport(Transport, ABC):
     def is_ready(self) -> bool:
         return self._ready
 
-    def _build_command(self) -> str:
-        cli_binary = str(self._options.cli_path) if self._options.cli_path else "claude"
-        cmd = [cli_binary, "--output-format", "stream-json", "--verbose"]
-
-        if self._options.system_prompt is None:
-            pass
-        elif isinstance(self._options.system_prompt, str):
-            cmd.extend(["--system-prompt", self._options.system_prompt])
-        else:
-            if (
-                self._options.system_prompt.get("type") == "preset"
-                and "append" in self._options.system_prompt
-            ):
-                cmd.extend(
-                    ["--append-system-prompt", self._options.system_prompt["append"]]
-                )
-
-        if self._options.allowed_tools:
-            cmd.extend(["--allowedTools", ",".join(self._options.allowed_tools)])
-
-        if self._options.max_turns:
-            cmd.extend(["--max-turns", str(self._options.max_turns)])
-
-        if self._options.disallowed_tools:
-            cmd.extend(["--disallowedTools", ",".join(self._options.disallowed_tools)])
-
-        if self._options.model:
-            cmd.extend(["--model", self._options.model])
-
-        if self._options.permission_prompt_tool_name:
-            cmd.extend(
-                ["--permission-prompt-tool", self._options.permission_prompt_tool_name]
-            )
-
-        if self._options.permission_mode:
-            cmd.extend(["--permission-mode", self._options.permission_mode])
-
-        if self._options.continue_conversation:
-            cmd.append("--continue")
-
-        if self._options.resume:
-            cmd.extend(["--resume", self._options.resume])
-
-        if self._options.settings:
-            cmd.extend(["--settings", self._options.settings])
-
-        for directory in self._options.add_dirs:
-            cmd.extend(["--add-dir", str(directory)])
-
-        if self._options.mcp_servers:
-            if isinstance(self._options.mcp_servers, dict):
-                servers_for_cli: dict[str, Any] = {}
-                for name, config in self._options.mcp_servers.items():
-                    if isinstance(config, dict) and config.get("type") == "sdk":
-                        servers_for_cli[name] = {
-                            key: value
-                            for key, value in config.items()
-                            if key != "instance"
-                        }
-                    else:
-                        servers_for_cli[name] = config
-                if servers_for_cli:
-                    cmd.extend(
-                        ["--mcp-config", json.dumps({"mcpServers": servers_for_cli})]
-                    )
-            else:
-                cmd.extend(["--mcp-config", str(self._options.mcp_servers)])
-
-        if self._options.include_partial_messages:
-            cmd.append("--include-partial-messages")
-
-        if self._options.fork_session:
-            cmd.append("--fork-session")
-
-        if self._options.max_thinking_tokens:
-            cmd.extend(
-                ["--max-thinking-tokens", str(self._options.max_thinking_tokens)]
-            )
-
-        if self._options.agents:
-            agents_dict = {
-                name: {k: v for k, v in asdict(agent_def).items() if v is not None}
-                for name, agent_def in self._options.agents.items()
-            }
-            cmd.extend(["--agents", json.dumps(agents_dict)])
-
-        sources_value = (
-            ",".join(self._options.setting_sources)
-            if self._options.setting_sources is not None
-            else ""
+    def is_alive(self) -> bool:
+        # Connected, input still open and the CLI process not known to have exited
+        return (
+            self._ready
+            and not self._stdin_closed
+            and self._exit_error is None
+            and self._is_connection_ready()
+            and (self._monitor_task is None or not self._monitor_task.done())
         )
-        cmd.extend(["--setting-sources", sources_value])
-
-        for flag, value in self._options.extra_args.items():
-            if value is None:
-                cmd.append(f"--{flag}")
-            else:
-                cmd.extend([f"--{flag}", str(value)])
-
-        cmd.extend(["--input-format", "stream-json"])
-        return shlex.join(cmd)
-
-    def _parse_json_buffer(self, buffer: str) -> tuple[str, list[Any]]:
-        # Parses concatenated JSON objects from a buffer, returning unparsed remainder.
-        # Uses raw_decode instead of json.loads because the buffer may contain multiple
-        # JSON objects back-to-back (e.g., '{"a":1}{"b":2}'). json.loads would fail on this,
-        # but raw_decode returns the offset where parsing stopped, allowing us to extract
-        # each object one at a time and preserve any incomplete trailing data for the next chunk.
-        messages: list[Any] = []
-        working = buffer
-
-        while working:
-            stripped = working.lstrip()
-            leading = len(working) - len(stripped)
-            if leading:
-                working = stripped
-            try:
-                data, offset = self._json_decoder.raw_decode(working)
-            except json.JSONDecodeError:
-                break
-            messages.append(data)
-            working = working[offset:]
 
-        return working, messages
+    def _build_command(self) -> str:
+        if self.launch_command is not None:
+            return self.launch_command
+        return build_cli_command(self._options)
 
     async def _parse_cli_output(self) -> AsyncIterator[dict[str, Any]]:
-        # Stream-based JSON parser that processes Claude CLI output incrementally.
-        # The CLI outputs newline-delimited JSON messages, but terminal output may contain
-        # ANSI escape codes (colors, cursor movement) that must be stripped before parsing.
-        # Uses a state machine: json_started tracks if we've found the first '{' or '[',
-        # allowing us to skip any non-JSON preamble from the CLI startup.
+        # Chunks from the sandbox (bytes, or text for SDKs that decode for us) are
+        # framed incrementally by JsonLineFramer; reading stops after the
+        # "result" message unless the transport is persistent, and anything left
+        # when stdout closes must be JSON.
         if not self._ready and not self._monitor_task:
             raise CLIConnectionError("Transport is not connected")
 
-        json_buffer = ""
-        json_started = False
+        framer = JsonLineFramer(self._max_buffer_size)
         should_stop = False
 
-        while True:
-            chunk = await self._stdout_queue.get()
+        while not should_stop:
+            chunk = await self._stdout_buffer.get()
 
-            if chunk is self._SENTINEL:
-                break
-            if not isinstance(chunk, str):
-                continue
-
-            # Strip ANSI escape codes (e.g., \x1B[32m for colors) that terminals inject.
-            # These codes break JSON parsing if not removed.
-            clean_chunk = ANSI_ESCAPE_RE.sub("", chunk)
-            clean_chunk = clean_chunk.replace("\r", "")
-
-            json_lines = clean_chunk.split("\n")
-            for json_line in json_lines:
-                json_line = json_line.strip()
-                if not json_line:
-                    continue
-
-                if not json_started:
-                    first_brace_positions = [
-                        pos
-                        for pos in (json_line.find("{"), json_line.find("["))
-                        if pos != -1
-                    ]
-                    if not first_brace_positions:
-                        continue
-                    json_line = json_line[min(first_brace_positions) :]
-                    json_started = True
-
-                json_buffer += json_line
-                if len(json_buffer) > self._max_buffer_size:
-                    json_buffer = ""
-                    raise CLIJSONDecodeError(
-                        json_line,
-                        ValueError(
-                            f"CLI output exceeded max buffer size of {self._max_buffer_size}"
-                        ),
-                    )
-
-                json_buffer, parsed_messages = self._parse_json_buffer(json_buffer)
-                if parsed_messages:
-                    for data in parsed_messages:
-                        yield data
-                        if isinstance(data, dict) and data.get("type") == "result":
-                            json_buffer = ""
-                            should_stop = True
-                            break
-                    if not json_buffer:
-                        json_started = False
-                if should_stop:
-                    break
-            if should_stop:
+            if chunk is None:
+                for data in framer.finish():
+                    yield data
                 break
 
-        if json_buffer:
-            leftover, parsed_messages = self._parse_json_buffer(json_buffer)
-            for data in parsed_messages:
-                yield data
-            if leftover.strip():
-                try:
-                    json.loads(leftover)
-                except json.JSONDecodeError as exc:
-                    raise CLIJSONDecodeError(leftover, exc) from exc
+            try:
+                for data in framer.feed(chunk):
+                    yield data
+                    if (
+                        not self.persistent
+                        and isinstance(data, dict)
+                        and data.get("type") == "result"
+                    ):
+                        should_stop = True
+                        break
+            finally:
+                # Counted against the budget until its messages were taken
+                self._stdout_buffer.consumed(len(chunk))
 
         if self._exit_error:
             raise self._exit_error
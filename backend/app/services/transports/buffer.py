@@ -0,0 +1,148 @@
+import asyncio
+import time
+from collections import deque
+from typing import cast
+
+from claude_agent_sdk._errors import CLIConnectionError
+
+from app.core.metrics import (
+    SANDBOX_STDOUT_BUFFERED_BYTES,
+    SANDBOX_STDOUT_CHUNK_LATENCY_SECONDS,
+    SANDBOX_STDOUT_STALL_SECONDS,
+)
+
+
+class StdoutBuffer:
+    # Byte-budgeted buffer between a sandbox reader and the CLI output parser.
+    # Chunks count against the budget until the parser has handed every
+    # message framed from them downstream (consumed()), so a slow consumer,
+    # e.g. the orchestrator waiting on Postgres, shows up here rather than in
+    # the sandbox reader. Crossing the high watermark pauses readers that use
+    # put() until the backlog is back under the low watermark; push-based
+    # readers (E2B callbacks) use feed_nowait() and are never blocked, up to
+    # a hard limit that fails the turn instead of growing without bound. Each
+    # episode above the high watermark is recorded as stall time, and every
+    # chunk's wait between arriving and being taken as chunk latency. get()
+    # coalesces queued chunks so small writes are framed in one pass.
+    def __init__(
+        self,
+        *,
+        label: str,
+        high_watermark: int,
+        low_watermark: int,
+        hard_limit: int,
+        coalesce_limit: int,
+    ) -> None:
+        self._high_watermark = high_watermark
+        self._low_watermark = min(low_watermark, high_watermark)
+        self._hard_limit = max(hard_limit, high_watermark)
+        self._coalesce_limit = coalesce_limit
+        self._chunks: deque[bytes | str] = deque()
+        self._arrivals: deque[float] = deque()
+        self._size = 0
+        self._closed = False
+        self._readable = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self._paused_at: float | None = None
+        self._stall_seconds = SANDBOX_STDOUT_STALL_SECONDS.labels(transport=label)
+        self._buffered_bytes = SANDBOX_STDOUT_BUFFERED_BYTES.labels(transport=label)
+        self._chunk_latency = SANDBOX_STDOUT_CHUNK_LATENCY_SECONDS.labels(
+            transport=label
+        )
+
+    @property
+    def size(self) -> int:
+        # Buffered plus handed to the parser but not yet consumed
+        return self._size
+
+    @property
+    def above_high_watermark(self) -> bool:
+        return self._paused_at is not None
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def feed_nowait(self, chunk: bytes | str) -> None:
+        if self._closed or not chunk:
+            return
+        if self._size + len(chunk) > self._hard_limit:
+            raise CLIConnectionError(
+                f"CLI output backlog exceeded {self._hard_limit} bytes"
+            )
+        self._chunks.append(chunk)
+        self._arrivals.append(time.monotonic())
+        self._add(len(chunk))
+        if self._paused_at is None and self._size >= self._high_watermark:
+            self._paused_at = time.monotonic()
+            self._drained.clear()
+        self._readable.set()
+
+    async def put(self, chunk: bytes | str) -> None:
+        self.feed_nowait(chunk)
+        if self._paused_at is not None:
+            await self._drained.wait()
+
+    async def wait_drained(self) -> None:
+        await self._drained.wait()
+
+    async def get(self) -> bytes | str | None:
+        # Returns None once closed and empty
+        while not self._chunks:
+            if self._closed:
+                return None
+            self._readable.clear()
+            await self._readable.wait()
+
+        now = time.monotonic()
+        chunk = self._pop(now)
+        if not self._chunks or len(chunk) >= self._coalesce_limit:
+            return chunk
+
+        parts = [chunk]
+        total = len(chunk)
+        while (
+            self._chunks
+            and type(self._chunks[0]) is type(chunk)
+            and total + len(self._chunks[0]) <= self._coalesce_limit
+        ):
+            parts.append(self._pop(now))
+            total += len(parts[-1])
+        if len(parts) == 1:
+            return chunk
+        if isinstance(chunk, bytes):
+            return b"".join(cast(list[bytes], parts))
+        return "".join(cast(list[str], parts))
+
+    def _pop(self, now: float) -> bytes | str:
+        self._chunk_latency.observe(now - self._arrivals.popleft())
+        return self._chunks.popleft()
+
+    def consumed(self, size: int) -> None:
+        self._add(-size)
+        if self._paused_at is not None and self._size <= self._low_watermark:
+            self._resume()
+
+    def close(self, discard: bool = False) -> None:
+        # End of output: get() drains what is left, then returns None. Never
+        # blocks, and releases paused readers. discard drops the backlog when
+        # nobody will read it (transport teardown).
+        self._closed = True
+        self._readable.set()
+        if discard and self._chunks:
+            self._add(-sum(len(chunk) for chunk in self._chunks))
+            self._chunks.clear()
+            self._arrivals.clear()
+        if self._paused_at is not None:
+            self._resume()
+
+    def _add(self, delta: int) -> None:
+        self._size += delta
+        self._buffered_bytes.inc(delta)
+
+    def _resume(self) -> None:
+        assert self._paused_at is not None
+        self._stall_seconds.observe(time.monotonic() - self._paused_at)
+        self._paused_at = None
+        self._drained.set()
@@ -2,21 +2,103 @@ import asyncio
 import logging
 import select
 import socket
+import ssl
+import struct
 from collections.abc import AsyncIterable
-from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
 from typing import Any
 
 from claude_agent_sdk._errors import CLIConnectionError, ProcessError
 from claude_agent_sdk.types import ClaudeAgentOptions
 
+from app.services.sandbox_providers.docker_connections import (
+    DockerConnectionError,
+    get_docker_connections,
+)
+from app.services.sandbox_providers.docker_events import get_docker_events
 from app.services.sandbox_providers.types import DockerConfig
-from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.base import (
+    BaseSandboxTransport,
+    launch_files_prune_command,
+    launch_files_tar,
+)
 
 logger = logging.getLogger(__name__)
 
+DOCKER_FRAME_HEADER = struct.Struct(">BxxxL")
+SOCKET_READ_MIN_SIZE = 64 * 1024
+SOCKET_READ_MAX_SIZE = 1024 * 1024
+EXEC_EXIT_POLL_SECONDS = 30.0
+
+
+class DockerStreamDemuxer:
+    # Demultiplexes the hijacked exec stream: each frame is an 8-byte header
+    # (stream type, 3 padding bytes, big-endian payload size) plus payload.
+    # The socket is read straight into a preallocated buffer and frames are
+    # located by offset, so only payloads are copied out; the unparsed tail is
+    # moved to the front only when the buffer needs room. The read window
+    # doubles whenever a read fills it and shrinks again when reads get small.
+    def __init__(self, max_frame_size: int) -> None:
+        self._max_frame_size = max_frame_size
+        self._buffer = bytearray(SOCKET_READ_MIN_SIZE)
+        self._start = 0
+        self._end = 0
+        self._frame_size = 0
+        self._read_size = SOCKET_READ_MIN_SIZE
+
+    def writable(self) -> memoryview:
+        if self._start == self._end:
+            self._start = self._end = 0
+            if len(self._buffer) > 2 * SOCKET_READ_MAX_SIZE:
+                # Release the space a very large frame needed
+                self._buffer = bytearray(self._read_size)
+
+        pending = self._end - self._start
+        want = max(self._read_size, self._frame_size - pending)
+        if len(self._buffer) - self._end < want and self._start:
+            view = memoryview(self._buffer)
+            view[:pending] = view[self._start : self._end]
+            view.release()
+            self._start, self._end = 0, pending
+        shortfall = want - (len(self._buffer) - self._end)
+        if shortfall > 0:
+            self._buffer.extend(bytes(shortfall))
+        return memoryview(self._buffer)[self._end : self._end + want]
+
+    def commit(self, size: int, requested: int) -> None:
+        self._end += size
+        if size >= requested and self._read_size < SOCKET_READ_MAX_SIZE:
+            self._read_size *= 2
+        elif size < self._read_size // 8 and self._read_size > SOCKET_READ_MIN_SIZE:
+            self._read_size //= 2
+
+    def frames(self) -> list[tuple[int, bytes]]:
+        frames: list[tuple[int, bytes]] = []
+        buffer = self._buffer
+        with memoryview(buffer) as view:
+            while self._end - self._start >= DOCKER_FRAME_HEADER.size:
+                stream_type, size = DOCKER_FRAME_HEADER.unpack_from(buffer, self._start)
+                if size > self._max_frame_size:
+                    logger.warning("Dropping oversized Docker frame of %d bytes", size)
+                    self._start = self._end
+                    self._frame_size = 0
+                    break
+                total = DOCKER_FRAME_HEADER.size + size
+                if self._end - self._start < total:
+                    self._frame_size = total
+                    break
+                payload_start = self._start + DOCKER_FRAME_HEADER.size
+                frames.append(
+                    (stream_type, bytes(view[payload_start : payload_start + size]))
+                )
+                self._start += total
+                self._frame_size = 0
+        return frames
+
 
 class DockerSandboxTransport(BaseSandboxTransport):
+    _stdout_label = "docker"
+
     def __init__(
         self,
         *,
@@ -27,43 +109,24 @@ class DockerSandboxTransport(BaseSandboxTransport):
     ) -> None:
         super().__init__(sandbox_id=sandbox_id, prompt=prompt, options=options)
         self._docker_config = docker_config
-        self._executor = ThreadPoolExecutor(max_workers=4)
-        self._docker_client: Any = None
+        # Client, executors and container handles are shared process-wide
+        self._docker = get_docker_connections(docker_config.host)
+        self._executor = self._docker.executor
         self._container: Any = None
         self._exec_id: str | None = None
         self._socket: Any = None
+        self._raw_socket: socket.socket | None = None
         self._reader_task: asyncio.Task[None] | None = None
+        self._output_closed = asyncio.Event()
 
     def _get_logger(self) -> Any:
         return logger
 
-    def _get_docker_client(self) -> Any:
-        if self._docker_client is None:
-            try:
-                import docker
-
-                if self._docker_config.host:
-                    self._docker_client = docker.DockerClient(
-                        base_url=self._docker_config.host
-                    )
-                else:
-                    self._docker_client = docker.from_env()
-            except ImportError:
-                raise CLIConnectionError(
-                    "Docker SDK not installed. Run: pip install docker"
-                )
-            except Exception as e:
-                raise CLIConnectionError(f"Failed to connect to Docker: {e}")
-        return self._docker_client
-
     def _get_container(self) -> Any:
-        client = self._get_docker_client()
         try:
-            container = client.containers.get(f"claudex-sandbox-{self._sandbox_id}")
-            container.reload()
-            if container.status != "running":
-                container.start()
-            return container
+            return self._docker.get_container(self._sandbox_id)
+        except DockerConnectionError as e:
+            raise CLIConnectionError(str(e))
         except Exception as e:
             raise CLIConnectionError(
                 f"Failed to connect to sandbox {self._sandbox_id}: {e}"
@@ -78,7 +141,7 @@ class DockerSandboxTransport(BaseSandboxTransport):
     ) -> tuple[str, Any]:
         exec_result = self._container.client.api.exec_create(
             self._container.id,
-            cmd=["bash", "-c", f"exec {command_line}"],
+            cmd=["bash", "-c", command_line],
             stdin=True,
             tty=False,
             environment=envs,
@@ -93,10 +156,21 @@ class DockerSandboxTransport(BaseSandboxTransport):
         )
         return exec_id, socket
 
+    def _put_launch_files(self, archive: bytes) -> None:
+        self._container.put_archive("/", archive)
+        self._container.exec_run(launch_files_prune_command(), user="user")
+
+    async def _write_launch_files(self) -> None:
+        archive = launch_files_tar(self.launch_files)
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._put_launch_files, archive
+        )
+
     async def connect(self) -> None:
         if self._ready:
             return
         self._stdin_closed = False
+        self._output_closed.clear()
 
         loop = asyncio.get_running_loop()
 
@@ -109,6 +183,14 @@ class DockerSandboxTransport(BaseSandboxTransport):
                 f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
             ) from exc
 
+        if self.launch_files:
+            try:
+                await self._write_launch_files()
+            except Exception as exc:
+                raise CLIConnectionError(
+                    f"Failed to write launch files: {exc}"
+                ) from exc
+
         command_line = self._build_command()
         envs, cwd, user = self._prepare_environment()
         envs["TERM"] = "xterm-256color"
@@ -119,8 +201,21 @@ class DockerSandboxTransport(BaseSandboxTransport):
                 lambda: self._create_exec(command_line, envs, cwd, user),
             )
         except Exception as exc:
-            raise CLIConnectionError(f"Failed to start Claude CLI: {exc}") from exc
+            # The cached handle may be stale (container stopped or recreated);
+            # look it up again once before giving up
+            self._docker.invalidate(self._sandbox_id)
+            try:
+                self._container = await loop.run_in_executor(
+                    self._executor, self._get_container
+                )
+                self._exec_id, self._socket = await loop.run_in_executor(
+                    self._executor,
+                    lambda: self._create_exec(command_line, envs, cwd, user),
+                )
+            except Exception:
+                raise CLIConnectionError(f"Failed to start Claude CLI: {exc}") from exc
 
+        self._raw_socket = self._get_loop_socket()
         self._reader_task = loop.create_task(self._read_socket_data())
         self._monitor_task = loop.create_task(self._monitor_process())
         self._ready = True
@@ -172,18 +267,15 @@ class DockerSandboxTransport(BaseSandboxTransport):
             with suppress(Exception):
                 self._socket.close()
             self._socket = None
+        self._raw_socket = None
 
         self._exec_id = None
 
-        if self._docker_client:
-            with suppress(Exception):
-                self._docker_client.close()
-            self._docker_client = None
-
-        await asyncio.to_thread(self._executor.shutdown, wait=True)
-
     async def _send_data(self, data: str) -> None:
         loop = asyncio.get_running_loop()
+        if self._raw_socket is not None:
+            await loop.sock_sendall(self._raw_socket, data.encode("utf-8"))
+            return
         await loop.run_in_executor(
             self._executor, lambda: self._socket_send(data.encode("utf-8"))
         )
@@ -224,32 +316,77 @@ class DockerSandboxTransport(BaseSandboxTransport):
                 pass
         return None
 
-    def _recv_with_select(self, timeout: float) -> bytes | None:
+    def _get_loop_socket(self) -> socket.socket | None:
+        # The hijacked exec stream is a plain socket for unix:// and tcp://
+        # hosts; it is switched to non-blocking and driven by the event loop.
+        # TLS and SSH connections keep the blocking reads in the executor.
+        raw = getattr(self._socket, "_sock", self._socket)
+        if not isinstance(raw, socket.socket) or isinstance(raw, ssl.SSLSocket):
+            return None
+        try:
+            raw.setblocking(False)
+        except OSError:
+            return None
+        return raw
+
+    def _recv_into_with_select(self, view: memoryview, timeout: float) -> int | None:
         fd = self._get_socket_fd()
         if fd is None:
             return None
         try:
             readable, _, _ = select.select([fd], [], [], timeout)
             if not readable:
-                return b""
-            return self._socket_recv(4096)
+                return 0
+            return self._socket_recv_into(view) or None
         except Exception:
             return None
 
+    async def _recv_into(self, view: memoryview, timeout: float) -> int | None:
+        # Returns the number of bytes read, 0 on timeout and None once the
+        # stream is closed
+        if self._raw_socket is None:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._docker.stream_executor,
+                self._recv_into_with_select,
+                view,
+                timeout,
+            )
+        try:
+            async with asyncio.timeout(timeout):
+                received = await asyncio.get_running_loop().sock_recv_into(
+                    self._raw_socket, view
+                )
+        except TimeoutError:
+            return 0
+        except OSError:
+            return None
+        return received or None
+
     async def _read_socket_data(self) -> None:
-        loop = asyncio.get_running_loop()
-        buffer = b""
+        demuxer = DockerStreamDemuxer(self._max_buffer_size)
         drain_empty_count = 0
 
         try:
             while True:
                 timeout = 5.0 if self._ready else 0.2
-                data = await loop.run_in_executor(
-                    self._executor, self._recv_with_select, timeout
-                )
-                if data is None:
+                view = demuxer.writable()
+                requested = len(view)
+                try:
+                    received = await self._recv_into(view, timeout)
+                finally:
+                    # An executor read abandoned on cancellation may still
+                    # hold the buffer; the reader is exiting in that case
+                    with suppress(BufferError):
+                        view.release()
+                if received is None:
+                    # EOF: let the monitor record the exit status before the
+                    # parser sees the sentinel
+                    self._output_closed.set()
+                    if self._monitor_task and not self._monitor_task.done():
+                        await asyncio.wait({self._monitor_task}, timeout=5.0)
                     break
-                if len(data) == 0:
+                if received == 0:
                     if not self._ready:
                         drain_empty_count += 1
                         if drain_empty_count >= 5:
@@ -257,25 +394,11 @@ class DockerSandboxTransport(BaseSandboxTransport):
                     continue
                 drain_empty_count = 0
 
-                buffer += data
-
-                while len(buffer) >= 8:
-                    stream_type = buffer[0]
-                    frame_size = int.from_bytes(buffer[4:8], byteorder="big")
-
-                    if frame_size > self._max_buffer_size:
-                        buffer = b""
-                        break
-
-                    if len(buffer) < 8 + frame_size:
-                        break
-
-                    payload = buffer[8 : 8 + frame_size]
-                    buffer = buffer[8 + frame_size :]
-
+                demuxer.commit(received, requested)
+                for stream_type, payload in demuxer.frames():
                     if stream_type == 1:
-                        decoded = payload.decode("utf-8", errors="replace")
-                        await self._stdout_queue.put(decoded)
+                        # Raw bytes: a multi-byte character may span frames
+                        await self._stdout_buffer.put(payload)
                     elif stream_type == 2 and self._options.stderr:
                         try:
                             self._options.stderr(
@@ -288,17 +411,21 @@ class DockerSandboxTransport(BaseSandboxTransport):
         except Exception as e:
             logger.error("Socket reader error: %s", e)
         finally:
-            await self._put_sentinel()
+            self._stdout_buffer.close()
 
-    def _socket_recv(self, size: int) -> bytes:
+    def _socket_recv_into(self, view: memoryview) -> int:
         if not self._socket:
-            return b""
-        if hasattr(self._socket, "recv"):
-            return bytes(self._socket.recv(size))
-        if hasattr(self._socket, "read"):
-            return bytes(self._socket.read(size))
+            return 0
+        if hasattr(self._socket, "recv_into"):
+            return int(self._socket.recv_into(view))
+        if hasattr(self._socket, "readinto"):
+            return int(self._socket.readinto(view) or 0)
         if hasattr(self._socket, "_sock"):
-            return bytes(self._socket._sock.recv(size))
+            return int(self._socket._sock.recv_into(view))
+        if hasattr(self._socket, "recv"):
+            data = self._socket.recv(len(view))
+            view[: len(data)] = data
+            return len(data)
         raise CLIConnectionError("Socket does not support recv/read")
 
     def _socket_send(self, payload: bytes) -> None:
@@ -325,32 +452,70 @@ class DockerSandboxTransport(BaseSandboxTransport):
             logger.warning("exec_inspect failed for exec_id %s: %s", self._exec_id, e)
             return None
 
+    async def _inspect_until_exited(
+        self, loop: asyncio.AbstractEventLoop, attempts: int
+    ) -> dict[str, Any] | None:
+        # Right after EOF or exec_die the daemon may briefly still report the
+        # exec as running
+        delay = 0.05
+        info = None
+        for attempt in range(attempts):
+            info = await loop.run_in_executor(self._executor, self._get_exec_info)
+            if info is None or not info.get("Running", True):
+                return info
+            if attempt + 1 < attempts:
+                await asyncio.sleep(delay)
+                delay *= 2
+        return info
+
     async def _monitor_process(self) -> None:
+        # Exit is signalled by the shared exec_die event stream or by EOF on
+        # the exec socket; the exec is inspected only when the event carries no
+        # exit code. A slow inspect remains as a safety net for missed events.
         if not self._exec_id or not self._container:
             return
 
         loop = asyncio.get_running_loop()
+        exec_events = get_docker_events(self._docker_config.host)
+        exit_waiter = exec_events.wait(self._exec_id)
+        closed_waiter = asyncio.ensure_future(self._output_closed.wait())
+        pending: set[asyncio.Future[Any]] = {exit_waiter, closed_waiter}
 
         try:
             while self._ready:
-                await asyncio.sleep(0.5)
-
-                info = await loop.run_in_executor(self._executor, self._get_exec_info)
-                if info is None:
-                    self._exit_error = CLIConnectionError(
-                        "Claude CLI process disappeared"
+                if pending:
+                    await asyncio.wait(
+                        pending,
+                        timeout=EXEC_EXIT_POLL_SECONDS,
+                        return_when=asyncio.FIRST_COMPLETED,
                     )
-                    break
+                else:
+                    await asyncio.sleep(EXEC_EXIT_POLL_SECONDS)
 
-                if not info.get("Running", True):
-                    exit_code = info.get("ExitCode", -1)
-                    if exit_code != 0:
-                        self._exit_error = ProcessError(
-                            "Claude CLI exited with an error",
-                            exit_code=exit_code,
-                            stderr="",
+                if exit_waiter.done() and exit_waiter.result() is not None:
+                    exit_code = exit_waiter.result()
+                else:
+                    signalled = exit_waiter.done() or closed_waiter.done()
+                    pending = {waiter for waiter in pending if not waiter.done()}
+                    info = await self._inspect_until_exited(
+                        loop, attempts=6 if signalled else 1
+                    )
+                    if info is None:
+                        self._exit_error = CLIConnectionError(
+                            "Claude CLI process disappeared"
                         )
-                    break
+                        break
+                    if info.get("Running", True):
+                        continue
+                    exit_code = info.get("ExitCode", -1)
+
+                if exit_code != 0:
+                    self._exit_error = ProcessError(
+                        "Claude CLI exited with an error",
+                        exit_code=exit_code,
+                        stderr="",
+                    )
+                break
         except asyncio.CancelledError:
             pass
         except Exception as exc:
@@ -358,4 +523,7 @@ class DockerSandboxTransport(BaseSandboxTransport):
                 f"Claude CLI stopped unexpectedly: {exc}"
             )
         finally:
+            exec_events.discard(self._exec_id or "")
+            exit_waiter.cancel()
+            closed_waiter.cancel()
             self._ready = False
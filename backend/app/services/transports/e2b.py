@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import shlex
 from collections.abc import AsyncIterable
 from contextlib import suppress
 from typing import Any
@@ -8,15 +9,21 @@ from claude_agent_sdk._errors import CLIConnectionError, ProcessError
 from claude_agent_sdk.types import ClaudeAgentOptions
 from e2b import AsyncSandbox
 from e2b.sandbox.commands.command_handle import CommandExitException
+from e2b.sandbox.filesystem.filesystem import WriteEntry
 from e2b.sandbox_async.commands.command_handle import AsyncCommandHandle
 
 from app.constants import SANDBOX_AUTO_PAUSE_TIMEOUT
-from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.base import (
+    BaseSandboxTransport,
+    launch_files_prune_command,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class E2BSandboxTransport(BaseSandboxTransport):
+    _stdout_label = "e2b"
+
     def __init__(
         self,
         *,
@@ -49,11 +56,27 @@ class E2BSandboxTransport(BaseSandboxTransport):
                 f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
             ) from exc
 
+        if self.launch_files:
+            try:
+                await self._write_launch_files()
+            except Exception as exc:
+                raise CLIConnectionError(
+                    f"Failed to write launch files: {exc}"
+                ) from exc
+
         command_line = self._build_command()
         envs, cwd, user = self._prepare_environment()
 
         async def on_stdout(data: str) -> None:
-            await self._stdout_queue.put(data)
+            # Never wait here: the E2B SDK dispatches all of the command's
+            # events from this callback, so blocking it stalls the sandbox
+            # stream. A backlog past the hard limit ends the turn instead.
+            try:
+                self._stdout_buffer.feed_nowait(data)
+            except CLIConnectionError as exc:
+                logger.error("Stopping Claude CLI: %s", exc)
+                self._exit_error = exc
+                self._stdout_buffer.close()
 
         async def on_stderr(data: str) -> None:
             if self._options.stderr:
@@ -80,6 +103,18 @@ class E2BSandboxTransport(BaseSandboxTransport):
         self._monitor_task = loop.create_task(self._monitor_process())
         self._ready = True
 
+    async def _write_launch_files(self) -> None:
+        assert self._sandbox is not None
+        await self._sandbox.files.write(
+            [
+                WriteEntry(path=path, data=content)
+                for path, content in self.launch_files.items()
+            ]
+        )
+        await self._sandbox.commands.run(
+            shlex.join(launch_files_prune_command()), background=True
+        )
+
     def _is_connection_ready(self) -> bool:
         return self._command is not None and self._sandbox is not None
 
@@ -113,5 +148,5 @@ class E2BSandboxTransport(BaseSandboxTransport):
                 f"Claude CLI stopped unexpectedly: {exc}"
             )
         finally:
-            await self._put_sentinel()
+            self._stdout_buffer.close()
             self._ready = False
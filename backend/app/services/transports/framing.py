@@ -0,0 +1,123 @@
+import json
+import re
+from collections.abc import Callable
+from typing import Any
+
+from claude_agent_sdk._errors import CLIJSONDecodeError
+
+_loads: Callable[[bytes | bytearray], Any]
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+ANSI_ESCAPE_BYTES_RE = re.compile(rb"\x1B\[[0-?]*[ -/]*[@-~]")
+JSON_START_BYTES = (b"{", b"[")
+
+
+class JsonLineFramer:
+    # Incremental framer for the CLI's newline-delimited JSON on stdout.
+    # Chunks are appended to one bytearray and complete lines are located with
+    # find(b"\n"), resuming where the previous scan stopped, so a 10MB message
+    # split over thousands of chunks is scanned once and copied once. Only
+    # complete lines are decoded; ANSI stripping runs only on lines containing
+    # an ESC byte. Lines that do not parse on their own (a message wrapped over
+    # several lines, or several messages on one line) fall back to the
+    # raw_decode path and are concatenated with the following lines until
+    # they do.
+    def __init__(self, max_buffer_size: int) -> None:
+        self._max_buffer_size = max_buffer_size
+        self._buffer = bytearray()
+        self._scan_from = 0
+        self._pending = ""
+        self._json_decoder = json.JSONDecoder()
+
+    def feed(self, chunk: bytes | str) -> list[Any]:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        buffer = self._buffer
+        buffer += chunk
+
+        messages: list[Any] = []
+        start = 0
+        newline = buffer.find(b"\n", self._scan_from)
+        while newline != -1:
+            self._frame(buffer[start:newline], messages)
+            start = newline + 1
+            newline = buffer.find(b"\n", start)
+
+        if start:
+            del buffer[:start]
+        self._scan_from = len(buffer)
+
+        if len(buffer) + len(self._pending) > self._max_buffer_size:
+            tail = self._pending + buffer[:256].decode("utf-8", errors="replace")
+            self.reset()
+            raise CLIJSONDecodeError(
+                tail,
+                ValueError(
+                    f"CLI output exceeded max buffer size of {self._max_buffer_size}"
+                ),
+            )
+        return messages
+
+    def finish(self) -> list[Any]:
+        # Flushes an unterminated last line; raises if what remains is not JSON
+        messages: list[Any] = []
+        if self._buffer:
+            self._frame(bytes(self._buffer), messages)
+        leftover = self._pending
+        self.reset()
+        if leftover.strip():
+            try:
+                json.loads(leftover)
+            except json.JSONDecodeError as exc:
+                raise CLIJSONDecodeError(leftover, exc) from exc
+        return messages
+
+    def reset(self) -> None:
+        self._buffer = bytearray()
+        self._scan_from = 0
+        self._pending = ""
+
+    def _frame(self, line: bytes | bytearray, messages: list[Any]) -> None:
+        if b"\x1b" in line:
+            line = ANSI_ESCAPE_BYTES_RE.sub(b"", line)
+        line = line.strip()
+        if not line:
+            return
+
+        if not self._pending:
+            if not line.startswith(JSON_START_BYTES):
+                # Skip non-JSON preamble the CLI may print before the stream
+                positions = [
+                    pos for pos in map(line.find, JSON_START_BYTES) if pos >= 0
+                ]
+                if not positions:
+                    return
+                line = line[min(positions) :]
+            try:
+                messages.append(_loads(line))
+                return
+            except ValueError:
+                pass
+
+        self._pending += line.decode("utf-8", errors="replace").replace("\r", "")
+        self._pending = self._drain_pending(messages)
+
+    def _drain_pending(self, messages: list[Any]) -> str:
+        # raw_decode instead of json.loads because the text may hold several
+        # objects back-to-back (e.g. '{"a":1}{"b":2}'); the incomplete tail is
+        # returned and completed by the next line.
+        working = self._pending
+        while working:
+            working = working.lstrip()
+            try:
+                data, offset = self._json_decoder.raw_decode(working)
+            except json.JSONDecodeError:
+                break
+            messages.append(data)
+            working = working[offset:]
+        return working
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 import os
+import shlex
 from collections.abc import AsyncIterable
 from contextlib import suppress
 from typing import Any
@@ -9,12 +10,19 @@ import modal
 from claude_agent_sdk._errors import CLIConnectionError, ProcessError
 from claude_agent_sdk.types import ClaudeAgentOptions
 
-from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.base import (
+    LAUNCH_FILES_DIR,
+    BaseSandboxTransport,
+    launch_files_prune_command,
+    launch_files_tar,
+)
 
 logger = logging.getLogger(__name__)
 
 
 class ModalSandboxTransport(BaseSandboxTransport):
+    _stdout_label = "modal"
+
     def __init__(
         self,
         *,
@@ -22,13 +30,19 @@ class ModalSandboxTransport(BaseSandboxTransport):
         api_key: str,
         prompt: str | AsyncIterable[dict[str, Any]],
         options: ClaudeAgentOptions,
+        sandbox: Any | None = None,
     ) -> None:
+        # sandbox: an already looked-up handle, used instead of Sandbox.from_id
         super().__init__(sandbox_id=sandbox_id, prompt=prompt, options=options)
         self._api_key = api_key
-        self._sandbox: modal.Sandbox | None = None
+        self._sandbox: Any | None = sandbox
         self._process: Any | None = None
         self._stdout_reader_task: asyncio.Task[None] | None = None
         self._monitor_task: asyncio.Task[None] | None = None
+        # Writes queue in Modal's stdin buffer and are flushed by one drain at
+        # a time; writers arriving during a drain share the next one
+        self._stdin_lock = asyncio.Lock()
+        self._stdin_unflushed = 0
         self._setup_auth()
 
     def _setup_auth(self) -> None:
@@ -46,18 +60,30 @@ class ModalSandboxTransport(BaseSandboxTransport):
         if self._ready:
             return
         self._stdin_closed = False
-        try:
-            self._sandbox = await modal.Sandbox.from_id.aio(self._sandbox_id)
-        except Exception as exc:
-            raise CLIConnectionError(
-                f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
-            ) from exc
+        self._stdin_unflushed = 0
+        if self._sandbox is None:
+            try:
+                self._sandbox = await modal.Sandbox.from_id.aio(self._sandbox_id)
+            except Exception as exc:
+                raise CLIConnectionError(
+                    f"Failed to connect to sandbox {self._sandbox_id}: {exc}"
+                ) from exc
+
+        if self.launch_files:
+            try:
+                await self._write_launch_files()
+            except Exception as exc:
+                raise CLIConnectionError(
+                    f"Failed to write launch files: {exc}"
+                ) from exc
 
         command_line = self._build_command()
         envs, cwd, user = self._prepare_environment()
 
         try:
             assert self._sandbox is not None
+            # Bytes mode: stdout chunks go to the framer as they arrive, without
+            # a decode and line split on the client
             self._process = await self._sandbox.exec.aio(
                 "runuser",
                 "-u",
@@ -67,6 +93,7 @@ class ModalSandboxTransport(BaseSandboxTransport):
                 "-c",
                 f"cd {cwd} && {command_line}",
                 env={key: str(value) for key, value in envs.items()},
+                text=False,
             )
         except Exception as exc:
             raise CLIConnectionError(f"Failed to start Claude CLI: {exc}") from exc
@@ -76,6 +103,28 @@ class ModalSandboxTransport(BaseSandboxTransport):
         self._stdout_reader_task = loop.create_task(self._read_stdout())
         self._ready = True
 
+    async def _write_launch_files(self) -> None:
+        # One exec unpacks every file from stdin and prunes old ones
+        assert self._sandbox is not None
+        user = self._options.user or "user"
+        process = await self._sandbox.exec.aio(
+            "runuser",
+            "-u",
+            user,
+            "--",
+            "bash",
+            "-c",
+            f"tar -x -C / && {shlex.join(launch_files_prune_command())}",
+        )
+        process.stdin.write(launch_files_tar(self.launch_files))
+        process.stdin.write_eof()
+        await process.stdin.drain.aio()
+        await process.wait.aio()
+        if process.returncode != 0:
+            raise CLIConnectionError(
+                f"Writing {LAUNCH_FILES_DIR} exited with code {process.returncode}"
+            )
+
     def _is_connection_ready(self) -> bool:
         return self._process is not None and self._sandbox is not None
 
@@ -92,23 +141,47 @@ class ModalSandboxTransport(BaseSandboxTransport):
             self._process = None
 
     async def _send_data(self, data: str) -> None:
+        # The write lands in the stdin buffer right away. If a drain started
+        # after it has already flushed it, there is nothing left to do;
+        # otherwise this call drains everything written so far in one RPC.
         assert self._process is not None
-        self._process.stdin.write(data)
-        await self._process.stdin.drain.aio()
+        process = self._process
+        process.stdin.write(data.encode("utf-8"))
+        self._stdin_unflushed += 1
+        async with self._stdin_lock:
+            if not self._stdin_unflushed:
+                return
+            self._stdin_unflushed = 0
+            try:
+                await process.stdin.drain.aio()
+            except BaseException:
+                # Writers that counted on this drain retry it and get the error
+                self._stdin_unflushed += 1
+                raise
 
     async def _send_eof(self) -> None:
         assert self._process is not None
         self._process.stdin.write_eof()
-        await self._process.stdin.drain.aio()
+        async with self._stdin_lock:
+            self._stdin_unflushed = 0
+            await self._process.stdin.drain.aio()
 
     async def _read_stdout(self) -> None:
         if not self._process:
             return
         try:
-            async for line in self._process.stdout:
-                await self._stdout_queue.put(line)
+            async for chunk in self._process.stdout:
+                await self._stdout_buffer.put(chunk)
+            # EOF: let the monitor record the exit status before the parser
+            # sees the sentinel
+            if self._monitor_task and not self._monitor_task.done():
+                await asyncio.wait({self._monitor_task}, timeout=5.0)
+        except asyncio.CancelledError:
+            pass
         except Exception as exc:
             logger.debug("Stdout reader stopped: %s", exc)
+        finally:
+            self._stdout_buffer.close()
 
     async def _monitor_process(self) -> None:
         if not self._process:
@@ -117,21 +190,23 @@ class ModalSandboxTransport(BaseSandboxTransport):
             await self._process.wait.aio()
             exit_code = self._process.returncode
             if exit_code != 0:
-                stderr_lines = []
+                stderr_chunks: list[bytes] = []
                 try:
-                    async for line in self._process.stderr:
-                        stderr_lines.append(line)
+                    async for chunk in self._process.stderr:
+                        stderr_chunks.append(chunk)
                 except Exception:
                     pass
                 self._exit_error = ProcessError(
                     "Claude CLI exited with an error",
                     exit_code=exit_code,
-                    stderr="".join(stderr_lines),
+                    stderr=b"".join(stderr_chunks).decode("utf-8", errors="replace"),
                 )
+        except asyncio.CancelledError:
+            pass
         except Exception as exc:
             self._exit_error = CLIConnectionError(
                 f"Claude CLI stopped unexpectedly: {exc}"
             )
+            self._stdout_buffer.close()
         finally:
-            await self._put_sentinel()
             self._ready = False
@@ -15,6 +15,7 @@ from app.models.schemas import UserSettingsResponse
 from app.models.types import InstalledPluginDict, JSONValue
 from app.services.base import BaseDbService, SessionFactoryType
 from app.services.exceptions import UserException
+from app.services.sandbox_providers import SandboxProviderType, provider_registry
 from app.utils.redis import redis_connection
 
 if TYPE_CHECKING:
@@ -114,6 +115,19 @@ class UserService(BaseDbService[UserSettings]):
                 cast(list[dict[str, Any]] | None, settings_update["custom_providers"])
             )
 
+        # Providers built with a key that is being replaced are not reused
+        for field, provider_type in (
+            ("e2b_api_key", SandboxProviderType.E2B),
+            ("modal_api_key", SandboxProviderType.MODAL),
+        ):
+            old_key = getattr(user_settings, field)
+            if (
+                field in settings_update
+                and old_key
+                and settings_update[field] != old_key
+            ):
+                provider_registry.retire(provider_type, old_key)
+
         for field, value in settings_update.items():
             setattr(user_settings, field, value)
             if field in json_fields:
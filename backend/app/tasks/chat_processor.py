@@ -1,7 +1,7 @@
-import asyncio
 from typing import Any
 
 from app.core.celery import celery_app
+from app.core.worker_loop import bind_task, run_in_worker_loop
 from app.services.streaming import ContextUsageTracker, initialize_and_run_chat
 
 
@@ -21,30 +21,24 @@ def process_chat(
     is_custom_prompt: bool = False,
     is_queue_continuation: bool = False,
 ) -> str:
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-
-    try:
-        return loop.run_until_complete(
-            initialize_and_run_chat(
-                task=self,
-                prompt=prompt,
-                system_prompt=system_prompt,
-                custom_instructions=custom_instructions,
-                chat_data=chat_data,
-                model_id=model_id,
-                permission_mode=permission_mode,
-                session_id=session_id,
-                assistant_message_id=assistant_message_id,
-                thinking_mode=thinking_mode,
-                attachments=attachments,
-                context_usage_trigger=fetch_context_token_usage.delay,
-                is_custom_prompt=is_custom_prompt,
-                is_queue_continuation=is_queue_continuation,
-            )
+    return run_in_worker_loop(
+        initialize_and_run_chat(
+            task=bind_task(self),
+            prompt=prompt,
+            system_prompt=system_prompt,
+            custom_instructions=custom_instructions,
+            chat_data=chat_data,
+            model_id=model_id,
+            permission_mode=permission_mode,
+            session_id=session_id,
+            assistant_message_id=assistant_message_id,
+            thinking_mode=thinking_mode,
+            attachments=attachments,
+            context_usage_trigger=fetch_context_token_usage.delay,
+            is_custom_prompt=is_custom_prompt,
+            is_queue_continuation=is_queue_continuation,
         )
-    finally:
-        loop.close()
+    )
 
 
 @celery_app.task(bind=True, ignore_result=True)
@@ -55,6 +49,7 @@ def fetch_context_token_usage(
     sandbox_id: str,
     user_id: str,
     model_id: str,
+    context_window: int | None = None,
 ) -> None:
     tracker = ContextUsageTracker(
         chat_id=chat_id,
@@ -62,12 +57,7 @@ def fetch_context_token_usage(
         sandbox_id=sandbox_id,
         user_id=user_id,
         model_id=model_id,
+        context_window=context_window,
     )
 
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-
-    try:
-        loop.run_until_complete(tracker.poll_while_streaming())
-    finally:
-        loop.close()
+    run_in_worker_loop(tracker.reconcile())
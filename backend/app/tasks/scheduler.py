@@ -1,41 +1,32 @@
-import asyncio
 from typing import Any
 
 from app.core.celery import celery_app
+from app.core.worker_loop import bind_task, run_in_worker_loop
 from app.services.scheduler import (
     check_due_tasks,
     cleanup_expired_tokens,
     run_scheduled_task,
 )
+from app.services.streaming.retention import sweep_orphaned_streams
 
 
 @celery_app.task(name="check_scheduled_tasks")
 def check_scheduled_tasks() -> dict[str, Any]:
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(
-            check_due_tasks(execute_task_trigger=execute_scheduled_task.delay)
-        )
-    finally:
-        loop.close()
+    return run_in_worker_loop(
+        check_due_tasks(execute_task_trigger=execute_scheduled_task.delay)
+    )
 
 
 @celery_app.task(bind=True, name="execute_scheduled_task")
 def execute_scheduled_task(self: Any, task_id: str) -> dict[str, Any]:
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(run_scheduled_task(task=self, task_id=task_id))
-    finally:
-        loop.close()
+    return run_in_worker_loop(run_scheduled_task(task=bind_task(self), task_id=task_id))
 
 
 @celery_app.task(name="cleanup_expired_refresh_tokens")
 def cleanup_expired_refresh_tokens() -> dict[str, Any]:
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    try:
-        return loop.run_until_complete(cleanup_expired_tokens())
-    finally:
-        loop.close()
+    return run_in_worker_loop(cleanup_expired_tokens())
+
+
+@celery_app.task(name="sweep_orphaned_chat_streams")
+def sweep_orphaned_chat_streams() -> dict[str, Any]:
+    return run_in_worker_loop(sweep_orphaned_streams())
@@ -1,18 +1,109 @@
+import asyncio
 import logging
+import weakref
 from collections.abc import AsyncIterator
 from contextlib import asynccontextmanager
-from redis.asyncio import Redis
+from typing import Any, TypeAlias
+
+from redis.asyncio import BlockingConnectionPool, Redis
 from redis.asyncio.client import PubSub
 
 from app.core.config import get_settings
+from app.core.metrics import (
+    REDIS_POOL_CONNECTIONS_IDLE,
+    REDIS_POOL_CONNECTIONS_IN_USE,
+    REDIS_POOL_MAX_CONNECTIONS,
+)
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
+# from_url picks the connection class from the URL scheme (TCP, TLS or unix)
+_Pool: TypeAlias = "BlockingConnectionPool[Any]"
+_PoolMap: TypeAlias = "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Pool]"
+
+# One pool per event loop: asyncio connections are bound to the loop that opened
+# them. The API process runs a single loop, so this is effectively one pool per
+# process; Celery tasks that drive their own loop close it via close_redis_pool().
+_pools: _PoolMap = weakref.WeakKeyDictionary()
+# Stream hub connections stay checked out for as long as a chat is watched, so
+# they come from their own pools and cannot starve the request pool
+_stream_pools: _PoolMap = weakref.WeakKeyDictionary()
+
+
+def _get_pool(pools: _PoolMap, max_connections: int) -> _Pool:
+    loop = asyncio.get_running_loop()
+    pool = pools.get(loop)
+    if pool is None:
+        pool = BlockingConnectionPool.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            max_connections=max_connections,
+            timeout=settings.REDIS_POOL_TIMEOUT_SECONDS,
+        )
+        pools[loop] = pool
+    return pool
+
+
+def get_redis_pool() -> _Pool:
+    return _get_pool(_pools, settings.REDIS_POOL_MAX_CONNECTIONS)
+
+
+def get_redis_client() -> "Redis[str]":
+    # Clients built on a shared pool are cheap; closing them leaves the pool open.
+    # decode_responses is taken from the pool; passing it here types the client.
+    return Redis(connection_pool=get_redis_pool(), decode_responses=True)
+
+
+def get_stream_redis_client() -> "Redis[str]":
+    return Redis(
+        connection_pool=_get_pool(
+            _stream_pools, settings.REDIS_STREAM_POOL_MAX_CONNECTIONS
+        ),
+        decode_responses=True,
+    )
+
+
+async def close_redis_pool() -> None:
+    loop = asyncio.get_running_loop()
+    for pools in (_pools, _stream_pools):
+        pool = pools.pop(loop, None)
+        if pool is None:
+            continue
+        try:
+            await pool.disconnect()
+        except Exception as e:
+            logger.warning("Error closing Redis connection pool: %s", e)
+
+
+def reset_redis_pools() -> None:
+    # Pools inherited through fork share sockets with the parent; drop them
+    _pools.clear()
+    _stream_pools.clear()
+
+
+def _all_pools() -> list[_Pool]:
+    return [*_pools.values(), *_stream_pools.values()]
+
+
+def _pool_connections(attr: str) -> int:
+    return sum(len(getattr(pool, attr, ())) for pool in _all_pools())
+
+
+REDIS_POOL_CONNECTIONS_IN_USE.set_function(
+    lambda: _pool_connections("_in_use_connections")
+)
+REDIS_POOL_CONNECTIONS_IDLE.set_function(
+    lambda: _pool_connections("_available_connections")
+)
+REDIS_POOL_MAX_CONNECTIONS.set_function(
+    lambda: sum(pool.max_connections for pool in _all_pools())
+)
+
 
 @asynccontextmanager
 async def redis_connection() -> "AsyncIterator[Redis[str]]":
-    redis: "Redis[str]" = Redis.from_url(settings.REDIS_URL, decode_responses=True)
+    redis = get_redis_client()
     try:
         yield redis
     finally:
@@ -0,0 +1,32 @@
+# Shared setup for the benchmark scripts in this package. Run them from the
+# backend directory, e.g. `python -m benchmarks.stream_hot_loop`.
+from __future__ import annotations
+
+import os
+import statistics
+from collections.abc import Sequence
+
+os.environ.setdefault("ENVIRONMENT", "development")
+os.environ.setdefault("SECRET_KEY", "benchmark_secret_key_at_least_32_characters_long")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def format_latencies(label: str, samples_ms: Sequence[float]) -> str:
+    if not samples_ms:
+        return f"{label}: no samples"
+    return (
+        f"{label}: n={len(samples_ms)} "
+        f"p50={percentile(samples_ms, 50):.3f}ms "
+        f"p95={percentile(samples_ms, 95):.3f}ms "
+        f"p99={percentile(samples_ms, 99):.3f}ms "
+        f"max={max(samples_ms):.3f}ms "
+        f"mean={statistics.fmean(samples_ms):.3f}ms"
+    )
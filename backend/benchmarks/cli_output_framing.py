@@ -0,0 +1,165 @@
+"""Throughput of CLI stdout framing with randomly sized chunks.
+
+Feeds recorded CLI output (raw ``--output-format stream-json`` stdout, one
+message per line) or a synthetic session containing one large tool result
+through the previous string-based parser and through ``JsonLineFramer``,
+splitting the input at random chunk sizes like the sandbox transports do.
+
+    python -m benchmarks.cli_output_framing --tool-output-mb 10
+    python -m benchmarks.cli_output_framing --recording cli_stdout.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import re
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from benchmarks import _common  # noqa: F401
+
+from app.services.transports.framing import JsonLineFramer
+
+ANSI_ESCAPE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+
+
+def synthetic_output(tool_output_mb: float, messages: int) -> bytes:
+    lines = [{"type": "system", "subtype": "init", "session_id": "bench"}]
+    for index in range(messages):
+        lines.append(
+            {
+                "type": "assistant",
+                "message": {
+                    "content": [{"type": "text", "text": f"step {index} " * 20}]
+                },
+            }
+        )
+    blob = "".join(
+        f"{n:08d} PASSED tests/test_module.py::test_case\n"
+        for n in range(int(tool_output_mb * 1024 * 1024 / 48))
+    )
+    lines.append(
+        {
+            "type": "user",
+            "message": {"content": [{"type": "tool_result", "content": blob}]},
+        }
+    )
+    lines.append({"type": "result", "subtype": "success", "total_cost_usd": 0.1})
+    return b"\n".join(json.dumps(line).encode() for line in lines) + b"\n"
+
+
+def random_chunks(raw: bytes, low: int, high: int, seed: int) -> list[bytes]:
+    rng = random.Random(seed)
+    chunks: list[bytes] = []
+    offset = 0
+    while offset < len(raw):
+        size = rng.randint(low, high)
+        chunks.append(raw[offset : offset + size])
+        offset += size
+    return chunks
+
+
+def legacy_parse(chunks: list[bytes]) -> list[Any]:
+    # The parser BaseSandboxTransport used before JsonLineFramer
+    decoder = json.JSONDecoder()
+    messages: list[Any] = []
+    json_buffer = ""
+    json_started = False
+
+    def drain(buffer: str) -> str:
+        working = buffer
+        while working:
+            working = working.lstrip()
+            try:
+                data, offset = decoder.raw_decode(working)
+            except json.JSONDecodeError:
+                break
+            messages.append(data)
+            working = working[offset:]
+        return working
+
+    for raw_chunk in chunks:
+        chunk = raw_chunk.decode("utf-8", errors="replace")
+        clean_chunk = ANSI_ESCAPE_RE.sub("", chunk).replace("\r", "")
+        for json_line in clean_chunk.split("\n"):
+            json_line = json_line.strip()
+            if not json_line:
+                continue
+            if not json_started:
+                positions = [
+                    p for p in (json_line.find("{"), json_line.find("[")) if p != -1
+                ]
+                if not positions:
+                    continue
+                json_line = json_line[min(positions) :]
+                json_started = True
+            json_buffer += json_line
+            before = len(messages)
+            json_buffer = drain(json_buffer)
+            if len(messages) > before and not json_buffer:
+                json_started = False
+    return messages
+
+
+def framer_parse(chunks: list[bytes]) -> list[Any]:
+    framer = JsonLineFramer(max_buffer_size=1 << 30)
+    messages: list[Any] = []
+    for chunk in chunks:
+        messages.extend(framer.feed(chunk))
+    messages.extend(framer.finish())
+    return messages
+
+
+def measure(
+    label: str, parse: Callable[[list[bytes]], list[Any]], chunks: list[bytes]
+) -> list[Any]:
+    started = time.perf_counter()
+    messages = parse(chunks)
+    elapsed = time.perf_counter() - started
+    size_mb = sum(len(chunk) for chunk in chunks) / (1024 * 1024)
+    print(
+        f"{label:>7}: {elapsed * 1000:9.1f}ms  {size_mb / elapsed:8.1f} MB/s  "
+        f"{len(messages)} messages"
+    )
+    return messages
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recording", type=Path, default=None)
+    parser.add_argument("--tool-output-mb", type=float, default=10.0)
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--min-chunk", type=int, default=512)
+    parser.add_argument("--max-chunk", type=int, default=8192)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    raw = (
+        args.recording.read_bytes()
+        if args.recording
+        else synthetic_output(args.tool_output_mb, args.messages)
+    )
+    chunks = random_chunks(raw, args.min_chunk, args.max_chunk, args.seed)
+    print(
+        f"{len(raw) / (1024 * 1024):.1f} MB in {len(chunks)} chunks "
+        f"of {args.min_chunk}-{args.max_chunk} bytes"
+    )
+
+    framed = measure("framer", framer_parse, chunks)
+    if not args.skip_legacy:
+        legacy = measure("legacy", legacy_parse, chunks)
+        # The old parser stripped each chunk's lines, so whitespace inside a
+        # string that happened to sit on a chunk boundary was lost
+        differing = sum(a != b for a, b in zip(legacy, framed, strict=False)) + abs(
+            len(legacy) - len(framed)
+        )
+        print(f"legacy output differs on {differing} messages")
+
+
+if __name__ == "__main__":
+    main()
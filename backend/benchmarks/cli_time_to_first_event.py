@@ -0,0 +1,123 @@
+"""Time to first event for spawn-per-turn versus a warm CLI session.
+
+Runs the same prompt against a running Docker sandbox, first spawning a new
+``claude`` process per turn (the default path), then on one process kept
+attached between turns (``CLI_WARM_SESSIONS``), and reports the latency from
+starting the turn to the first message the CLI emits. Auth is taken from the
+usual environment variables, e.g. ANTHROPIC_API_KEY.
+
+    python -m benchmarks.cli_time_to_first_event --sandbox-id <container> --turns 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks import _common
+
+from claude_agent_sdk import ClaudeAgentOptions, ClaudeSDKClient
+
+from app.services.sandbox_providers import create_docker_config
+from app.services.transports import DockerSandboxTransport
+
+AUTH_ENV_KEYS = (
+    "ANTHROPIC_API_KEY",
+    "ANTHROPIC_AUTH_TOKEN",
+    "ANTHROPIC_BASE_URL",
+    "CLAUDE_CODE_OAUTH_TOKEN",
+)
+
+
+def build_options(model: str | None) -> ClaudeAgentOptions:
+    return ClaudeAgentOptions(
+        permission_mode="bypassPermissions",
+        model=model,
+        cwd="/home/user",
+        user="user",
+        env={key: os.environ[key] for key in AUTH_ENV_KEYS if key in os.environ},
+        setting_sources=["local", "user", "project"],
+    )
+
+
+def build_client(
+    sandbox_id: str, options: ClaudeAgentOptions, persistent: bool
+) -> tuple[ClaudeSDKClient, DockerSandboxTransport]:
+    transport = DockerSandboxTransport(
+        sandbox_id=sandbox_id,
+        docker_config=create_docker_config(),
+        prompt="",
+        options=options,
+    )
+    transport.persistent = persistent
+    return ClaudeSDKClient(options=options, transport=transport), transport
+
+
+async def run_turn(client: ClaudeSDKClient, prompt: str, started: float) -> float:
+    first_event_ms = 0.0
+    await client.query(prompt)
+    async for _ in client.receive_response():
+        if not first_event_ms:
+            first_event_ms = (time.perf_counter() - started) * 1000
+    return first_event_ms
+
+
+async def cold_turns(
+    sandbox_id: str, options: ClaudeAgentOptions, prompt: str, turns: int
+) -> list[float]:
+    samples: list[float] = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        client, transport = build_client(sandbox_id, options, persistent=False)
+        try:
+            await client.connect()
+            samples.append(await run_turn(client, prompt, started))
+        finally:
+            await client.disconnect()
+            await transport.close()
+    return samples
+
+
+async def warm_turns(
+    sandbox_id: str, options: ClaudeAgentOptions, prompt: str, turns: int
+) -> tuple[float, list[float]]:
+    # The first turn pays the spawn like a cold one; the rest reuse the process
+    started = time.perf_counter()
+    client, transport = build_client(sandbox_id, options, persistent=True)
+    try:
+        await client.connect()
+        first_turn_ms = await run_turn(client, prompt, started)
+        samples: list[float] = []
+        for _ in range(turns):
+            samples.append(await run_turn(client, prompt, time.perf_counter()))
+        return first_turn_ms, samples
+    finally:
+        await client.disconnect()
+        await transport.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    options = build_options(args.model)
+    cold = await cold_turns(args.sandbox_id, options, args.prompt, args.turns)
+    print(_common.format_latencies("spawn per turn", cold))
+
+    first_turn_ms, warm = await warm_turns(
+        args.sandbox_id, options, args.prompt, args.turns
+    )
+    print(f"warm session first turn: {first_turn_ms:.3f}ms")
+    print(_common.format_latencies("warm session", warm))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sandbox-id", required=True)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--prompt", default="Reply with the single word: ok")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Offline cost of writing and reading many small sandbox files.
+
+Writes (then reads back) a batch of small files through ``LocalDockerProvider``
+backed by the in-process fake container from ``tests.fake_docker``, once a file
+at a time with ``write_file`` / ``read_file`` and once with the batch
+``write_files`` / ``read_files`` calls, and reports the wall time of each pass
+and how many Docker API round trips it took. Each round trip sleeps for
+``--rpc-delay-ms`` to stand in for the daemon. No Docker daemon is needed.
+
+    python -m benchmarks.sandbox_file_batch --files 500 --rpc-delay-ms 2 --runs 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+from benchmarks import _common  # noqa: F401
+
+from app.services.sandbox_providers.docker_provider import LocalDockerProvider
+from app.services.sandbox_providers.types import DockerConfig
+from tests.fake_docker import FakeDockerContainer
+
+
+def build_provider(container: FakeDockerContainer) -> LocalDockerProvider:
+    provider = LocalDockerProvider(DockerConfig())
+
+    async def get_container(sandbox_id: str) -> FakeDockerContainer:
+        return container
+
+    provider._get_container = get_container  # type: ignore[method-assign]
+    return provider
+
+
+def build_files(count: int, size: int) -> dict[str, str | bytes]:
+    return {
+        f"project/pkg_{i % 10}/file_{i}.txt": ("x" * (size - 1) + "\n")
+        for i in range(count)
+    }
+
+
+async def one_by_one(
+    provider: LocalDockerProvider, files: dict[str, str | bytes]
+) -> None:
+    for path, content in files.items():
+        await provider.write_file("bench", path, content)
+    for path in files:
+        await provider.read_file("bench", path)
+
+
+async def batched(provider: LocalDockerProvider, files: dict[str, str | bytes]) -> None:
+    await provider.write_files("bench", files)
+    contents = await provider.read_files("bench", list(files))
+    assert len(contents) == len(files)
+
+
+async def run(args: argparse.Namespace) -> None:
+    files = build_files(args.files, args.file_bytes)
+    passes: dict[
+        str,
+        Callable[[LocalDockerProvider, dict[str, str | bytes]], Awaitable[None]],
+    ] = {"one by one": one_by_one, "batched": batched}
+    print(
+        f"{args.files} files of {args.file_bytes}B, "
+        f"{args.rpc_delay_ms}ms per Docker API call"
+    )
+    for label, transfer in passes.items():
+        samples: list[float] = []
+        calls = 0
+        for _ in range(args.runs):
+            container = FakeDockerContainer(rpc_delay=args.rpc_delay_ms / 1000)
+            provider = build_provider(container)
+            started = time.perf_counter()
+            await transfer(provider, files)
+            samples.append((time.perf_counter() - started) * 1000)
+            calls = len(container.calls)
+        print(_common.format_latencies(f"{label} write+read", samples))
+        print(f"{label}: {calls} Docker API calls per pass")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--file-bytes", type=int, default=512)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--rpc-delay-ms",
+        type=float,
+        default=2.0,
+        help="simulated round trip per Docker API call",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
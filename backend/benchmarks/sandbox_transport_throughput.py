@@ -0,0 +1,151 @@
+"""Offline stdout throughput of the Modal and Docker sandbox transports.
+
+Streams the same synthetic CLI turn (many small messages plus one large tool
+result) through ``ModalSandboxTransport`` backed by the in-process fake Modal
+sandbox from ``tests.fake_modal``, and through ``DockerSandboxTransport``
+reading multiplexed frames from a local socket pair, and reports the turn
+latency, throughput and the mean wait of a stdout chunk in the transport's
+buffer (``claudex_sandbox_stdout_chunk_latency_seconds``). No sandbox or
+network access is needed.
+
+    python -m benchmarks.sandbox_transport_throughput --tool-output-mb 10 --turns 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+from benchmarks import _common  # noqa: F401
+from benchmarks.cli_output_framing import synthetic_output
+from claude_agent_sdk import ClaudeAgentOptions
+from prometheus_client import REGISTRY
+
+from app.services.sandbox_providers.types import DockerConfig
+from app.services.transports import DockerSandboxTransport, ModalSandboxTransport
+from app.services.transports.base import BaseSandboxTransport
+from app.services.transports.docker import DOCKER_FRAME_HEADER
+from tests.fake_modal import FakeModalSandbox
+
+USER_MESSAGE = json.dumps({"type": "user", "message": {"content": "go"}}) + "\n"
+
+
+def chunk_latency(transport: str) -> tuple[float, float]:
+    labels = {"transport": transport}
+    name = "claudex_sandbox_stdout_chunk_latency_seconds"
+    total = REGISTRY.get_sample_value(f"{name}_sum", labels) or 0.0
+    count = REGISTRY.get_sample_value(f"{name}_count", labels) or 0.0
+    return total, count
+
+
+async def drain(transport: BaseSandboxTransport) -> int:
+    messages = 0
+    async for _ in transport.read_messages():
+        messages += 1
+    return messages
+
+
+def build_options(output: bytes) -> ClaudeAgentOptions:
+    # The tool result is a single line that may exceed the default limit
+    return ClaudeAgentOptions(max_buffer_size=2 * len(output))
+
+
+async def modal_turn(output: bytes, chunk_size: int, rpc_delay: float) -> int:
+    sandbox = FakeModalSandbox(
+        lambda message: [output] if message.get("type") == "user" else [],
+        chunk_size=chunk_size,
+        rpc_delay=rpc_delay,
+    )
+    transport = ModalSandboxTransport(
+        sandbox_id="bench",
+        api_key="bench:bench",
+        prompt="",
+        options=build_options(output),
+        sandbox=sandbox,
+    )
+    await transport.connect()
+    try:
+        await transport.write(USER_MESSAGE)
+        return await drain(transport)
+    finally:
+        await transport.close()
+
+
+async def docker_turn(output: bytes, chunk_size: int) -> int:
+    # The reader path only: exec stdout arrives as multiplexed frames on a
+    # socket driven by the event loop, as for a local Docker daemon
+    transport = DockerSandboxTransport(
+        sandbox_id="bench",
+        docker_config=DockerConfig(),
+        prompt="",
+        options=build_options(output),
+    )
+    reader, writer = socket.socketpair()
+    transport._socket = reader
+    transport._raw_socket = transport._get_loop_socket()
+    transport._ready = True
+
+    def send() -> None:
+        with writer:
+            for offset in range(0, len(output), chunk_size):
+                payload = output[offset : offset + chunk_size]
+                writer.sendall(DOCKER_FRAME_HEADER.pack(1, len(payload)) + payload)
+
+    thread = threading.Thread(target=send)
+    thread.start()
+    transport._reader_task = asyncio.create_task(transport._read_socket_data())
+    try:
+        return await drain(transport)
+    finally:
+        thread.join()
+        await transport._cancel_task(transport._reader_task)
+        reader.close()
+
+
+async def run(args: argparse.Namespace) -> None:
+    output = synthetic_output(args.tool_output_mb, args.messages)
+    chunk_size = args.chunk_kb * 1024
+    turns = {
+        "modal": lambda: modal_turn(output, chunk_size, args.rpc_delay_ms / 1000),
+        "docker": lambda: docker_turn(output, chunk_size),
+    }
+    print(f"turn output: {len(output) / 1024 / 1024:.2f}MB in {chunk_size}B chunks")
+    for label, turn in turns.items():
+        samples: list[float] = []
+        sum_before, count_before = chunk_latency(label)
+        for _ in range(args.turns):
+            started = time.perf_counter()
+            messages = await turn()
+            samples.append((time.perf_counter() - started) * 1000)
+        sum_after, count_after = chunk_latency(label)
+        total, count = sum_after - sum_before, count_after - count_before
+        mb_per_second = len(output) * len(samples) / 1024 / 1024 / (sum(samples) / 1000)
+        print(_common.format_latencies(f"{label} turn", samples))
+        print(
+            f"{label}: {messages} messages/turn {mb_per_second:.1f}MB/s "
+            f"chunk latency mean={total / max(count, 1) * 1000:.3f}ms over "
+            f"{int(count)} chunks"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tool-output-mb", type=float, default=10.0)
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--chunk-kb", type=int, default=16)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument(
+        "--rpc-delay-ms",
+        type=float,
+        default=0.0,
+        help="simulated round trip per Modal stdin drain",
+    )
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""End-to-end delivery latency from StreamPublisher to StreamHub subscribers.
+
+Replays a recorded stream (a Message.content JSON array, or one event per line
+in a .jsonl file) or a synthetic one against the Redis at REDIS_URL, and reports
+the delay between publish and SSE frame delivery for every event.
+
+    python -m benchmarks.sse_delivery --events 10000 --subscribers 4 --coalesce
+    python -m benchmarks.sse_delivery --recording message_content.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+from typing import Any
+
+from benchmarks._common import format_latencies
+
+from app.services.streaming import StreamEvent, StreamHub, StreamPublisher
+from app.utils.redis import close_redis_pool, get_redis_client
+
+
+def load_events(path: Path | None, count: int) -> list[StreamEvent]:
+    if path is None:
+        return [
+            {"type": "assistant_text", "text": f"token {index} " * 8}
+            for index in range(count)
+        ]
+
+    raw = path.read_text()
+    if path.suffix == ".jsonl":
+        recorded = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    else:
+        recorded = json.loads(raw)
+    # Loop the recording until the requested number of events is reached
+    return [recorded[index % len(recorded)] for index in range(count)]
+
+
+def _frame_sequences(frame: dict[str, Any]) -> list[int]:
+    if frame["event"] == "content_batch":
+        payloads = json.loads(frame["data"])
+    elif frame["event"] == "content":
+        payloads = [json.loads(frame["data"])]
+    else:
+        return []
+    return [payload["event"]["bench_seq"] for payload in payloads]
+
+
+async def consume(
+    hub: StreamHub,
+    chat_id: str,
+    coalesce: bool,
+    sent_at: dict[int, float],
+    latencies_ms: list[float],
+) -> int:
+    frames = 0
+    async for frame in hub.subscribe(chat_id, "0-0", coalesce=coalesce):
+        received = time.perf_counter()
+        frames += 1
+        for seq in _frame_sequences(frame):
+            latencies_ms.append((received - sent_at[seq]) * 1000)
+    return frames
+
+
+async def produce(
+    chat_id: str,
+    events: list[StreamEvent],
+    sent_at: dict[int, float],
+    burst: int,
+    batching: bool,
+) -> None:
+    publisher = StreamPublisher(chat_id, batching=batching)
+    publisher._redis = get_redis_client()
+    for seq, event in enumerate(events):
+        sent_at[seq] = time.perf_counter()
+        await publisher.publish_event({**event, "bench_seq": seq})  # type: ignore[typeddict-unknown-key]
+        if burst and (seq + 1) % burst == 0:
+            await asyncio.sleep(0.001)
+    await publisher.publish_complete()
+    await publisher.clear_stream()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recording", type=Path, default=None)
+    parser.add_argument("--events", type=int, default=10_000)
+    parser.add_argument("--subscribers", type=int, default=1)
+    parser.add_argument(
+        "--burst", type=int, default=50, help="events published between pauses"
+    )
+    parser.add_argument("--coalesce", action="store_true")
+    parser.add_argument("--no-batching", action="store_true")
+    args = parser.parse_args()
+
+    events = load_events(args.recording, args.events)
+    chat_id = f"bench-{uuid.uuid4()}"
+    hub = StreamHub()
+    sent_at: dict[int, float] = {}
+    latencies: list[list[float]] = [[] for _ in range(args.subscribers)]
+
+    consumers = [
+        asyncio.create_task(consume(hub, chat_id, args.coalesce, sent_at, samples))
+        for samples in latencies
+    ]
+    await asyncio.sleep(0.2)
+
+    started = time.perf_counter()
+    await produce(chat_id, events, sent_at, args.burst, not args.no_batching)
+    frames = await asyncio.gather(*consumers)
+    elapsed = time.perf_counter() - started
+
+    await hub.close()
+    await close_redis_pool()
+
+    merged = [sample for samples in latencies for sample in samples]
+    print(
+        f"{len(events)} events x {args.subscribers} subscribers in "
+        f"{elapsed * 1000:.0f}ms, {sum(frames) / args.subscribers:.0f} frames "
+        f"per subscriber (coalesce={args.coalesce})"
+    )
+    print(format_latencies("delivery", merged))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,160 @@
+"""Per-event overhead of the orchestrator hot loop on a synthetic stream.
+
+Compares the previous loop (deepcopy of every event plus a Celery
+``update_state`` per event) against ``StreamOrchestrator._process_stream_events``.
+The fake task serializes the progress meta and optionally sleeps to mimic the
+result-backend round-trip.
+
+    python -m benchmarks.stream_hot_loop --events 5000 --backend-latency-ms 0.2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from collections.abc import AsyncIterator
+from copy import deepcopy
+from typing import Any, cast
+
+from benchmarks import _common  # noqa: F401
+
+from app.models.db_models import Chat
+from app.services.streaming import (
+    CancellationHandler,
+    MessageEventLog,
+    StreamContext,
+    StreamEvent,
+    StreamOrchestrator,
+    StreamPublisher,
+)
+
+
+class FakeTask:
+    def __init__(self, latency_ms: float) -> None:
+        self.latency = latency_ms / 1000
+        self.updates = 0
+
+    def update_state(self, state: str, meta: dict[str, Any]) -> None:
+        json.dumps({"status": state, "result": meta})
+        if self.latency:
+            time.sleep(self.latency)
+        self.updates += 1
+
+
+class FakeAiService:
+    def get_active_transport(self) -> None:
+        return None
+
+    async def cancel_active_stream(self) -> None:
+        return None
+
+    def get_total_cost_usd(self) -> float:
+        return 0.0
+
+
+def build_events(count: int) -> list[StreamEvent]:
+    events: list[StreamEvent] = []
+    for index in range(count):
+        tool_id = f"toolu_{index // 3}"
+        match index % 3:
+            case 0:
+                events.append({"type": "assistant_text", "text": "chunk " * 40})
+            case 1:
+                events.append(
+                    {
+                        "type": "tool_started",
+                        "tool": {
+                            "id": tool_id,
+                            "name": "Bash",
+                            "title": "Bash",
+                            "status": "started",
+                            "parent_id": "toolu_parent",
+                            "input": {"command": "ls -la", "env": {"A": "1"}},
+                        },
+                    }
+                )
+            case _:
+                events.append(
+                    {
+                        "type": "tool_completed",
+                        "tool": {
+                            "id": tool_id,
+                            "name": "Bash",
+                            "title": "Bash",
+                            "status": "completed",
+                            "parent_id": "toolu_parent",
+                            "input": {"command": "ls -la", "env": {"A": "1"}},
+                            "result": {"lines": [f"file_{n}" for n in range(20)]},
+                        },
+                    }
+                )
+    return events
+
+
+async def _iterate(events: list[StreamEvent]) -> AsyncIterator[StreamEvent]:
+    for event in events:
+        yield event
+
+
+async def run_legacy(events: list[StreamEvent], task: FakeTask) -> float:
+    publisher = StreamPublisher(str(uuid.uuid4()), batching=False)
+    event_log = MessageEventLog(None, None)
+    collected: list[StreamEvent] = []
+
+    started = time.perf_counter()
+    async for event in _iterate(events):
+        collected.append(deepcopy(event))
+        if event_log.append(collected[-1]):
+            await event_log.flush()
+        await publisher.publish_event(event)
+        task.update_state(
+            state="PROGRESS",
+            meta={"status": "Processing", "events_emitted": len(collected)},
+        )
+    return time.perf_counter() - started
+
+
+async def run_current(events: list[StreamEvent], task: FakeTask) -> float:
+    chat_id = str(uuid.uuid4())
+    publisher = StreamPublisher(chat_id, batching=False)
+    orchestrator = StreamOrchestrator(publisher, CancellationHandler(chat_id, None))
+    ctx = StreamContext(
+        chat_id=chat_id,
+        stream=_iterate(events),
+        task=cast(Any, task),
+        ai_service=cast(Any, FakeAiService()),
+        assistant_message_id=None,
+        sandbox_service=None,
+        chat=Chat(id=uuid.uuid4(), user_id=uuid.uuid4(), title="benchmark"),
+        session_factory=None,
+        event_log=MessageEventLog(None, None),
+    )
+
+    started = time.perf_counter()
+    await orchestrator._process_stream_events(ctx)
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--backend-latency-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    events = build_events(args.events)
+
+    for label, runner in (("before", run_legacy), ("after", run_current)):
+        task = FakeTask(args.backend_latency_ms)
+        elapsed = await runner(events, task)
+        print(
+            f"{label:>6}: {elapsed * 1000:8.1f}ms total, "
+            f"{elapsed / args.events * 1e6:7.2f}us/event, "
+            f"{task.updates} update_state calls"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
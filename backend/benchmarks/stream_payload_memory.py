@@ -0,0 +1,126 @@
+"""Redis memory used by a chat stream with plain vs zstd-compressed payloads.
+
+Builds a session from a recording (Message.content JSON array or .jsonl) or
+from synthetic tool activity that reads this repository's own source files,
+writes it once per encoding through StreamPublisher, and reports MEMORY USAGE
+for each stream key at the Redis in REDIS_URL.
+
+    python -m benchmarks.stream_payload_memory --events 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from pathlib import Path
+
+from benchmarks import _common  # noqa: F401
+
+from app.constants import REDIS_KEY_CHAT_STREAM
+from app.core.config import get_settings
+from app.services.streaming import StreamEvent, StreamPublisher
+from app.utils.redis import close_redis_pool, get_redis_client
+
+settings = get_settings()
+APP_ROOT = Path(__file__).resolve().parent.parent / "app"
+
+
+def synthetic_session(count: int) -> list[StreamEvent]:
+    sources = sorted(APP_ROOT.rglob("*.py"))
+    events: list[StreamEvent] = []
+    for index in range(count):
+        source = sources[index % len(sources)]
+        tool = {
+            "id": f"toolu_{index}",
+            "name": "Read",
+            "title": "Read",
+            "parent_id": None,
+            "input": {"file_path": str(source)},
+        }
+        match index % 4:
+            case 0:
+                events.append({"type": "assistant_text", "text": "Looking at it. " * 6})
+            case 1:
+                events.append(
+                    {"type": "tool_started", "tool": {**tool, "status": "started"}}  # type: ignore[typeddict-item]
+                )
+            case 2:
+                events.append(
+                    {
+                        "type": "tool_completed",
+                        "tool": {
+                            **tool,  # type: ignore[typeddict-item]
+                            "status": "completed",
+                            "result": source.read_text(errors="replace"),
+                        },
+                    }
+                )
+            case _:
+                output = "\n".join(f"PASSED tests/test_{n}.py" for n in range(200))
+                events.append(
+                    {
+                        "type": "tool_completed",
+                        "tool": {**tool, "status": "completed", "result": output},  # type: ignore[typeddict-item]
+                    }
+                )
+    return events
+
+
+def load_events(path: Path | None, count: int) -> list[StreamEvent]:
+    if path is None:
+        return synthetic_session(count)
+    raw = path.read_text()
+    if path.suffix == ".jsonl":
+        return [json.loads(line) for line in raw.splitlines() if line.strip()]
+    events: list[StreamEvent] = json.loads(raw)
+    return events
+
+
+async def write_stream(events: list[StreamEvent], compress: bool) -> tuple[int, float]:
+    settings.STREAM_PAYLOAD_COMPRESSION = compress
+    chat_id = f"bench-{uuid.uuid4()}"
+    key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+    redis = get_redis_client()
+    publisher = StreamPublisher(chat_id)
+    publisher._redis = redis
+
+    started = time.perf_counter()
+    for event in events:
+        await publisher.publish_event(event)
+    await publisher.flush()
+    elapsed = time.perf_counter() - started
+
+    try:
+        used = int(await redis.memory_usage(key, samples=0) or 0)
+    except Exception:
+        # MEMORY USAGE is unavailable on some Redis-compatible servers
+        entries = await redis.xrange(key)
+        used = sum(len(k) + len(v) for _, f in entries for k, v in f.items())
+    await redis.delete(key)
+    return used, elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--recording", type=Path, default=None)
+    parser.add_argument("--events", type=int, default=2000)
+    args = parser.parse_args()
+
+    events = load_events(args.recording, args.events)
+    raw_bytes = sum(len(json.dumps({"event": e}, ensure_ascii=False)) for e in events)
+    print(f"{len(events)} events, {raw_bytes / 1024:.0f} KiB of JSON payloads")
+
+    plain, plain_time = await write_stream(events, compress=False)
+    packed, packed_time = await write_stream(events, compress=True)
+    await close_redis_pool()
+
+    print(f"  plain: {plain / 1024:9.0f} KiB  publish {plain_time * 1000:.0f}ms")
+    print(f"   zstd: {packed / 1024:9.0f} KiB  publish {packed_time * 1000:.0f}ms")
+    print(f"  ratio: {plain / max(packed, 1):.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -38,6 +38,10 @@ fi
 
 if [ "$MODE" = "celery-worker" ]; then
     echo "Starting Celery worker..."
+    if [ "$CELERY_ASYNC_POOL" = "true" ]; then
+        # Pool threads only wait on the shared event loop; size them to its limit
+        CELERY_CONCURRENCY=${CELERY_CONCURRENCY:-${CELERY_ASYNC_CONCURRENCY:-64}}
+    fi
     CELERY_CONCURRENCY=${CELERY_CONCURRENCY:-25}
     echo "Celery concurrency set to: $CELERY_CONCURRENCY"
     ensure_docker_network
@@ -0,0 +1,97 @@
+# In-process stand-in for a docker-py container, shaped like the parts
+# LocalDockerProvider's file transfers use: `exec_run` for `mkdir -p` (run as
+# the container user) and `tar -c` of a list of paths, and `put_archive` /
+# `get_archive` of tar streams. Files live in a dict keyed by absolute path;
+# every call is one simulated API round trip of `rpc_delay` seconds. Used by
+# the sandbox tests and the offline file batch benchmark. Commands named in
+# `failing` fail the way a read-only or tar-less container would, and files in
+# `root_only` can only be archived by an exec running as root.
+from __future__ import annotations
+
+import io
+import posixpath
+import tarfile
+import time
+from collections import namedtuple
+from collections.abc import Iterator
+from typing import Any
+
+ExecResult = namedtuple("ExecResult", ["exit_code", "output"])
+
+USER_ID = 1000
+
+
+class FakeDockerContainer:
+    def __init__(self, rpc_delay: float = 0.0) -> None:
+        self.id = "fake"
+        self.files: dict[str, bytes] = {}
+        self.owners: dict[str, int] = {}
+        self.dirs: set[str] = {"/"}
+        self.calls: list[str] = []
+        self.failing: set[str] = set()
+        self.root_only: set[str] = set()
+        self._rpc_delay = rpc_delay
+
+    def _call(self, name: str) -> None:
+        self.calls.append(name)
+        if self._rpc_delay:
+            time.sleep(self._rpc_delay)
+
+    def exec_run(
+        self, cmd: list[str], demux: bool = False, user: str = "", **_: Any
+    ) -> ExecResult:
+        self._call("exec_run")
+        if cmd[0] == "sh" and "mkdir" in cmd[2]:
+            if "mkdir" in self.failing:
+                output = b"mkdir: cannot create directory: Read-only file system\n"
+                return ExecResult(1, (output, b"") if demux else output)
+            for path in cmd[4:]:
+                while path != "/":
+                    self.dirs.add(path)
+                    path = posixpath.dirname(path)
+            output = f"{USER_ID}\n{USER_ID}\n".encode()
+            return ExecResult(0, (output, b"") if demux else output)
+        if cmd[0] == "tar":
+            if "tar" in self.failing:
+                error = b"exec: tar: not found\n"
+                return ExecResult(127, (None, error) if demux else error)
+            paths = ["/" + path for path in cmd[cmd.index("--") + 1 :]]
+            readable = [
+                path
+                for path in paths
+                if path in self.files and (user == "root" or path not in self.root_only)
+            ]
+            stream = io.BytesIO()
+            with tarfile.open(fileobj=stream, mode="w") as tar:
+                for path in readable:
+                    self._add(tar, path.lstrip("/"), self.files[path])
+            missing = len(readable) < len(paths)
+            output = stream.getvalue()
+            return ExecResult(2 if missing else 0, (output, b"") if demux else output)
+        raise NotImplementedError(cmd)
+
+    def put_archive(self, path: str, data: bytes) -> bool:
+        self._call("put_archive")
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r") as tar:
+            for member in tar:
+                target = posixpath.normpath(posixpath.join(path, member.name))
+                if posixpath.dirname(target) not in self.dirs:
+                    raise FileNotFoundError(posixpath.dirname(target))
+                f = tar.extractfile(member)
+                assert f is not None
+                self.files[target] = f.read()
+                self.owners[target] = member.uid
+        return True
+
+    def get_archive(self, path: str) -> tuple[Iterator[bytes], dict[str, Any]]:
+        self._call("get_archive")
+        stream = io.BytesIO()
+        with tarfile.open(fileobj=stream, mode="w") as tar:
+            self._add(tar, posixpath.basename(path), self.files[path])
+        return iter([stream.getvalue()]), {"name": posixpath.basename(path)}
+
+    @staticmethod
+    def _add(tar: tarfile.TarFile, name: str, content: bytes) -> None:
+        info = tarfile.TarInfo(name=name)
+        info.size = len(content)
+        tar.addfile(info, io.BytesIO(content))
@@ -0,0 +1,49 @@
+# In-process stand-in for an E2B AsyncSandbox whose `files` is the SDK's real
+# async Filesystem, talking to a fake envd over an httpx MockTransport. Files
+# uploaded through the multipart /files route land in a dict keyed by path,
+# so tests exercise the SDK's own request building.
+from __future__ import annotations
+
+import posixpath
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import httpcore
+import httpx
+from e2b.connection_config import ConnectionConfig
+from e2b.sandbox_async.filesystem.filesystem import Filesystem
+
+
+class FakeE2BSandbox:
+    def __init__(self) -> None:
+        self.files_written: dict[str, bytes] = {}
+        self.uploads = 0
+        envd_api = httpx.AsyncClient(
+            transport=httpx.MockTransport(self._handle), base_url="http://envd"
+        )
+        self.files = Filesystem(
+            "http://envd",
+            None,
+            ConnectionConfig(api_key="fake"),
+            httpcore.AsyncConnectionPool(),
+            envd_api,
+        )
+
+    async def is_running(self) -> bool:
+        return True
+
+    def _handle(self, request: httpx.Request) -> httpx.Response:
+        assert request.method == "POST" and request.url.path == "/files"
+        self.uploads += 1
+        header = f"Content-Type: {request.headers['content-type']}\r\n\r\n".encode()
+        message = BytesParser(policy=HTTP).parsebytes(header + request.read())
+        entries = []
+        for part in message.iter_parts():
+            path = part.get_filename() or ""
+            payload = part.get_payload(decode=True)
+            assert isinstance(payload, bytes)
+            self.files_written[path] = payload
+            entries.append(
+                {"name": posixpath.basename(path), "type": "file", "path": path}
+            )
+        return httpx.Response(200, json=entries)
@@ -0,0 +1,177 @@
+# In-process stand-in for a Modal sandbox, shaped like the parts of the modal
+# client ModalSandboxTransport uses: `exec.aio(...)` returns a process whose
+# stdout and stderr are async iterators of byte chunks and whose stdin buffers
+# writes until `drain.aio()`. Each JSON line the process receives is answered
+# by a responder; input that is not JSON (launch file archives) is ignored.
+# The process exits once stdin is closed. Used by the transport tests and the
+# offline transport throughput benchmark.
+from __future__ import annotations
+
+import asyncio
+import json
+from collections.abc import Awaitable, Callable, Iterable
+from typing import Any
+
+Responder = Callable[[dict[str, Any]], Iterable[bytes]]
+
+
+class _Aio:
+    # Modal's `method.aio(...)` calling convention
+    def __init__(self, fn: Callable[..., Awaitable[Any]]) -> None:
+        self.aio = fn
+
+
+def reply_with_result(message: dict[str, Any]) -> list[bytes]:
+    # A CLI that acknowledges control requests and answers every user message
+    # with one assistant message and a result
+    if message.get("type") == "control_request":
+        response = {
+            "type": "control_response",
+            "response": {
+                "subtype": "success",
+                "request_id": message.get("request_id"),
+                "response": {},
+            },
+        }
+        return [json.dumps(response).encode() + b"\n"]
+    if message.get("type") != "user":
+        return []
+    content = message.get("message", {}).get("content", "")
+    lines = [
+        {
+            "type": "assistant",
+            "message": {
+                "model": "fake",
+                "content": [{"type": "text", "text": f"echo: {content}"}],
+            },
+        },
+        {
+            "type": "result",
+            "subtype": "success",
+            "duration_ms": 1,
+            "duration_api_ms": 1,
+            "is_error": False,
+            "num_turns": 1,
+            "session_id": message.get("session_id") or "fake-session",
+        },
+    ]
+    return [json.dumps(line).encode() + b"\n" for line in lines]
+
+
+class FakeModalStream:
+    def __init__(self) -> None:
+        self._chunks: asyncio.Queue[bytes | None] = asyncio.Queue()
+
+    def feed(self, chunk: bytes) -> None:
+        self._chunks.put_nowait(chunk)
+
+    def end(self) -> None:
+        self._chunks.put_nowait(None)
+
+    def __aiter__(self) -> FakeModalStream:
+        return self
+
+    async def __anext__(self) -> bytes:
+        chunk = await self._chunks.get()
+        if chunk is None:
+            self._chunks.put_nowait(None)
+            raise StopAsyncIteration
+        return chunk
+
+
+class FakeModalStdin:
+    def __init__(self, process: FakeModalProcess, rpc_delay: float) -> None:
+        self._process = process
+        self._rpc_delay = rpc_delay
+        self._pending = bytearray()
+        self._eof = False
+        self.drains = 0
+        self.drain = _Aio(self._drain)
+
+    def write(self, data: bytes | str) -> None:
+        if self._eof:
+            raise ValueError("stdin is closed")
+        self._pending += data.encode() if isinstance(data, str) else data
+
+    def write_eof(self) -> None:
+        self._eof = True
+
+    async def _drain(self) -> None:
+        # One round trip per drain, carrying everything written so far
+        self.drains += 1
+        data = bytes(self._pending)
+        self._pending.clear()
+        eof = self._eof
+        await asyncio.sleep(self._rpc_delay)
+        self._process.receive(data)
+        if eof:
+            self._process.finish()
+
+
+class FakeModalProcess:
+    def __init__(
+        self, responder: Responder, exit_code: int, chunk_size: int, rpc_delay: float
+    ) -> None:
+        self._responder = responder
+        self._exit_code = exit_code
+        self._chunk_size = chunk_size
+        self._lines = bytearray()
+        self._exited = asyncio.Event()
+        self.stdout = FakeModalStream()
+        self.stderr = FakeModalStream()
+        self.stdin = FakeModalStdin(self, rpc_delay)
+        self.returncode: int | None = None
+        self.received: list[dict[str, Any]] = []
+        self.wait = _Aio(self._exited.wait)
+
+    def receive(self, data: bytes) -> None:
+        self._lines += data
+        *lines, rest = bytes(self._lines).split(b"\n")
+        self._lines[:] = rest
+        for line in lines:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            self.received.append(message)
+            self.emit(b"".join(self._responder(message)))
+
+    def emit(self, output: bytes) -> None:
+        for offset in range(0, len(output), self._chunk_size):
+            self.stdout.feed(output[offset : offset + self._chunk_size])
+
+    def finish(self) -> None:
+        if self.returncode is not None:
+            return
+        self.returncode = self._exit_code
+        if self._exit_code:
+            self.stderr.feed(b"fake CLI failed\n")
+        self.stdout.end()
+        self.stderr.end()
+        self._exited.set()
+
+
+class FakeModalSandbox:
+    def __init__(
+        self,
+        responder: Responder = reply_with_result,
+        *,
+        exit_code: int = 0,
+        chunk_size: int = 64 * 1024,
+        rpc_delay: float = 0.0,
+    ) -> None:
+        self._responder = responder
+        self._exit_code = exit_code
+        self._chunk_size = chunk_size
+        self._rpc_delay = rpc_delay
+        self.execs: list[tuple[tuple[str, ...], dict[str, Any]]] = []
+        self.processes: list[FakeModalProcess] = []
+        self.exec = _Aio(self._exec)
+
+    async def _exec(self, *args: str, **kwargs: Any) -> FakeModalProcess:
+        self.execs.append((args, kwargs))
+        process = FakeModalProcess(
+            self._responder, self._exit_code, self._chunk_size, self._rpc_delay
+        )
+        self.processes.append(process)
+        return process
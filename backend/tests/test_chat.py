@@ -4,6 +4,8 @@ import io
 import json
 import uuid
 import zipfile
+from collections.abc import Callable
+from typing import Any
 
 import pytest
 from httpx import AsyncClient
@@ -13,6 +15,7 @@ from app.core.security import get_password_hash
 from app.models.db_models import Chat, Message, MessageAttachment, User
 from app.models.db_models.enums import AttachmentType, MessageRole, MessageStreamStatus
 from app.services.sandbox import SandboxService
+from app.services.streaming import MessageEventLog
 from tests.conftest import (
     STREAMING_TEST_TIMEOUT,
     read_sandbox_file,
@@ -341,6 +344,44 @@ class TestGetMessages:
         assert "has_more" in data
         assert isinstance(data["items"], list)
 
+    async def test_get_messages_materializes_in_progress_events(
+        self,
+        async_client: AsyncClient,
+        integration_chat_fixture: tuple[User, Chat, SandboxService],
+        auth_headers: dict[str, str],
+        db_session: AsyncSession,
+        session_factory: Callable[[], Any],
+    ) -> None:
+        _, chat, _ = integration_chat_fixture
+
+        message = Message(
+            id=uuid.uuid4(),
+            chat_id=chat.id,
+            content="",
+            role=MessageRole.ASSISTANT,
+            stream_status=MessageStreamStatus.IN_PROGRESS,
+        )
+        db_session.add(message)
+        await db_session.flush()
+
+        event_log = MessageEventLog(str(message.id), session_factory, batch_size=2)
+        for text in ("first", "second", "third"):
+            if event_log.append({"type": "assistant_text", "text": text}):
+                await event_log.flush()
+        await event_log.flush()
+
+        response = await async_client.get(
+            f"/api/v1/chat/chats/{chat.id}/messages",
+            headers=auth_headers,
+        )
+
+        assert response.status_code == 200
+        item = next(
+            item for item in response.json()["items"] if item["id"] == str(message.id)
+        )
+        events = json.loads(item["content"])
+        assert [event["text"] for event in events] == ["first", "second", "third"]
+
 
 class TestContextUsage:
     async def test_get_context_usage(
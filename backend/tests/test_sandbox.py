@@ -1,10 +1,35 @@
 from __future__ import annotations
 
+import asyncio
+import base64
 import uuid
 
 import pytest
-
+from redis.asyncio import Redis
+
+from app.services import sandbox_pool
+from app.services.exceptions import SandboxException
+from app.services.sandbox import SandboxService
+from app.services.sandbox_pool import SandboxPool
+from app.services.sandbox_providers.docker_provider import LocalDockerProvider
+from app.services.sandbox_providers.e2b_provider import (
+    WRITE_FILES_BATCH_SIZE,
+    E2BSandboxProvider,
+)
+from app.services.sandbox_providers.registry import (
+    SandboxProviderRegistry,
+    sandbox_api_key,
+)
+from app.services.sandbox_providers.types import (
+    CommandResult,
+    DockerConfig,
+    SandboxProviderType,
+    SecretEntry,
+)
+from app.services.sandbox_secrets import SandboxSecretsStore
 from tests.conftest import SandboxTestContext
+from tests.fake_docker import USER_ID, FakeDockerContainer
+from tests.fake_e2b import FakeE2BSandbox
 
 
 class TestSandboxPreviewLinks:
@@ -336,3 +361,238 @@ class TestSandboxNotFound:
             )
 
         assert response.status_code == 404
+
+
+class TestSandboxPool:
+    async def test_checkout_serves_prepared_sandboxes_and_refills(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(sandbox_pool.settings, "SANDBOX_POOL_MAX_SIZE", 2)
+        monkeypatch.setattr(sandbox_pool.settings, "SANDBOX_POOL_MIN_SIZE", 1)
+
+        class Provider:
+            def __init__(self) -> None:
+                self.created = 0
+                self.deleted: list[str] = []
+                self.commands: list[str] = []
+                self.stopped: set[str] = set()
+                self.labels: list[dict[str, str] | None] = []
+
+            async def create_sandbox(self, labels: dict[str, str] | None = None) -> str:
+                self.created += 1
+                self.labels.append(labels)
+                return f"sbx-{self.created}"
+
+            async def delete_sandbox(self, sandbox_id: str) -> None:
+                self.deleted.append(sandbox_id)
+
+            async def is_running(self, sandbox_id: str) -> bool:
+                return sandbox_id not in self.stopped
+
+            async def get_secrets(self, sandbox_id: str) -> list[object]:
+                return []
+
+            async def execute_command(
+                self, sandbox_id: str, command: str, **_: object
+            ) -> CommandResult:
+                self.commands.append(f"{sandbox_id}: {command}")
+                return CommandResult(stdout="", stderr="", exit_code=0)
+
+        async def pool_size(size: int) -> None:
+            async with asyncio.timeout(1):
+                while len(pool) != size:
+                    await asyncio.sleep(0)
+
+        provider = Provider()
+        pool = SandboxPool("docker", provider)  # type: ignore[arg-type]
+
+        # The first checkout misses and creates demand for one warm sandbox
+        assert await pool.checkout() is None
+        await pool_size(1)
+        assert provider.commands[0].startswith("sbx-1: ")
+        assert "openvscode-server" in provider.commands[0]
+        assert provider.labels[0] is not None
+        assert sandbox_pool.SANDBOX_POOL_LABEL in provider.labels[0]
+
+        # Two checkouts in the window: the pool grows to two
+        assert await pool.checkout() == "sbx-1"
+        await pool_size(2)
+
+        # A sandbox that stopped while pooled is deleted and skipped
+        provider.stopped.add("sbx-2")
+        assert await pool.checkout() == "sbx-3"
+        await asyncio.sleep(0)
+        assert "sbx-2" in provider.deleted
+
+        # close() waits for every pending deletion
+        await pool_size(2)
+        await pool.close()
+        assert set(provider.deleted) == {"sbx-2", "sbx-4", "sbx-5"}
+        assert len(pool) == 0
+        assert not pool._tasks
+
+
+class TestSandboxProviderRegistry:
+    async def test_providers_are_shared_per_credentials_until_retired(self) -> None:
+        registry = SandboxProviderRegistry()
+
+        docker = registry.get("docker")
+        assert registry.get("docker") is docker
+        first = registry.get("e2b", "key-1")
+        assert registry.get("e2b", "key-1") is first
+        rotated = registry.get("e2b", "key-2")
+        assert rotated is not first
+
+        registry.retire("e2b", "key-1")
+        assert registry.get("e2b", "key-1") is not first
+        assert registry.get("e2b", "key-2") is rotated
+        assert len(registry) == 3
+
+    def test_sandbox_api_key_follows_provider_type(self) -> None:
+        keys = {"e2b_api_key": "e2b-key", "modal_api_key": "modal-key"}
+
+        assert sandbox_api_key("e2b", **keys) == "e2b-key"
+        assert sandbox_api_key(SandboxProviderType.MODAL, **keys) == "modal-key"
+        assert sandbox_api_key("docker", **keys) is None
+
+
+class TestSandboxSecretsStore:
+    async def test_secrets_are_read_once_and_written_through_on_change(
+        self, redis_client: Redis[str]
+    ) -> None:
+        class Provider:
+            def __init__(self) -> None:
+                self.bashrc = {"EXISTING": "1"}
+                self.reads = 0
+                self.writes: list[str] = []
+                self.envs: list[dict[str, str] | None] = []
+
+            async def get_secrets(self, sandbox_id: str) -> list[SecretEntry]:
+                self.reads += 1
+                return [SecretEntry(key=k, value=v) for k, v in self.bashrc.items()]
+
+            async def add_secret(self, sandbox_id: str, key: str, value: str) -> None:
+                self.writes.append(f"add {key}")
+                self.bashrc[key] = value
+
+            async def delete_secret(self, sandbox_id: str, key: str) -> None:
+                self.writes.append(f"delete {key}")
+                self.bashrc.pop(key, None)
+
+            async def execute_command(
+                self, sandbox_id: str, command: str, **kwargs: object
+            ) -> CommandResult:
+                self.envs.append(kwargs.get("envs"))  # type: ignore[arg-type]
+                return CommandResult(stdout="", stderr="", exit_code=0)
+
+        provider = Provider()
+        service = SandboxService(provider)  # type: ignore[arg-type]
+        sandbox_id = f"sbx-{uuid.uuid4().hex[:8]}"
+
+        # Seeded from ~/.bashrc on first use, then served from the store
+        await service.execute_command(sandbox_id, "true")
+        await service.execute_command(sandbox_id, "true")
+        assert provider.reads == 1
+        assert provider.envs == [{"EXISTING": "1"}, {"EXISTING": "1"}]
+
+        await service.add_secret(sandbox_id, "TOKEN", "a")
+        await service.update_secret(sandbox_id, "TOKEN", "a")
+        await service.update_secret(sandbox_id, "TOKEN", "b")
+        await service.delete_secret(sandbox_id, "EXISTING")
+        assert provider.writes == [
+            "add TOKEN",
+            "delete TOKEN",
+            "add TOKEN",
+            "delete EXISTING",
+        ]
+
+        # Another process sees the same secrets without reading ~/.bashrc
+        other = SandboxSecretsStore()
+        assert await other.get(provider, sandbox_id) == {"TOKEN": "b"}  # type: ignore[arg-type]
+        stored = await redis_client.hgetall(f"sandbox:{sandbox_id}:secrets")
+        assert "b" not in stored.values()
+        assert provider.reads == 1
+
+        # Writes compare against the store, not a stale cached copy
+        await service.update_secret(sandbox_id, "TOKEN", "c")
+        provider.writes.clear()
+        await other.set(provider, sandbox_id, "TOKEN", "b")  # type: ignore[arg-type]
+        assert provider.writes == ["delete TOKEN", "add TOKEN"]
+        assert await SandboxSecretsStore().get(provider, sandbox_id) == {  # type: ignore[arg-type]
+            "TOKEN": "b"
+        }
+
+
+class TestSandboxFileBatches:
+    async def test_docker_transfers_a_batch_in_one_archive(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        container = FakeDockerContainer()
+        provider = LocalDockerProvider(DockerConfig())
+
+        async def get_container(sandbox_id: str) -> FakeDockerContainer:
+            return container
+
+        monkeypatch.setattr(provider, "_get_container", get_container)
+
+        files: dict[str, str | bytes] = {
+            f"project/src/module_{i}.py": f"value = {i}\n" for i in range(50)
+        }
+        files["/home/user/assets/logo.png"] = b"\x89PNG\x00"
+        await provider.write_files("sbx", files)
+
+        # One command for the parent directories, one archive for the files
+        assert container.calls == ["exec_run", "put_archive"]
+        assert container.files["/home/user/project/src/module_7.py"] == b"value = 7\n"
+        assert set(container.owners.values()) == {USER_ID}
+
+        container.calls.clear()
+        container.root_only = {"/home/user/assets/logo.png"}
+        paths = [*files, "project/missing.py"]
+        contents = await provider.read_files("sbx", paths)
+
+        assert container.calls == ["exec_run"]
+        assert set(contents) == set(files)
+        assert contents["project/src/module_7.py"].content == "value = 7\n"
+        logo = contents["/home/user/assets/logo.png"]
+        assert logo.is_binary
+        assert base64.b64decode(logo.content) == b"\x89PNG\x00"
+
+    async def test_docker_batch_failures_raise(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        container = FakeDockerContainer()
+        provider = LocalDockerProvider(DockerConfig())
+
+        async def get_container(sandbox_id: str) -> FakeDockerContainer:
+            return container
+
+        monkeypatch.setattr(provider, "_get_container", get_container)
+        await provider.write_files("sbx", {"a.txt": "a"})
+
+        # Missing files are skipped, but a failed mkdir or tar is an error
+        assert set(await provider.read_files("sbx", ["a.txt", "b.txt"])) == {"a.txt"}
+        container.failing = {"mkdir", "tar"}
+        with pytest.raises(SandboxException, match="Read-only"):
+            await provider.write_files("sbx", {"dir/c.txt": "c"})
+        assert "/home/user/dir/c.txt" not in container.files
+        with pytest.raises(SandboxException, match="tar exited with 127"):
+            await provider.read_files("sbx", ["a.txt"])
+
+    async def test_e2b_uploads_a_batch_through_the_sdk(self) -> None:
+        sandbox = FakeE2BSandbox()
+        provider = E2BSandboxProvider("key")
+        provider._active_sandboxes["sbx"] = sandbox  # type: ignore[assignment]
+
+        files: dict[str, str | bytes] = {
+            f"project/src/module_{i}.py": f"value = {i}\n"
+            for i in range(WRITE_FILES_BATCH_SIZE + 1)
+        }
+        files["/home/user/assets/logo.png"] = b"\x89PNG\x00"
+        await provider.write_files("sbx", files)
+
+        assert sandbox.uploads == 2
+        assert len(sandbox.files_written) == len(files)
+        written = sandbox.files_written
+        assert written["/home/user/project/src/module_7.py"] == b"value = 7\n"
+        assert written["/home/user/assets/logo.png"] == b"\x89PNG\x00"
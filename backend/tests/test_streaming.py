@@ -0,0 +1,355 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import uuid
+from typing import Any
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from claude_agent_sdk import AssistantMessage, ResultMessage, TextBlock
+from redis.asyncio import Redis
+
+from app.constants import REDIS_KEY_CHAT_CANCEL, REDIS_KEY_CHAT_STREAM
+from app.core.config import get_settings
+from app.services.streaming import (
+    CancellationHandler,
+    ContextUsageTracker,
+    StreamHub,
+    StreamProcessor,
+    StreamPublisher,
+)
+from app.services.streaming.codec import decode_stream_payload, encode_stream_payload
+from app.services.streaming import context_usage as context_usage_module
+from app.services.streaming import hub as stream_hub_module
+from app.services.streaming.hub import coalesce_stream_entries, read_stream_pages
+from app.services.tool_handler import ToolHandlerRegistry
+from app.services.user import UserService
+
+
+class TestStreamPublisher:
+    async def test_batched_events_flush_on_complete(
+        self,
+        redis_client: Redis[str],
+    ) -> None:
+        chat_id = str(uuid.uuid4())
+        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        publisher = StreamPublisher(chat_id, batching=True)
+        publisher._redis = redis_client
+
+        for index in range(5):
+            await publisher.publish_event(
+                {"type": "assistant_text", "text": str(index)}
+            )
+
+        assert await redis_client.xlen(stream_key) == 0
+
+        await publisher.publish_complete()
+
+        entries = await redis_client.xrange(stream_key)
+        kinds = [fields["kind"] for _, fields in entries]
+        assert kinds == ["content"] * 5 + ["complete"]
+        texts = [
+            json.loads(fields["payload"])["event"]["text"] for _, fields in entries[:5]
+        ]
+        assert texts == ["0", "1", "2", "3", "4"]
+
+    async def test_unbatched_publish_writes_immediately(
+        self,
+        redis_client: Redis[str],
+    ) -> None:
+        chat_id = str(uuid.uuid4())
+        publisher = StreamPublisher(chat_id, batching=False)
+        publisher._redis = redis_client
+
+        await publisher.publish_event({"type": "assistant_text", "text": "hi"})
+
+        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        assert await redis_client.xlen(stream_key) == 1
+
+    async def test_retention_trims_stream_and_sets_ttl(
+        self,
+        redis_client: Redis[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        settings = get_settings()
+        monkeypatch.setattr(settings, "STREAM_RETENTION_TAIL", 3)
+        monkeypatch.setattr(settings, "STREAM_RETENTION_TTL_SECONDS", 60)
+        chat_id = str(uuid.uuid4())
+        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        publisher = StreamPublisher(chat_id, batching=True)
+        publisher._redis = redis_client
+
+        for index in range(10):
+            await publisher.publish_event(
+                {"type": "assistant_text", "text": str(index)}
+            )
+        await publisher.publish_complete()
+        await publisher.apply_retention()
+
+        entries = await redis_client.xrange(stream_key)
+        assert [fields["kind"] for _, fields in entries][-1] == "complete"
+        assert len(entries) == 3
+        assert 0 < await redis_client.ttl(stream_key) <= 60
+
+
+class TestStreamHub:
+    async def test_subscribers_share_events_and_late_joiner_catches_up(
+        self,
+        redis_client: Redis[str],
+    ) -> None:
+        chat_id = str(uuid.uuid4())
+        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        hub = StreamHub()
+
+        async def collect(last_id: str) -> list[str]:
+            kinds: list[str] = []
+            async for item in hub.subscribe(chat_id, last_id):
+                kinds.append(item["event"])
+            return kinds
+
+        first = asyncio.create_task(collect("0-0"))
+        second = asyncio.create_task(collect("0-0"))
+        await asyncio.sleep(0.1)
+
+        await redis_client.xadd(stream_key, {"kind": "content", "payload": "{}"})
+        await asyncio.sleep(0.1)
+        late = asyncio.create_task(collect("0-0"))
+        await asyncio.sleep(0.1)
+        await redis_client.xadd(stream_key, {"kind": "complete"})
+
+        results = await asyncio.wait_for(asyncio.gather(first, second, late), 5)
+        await hub.close()
+
+        assert results == [["content", "complete"]] * 3
+        assert hub._channels == {}
+
+    async def test_coalescing_subscriber_receives_content_batches(
+        self,
+        redis_client: Redis[str],
+    ) -> None:
+        chat_id = str(uuid.uuid4())
+        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        hub = StreamHub()
+
+        # Written up front, so the first XREAD returns every entry in one batch
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for index in range(3):
+                pipe.xadd(
+                    stream_key, {"kind": "content", "payload": f'{{"n":{index}}}'}
+                )
+            pipe.xadd(stream_key, {"kind": "complete"})
+            await pipe.execute()
+
+        async def collect() -> list[dict[str, str]]:
+            return [item async for item in hub.subscribe(chat_id, "0-0", True)]
+
+        frames = await asyncio.wait_for(collect(), 5)
+        await hub.close()
+
+        assert [frame["event"] for frame in frames] == ["content_batch", "complete"]
+        assert [item["n"] for item in json.loads(frames[0]["data"])] == [0, 1, 2]
+
+    async def test_backlog_is_read_in_pages(
+        self,
+        redis_client: Redis[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(get_settings(), "STREAM_REPLAY_PAGE_SIZE", 2)
+        chat_id = str(uuid.uuid4())
+        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        ids = [
+            await redis_client.xadd(stream_key, {"kind": "content", "payload": "{}"})
+            for _ in range(5)
+        ]
+
+        pages = [
+            page async for page in read_stream_pages(redis_client, stream_key, ids[0])
+        ]
+
+        assert [[entry["id"] for entry in page] for page in pages] == [
+            ids[1:3],
+            ids[3:5],
+        ]
+
+    async def test_cancellation_monitor_retries_after_pool_timeout(
+        self,
+        redis_client: Redis[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        chat_id = str(uuid.uuid4())
+        monkeypatch.setattr(stream_hub_module, "CANCEL_MONITOR_RETRY_SECONDS", 0.05)
+        subscribe = stream_hub_module.redis_pubsub
+        attempts = 0
+
+        def flaky_pubsub(redis: Redis[str], channel: str) -> Any:
+            nonlocal attempts
+            attempts += 1
+            if attempts == 1:
+                raise RedisConnectionError("No connection available.")
+            return subscribe(redis, channel)
+
+        monkeypatch.setattr(stream_hub_module, "redis_pubsub", flaky_pubsub)
+        hub = StreamHub()
+
+        async def collect() -> list[str]:
+            return [item["event"] async for item in hub.subscribe(chat_id, "0-0")]
+
+        subscriber = asyncio.create_task(collect())
+        await asyncio.sleep(0.3)
+        await redis_client.publish(REDIS_KEY_CHAT_CANCEL.format(chat_id=chat_id), "1")
+
+        events = await asyncio.wait_for(subscriber, 5)
+        await hub.close()
+
+        assert attempts == 2
+        assert events == ["complete"]
+
+
+class TestCancellationHandler:
+    async def test_revocation_is_pushed_without_polling(
+        self,
+        redis_client: Redis[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        settings = get_settings()
+        monkeypatch.setattr(settings, "REVOCATION_FALLBACK_POLL_SECONDS", 30.0)
+        chat_id = str(uuid.uuid4())
+        handler = CancellationHandler(chat_id, redis_client)
+
+        waiter = asyncio.create_task(handler.wait_for_revocation())
+        await asyncio.sleep(0.1)
+        assert not waiter.done()
+
+        await redis_client.publish(REDIS_KEY_CHAT_CANCEL.format(chat_id=chat_id), "1")
+        await asyncio.wait_for(waiter, timeout=2)
+
+
+class TestContextUsageTracker:
+    async def test_reconcile_uses_run_window_and_never_recreates_stream(
+        self,
+        redis_client: Redis[str],
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        async def get_user_settings(*_: Any, **__: Any) -> None:
+            return None
+
+        async def save_context_usage(*_: Any) -> None:
+            return None
+
+        class AIService:
+            async def get_context_token_usage(self, **_: Any) -> int:
+                return 50_000
+
+        monkeypatch.setattr(UserService, "get_user_settings", get_user_settings)
+        monkeypatch.setattr(
+            context_usage_module, "save_context_usage", save_context_usage
+        )
+        chat_id = str(uuid.uuid4())
+        stream_key = REDIS_KEY_CHAT_STREAM.format(chat_id=chat_id)
+        tracker = ContextUsageTracker(
+            chat_id, "session", "sandbox", str(uuid.uuid4()), "model", 1_000_000
+        )
+        ai_service = AIService()
+
+        data = await tracker.fetch_and_broadcast(ai_service, redis_client, None)  # type: ignore[arg-type]
+        assert data is not None and data["percentage"] == 5.0
+        assert not await redis_client.exists(stream_key)
+
+        await redis_client.xadd(stream_key, {"kind": "complete"})
+        await tracker.fetch_and_broadcast(ai_service, redis_client, None)  # type: ignore[arg-type]
+        assert await redis_client.xlen(stream_key) == 2
+        assert await redis_client.ttl(stream_key) > 0
+
+
+def test_coalesce_stream_entries_keeps_non_content_frames() -> None:
+    entries = [
+        {"id": "1-0", "event": "content", "data": '{"a":1}'},
+        {"id": "2-0", "event": "content", "data": '{"a":2}'},
+        {"id": "3-0", "event": "queue_processing", "data": "{}"},
+        {"id": "4-0", "event": "content", "data": '{"a":3}'},
+    ]
+
+    frames = coalesce_stream_entries(entries, max_events=64)
+
+    assert [(frame["id"], frame["event"]) for frame in frames] == [
+        ("2-0", "content_batch"),
+        ("3-0", "queue_processing"),
+        ("4-0", "content"),
+    ]
+
+
+def test_compressed_stream_payload_round_trips(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    settings = get_settings()
+    monkeypatch.setattr(settings, "STREAM_PAYLOAD_COMPRESSION", True)
+    monkeypatch.setattr(settings, "STREAM_PAYLOAD_COMPRESSION_MIN_BYTES", 16)
+    payload = json.dumps({"event": {"type": "assistant_text", "text": "x" * 4096}})
+
+    fields = encode_stream_payload(payload)
+
+    assert fields["v"] == "2"
+    assert len(fields["payload"]) < len(payload)
+    assert decode_stream_payload(fields) == payload
+    assert decode_stream_payload({"payload": "{}"}) == "{}"
+
+
+def test_context_usage_is_accounted_from_stream_usage() -> None:
+    processor = StreamProcessor(ToolHandlerRegistry(), context_window=200_000)
+    usage = {
+        "input_tokens": 10,
+        "cache_creation_input_tokens": 1_000,
+        "cache_read_input_tokens": 9_000,
+        "output_tokens": 40,
+    }
+
+    def assistant(text: str, parent: str | None = None) -> AssistantMessage:
+        return AssistantMessage(
+            content=[TextBlock(text=text)],
+            model="sonnet",
+            parent_tool_use_id=parent,
+            usage=usage,
+        )
+
+    events = list(processor.emit_events_for_message(assistant("hi")))
+    assert events[-1] == {
+        "type": "system",
+        "data": {
+            "context_usage": {
+                "tokens_used": 10_050,
+                "context_window": 200_000,
+                "percentage": 5.025,
+            }
+        },
+    }
+
+    # Repeated usage of the same request and sub-agent usage publish nothing
+    assert [
+        event["type"] for event in processor.emit_events_for_message(assistant("more"))
+    ] == ["assistant_text"]
+    usage = {"input_tokens": 90_000}
+    assert [
+        event["type"]
+        for event in processor.emit_events_for_message(
+            assistant("sub", parent="tool-1")
+        )
+    ] == ["assistant_text"]
+
+    result = ResultMessage(
+        subtype="success",
+        duration_ms=1,
+        duration_api_ms=1,
+        is_error=False,
+        num_turns=1,
+        session_id="session",
+        model_usage={"sonnet": {"contextWindow": 1_000_000}},
+    )
+    events = list(processor.emit_events_for_message(result))
+    assert events[0]["data"]["context_usage"]["context_window"] == 1_000_000
+    assert processor.context_usage == {
+        "tokens_used": 10_050,
+        "context_window": 1_000_000,
+        "percentage": 1.005,
+    }
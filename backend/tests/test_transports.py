@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import subprocess
+import tarfile
+import threading
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from claude_agent_sdk import ClaudeAgentOptions
+from claude_agent_sdk._errors import CLIConnectionError, CLIJSONDecodeError
+
+from app.models.db_models import UserSettings
+from app.services.cli_sessions import launch_fingerprint
+from app.services.launch_profiles import (
+    LaunchProfile,
+    LaunchProfileCache,
+    launch_profile_key,
+)
+from app.services.sandbox_providers import docker_connections
+from app.services.sandbox_providers.docker_connections import DockerConnectionManager
+from app.services.sandbox_providers.docker_events import (
+    DockerEvents,
+    get_docker_events,
+)
+from app.services.transports import base as transport_base
+from app.services.transports.base import (
+    LAUNCH_FILES_MISSING_EXIT_CODE,
+    build_cli_command,
+    launch_files_tar,
+)
+from app.services.transports.buffer import StdoutBuffer
+from app.services.transports.docker import DOCKER_FRAME_HEADER, DockerStreamDemuxer
+from app.services.transports.framing import JsonLineFramer
+from app.services.transports.modal import ModalSandboxTransport
+from tests.fake_modal import FakeModalSandbox
+
+
+class TestJsonLineFramer:
+    def test_frames_split_across_arbitrary_chunks(self) -> None:
+        messages = [
+            {"type": "assistant", "text": "café " * 100},
+            {
+                "type": "user",
+                "content": [{"type": "tool_result", "content": "x" * 5000}],
+            },
+            {"type": "result", "subtype": "success"},
+        ]
+        raw = b"starting up\n\x1b[32m" + b"\n".join(
+            json.dumps(message, ensure_ascii=False).encode() for message in messages
+        )
+        framer = JsonLineFramer(max_buffer_size=1024 * 1024)
+
+        parsed: list[dict[str, object]] = []
+        # 7-byte chunks split UTF-8 sequences and the ANSI escape mid-way
+        for offset in range(0, len(raw), 7):
+            parsed.extend(framer.feed(raw[offset : offset + 7]))
+        parsed.extend(framer.finish())
+
+        assert parsed == messages
+
+    def test_concatenated_objects_and_oversized_lines(self) -> None:
+        framer = JsonLineFramer(max_buffer_size=64)
+
+        assert framer.feed('{"a":1}{"b":2}\n') == [{"a": 1}, {"b": 2}]
+        with pytest.raises(CLIJSONDecodeError):
+            framer.feed('{"big": "' + "y" * 100)
+
+
+class TestStdoutBuffer:
+    async def test_watermarks_pause_and_release_the_reader(self) -> None:
+        buffer = StdoutBuffer(
+            label="test",
+            high_watermark=10,
+            low_watermark=4,
+            hard_limit=100,
+            coalesce_limit=64,
+        )
+        await buffer.put(b"abc")
+        await buffer.put(b"def")
+        writer = asyncio.create_task(buffer.put(b"ghijk"))
+        await asyncio.sleep(0)
+        assert buffer.above_high_watermark and not writer.done()
+
+        # Queued chunks are coalesced, and stay on the budget until consumed
+        chunk = await buffer.get()
+        assert chunk == b"abcdefghijk"
+        await asyncio.sleep(0)
+        assert not writer.done()
+
+        buffer.consumed(len(chunk))
+        await asyncio.wait_for(writer, timeout=1)
+        assert buffer.size == 0 and not buffer.above_high_watermark
+
+        buffer.feed_nowait(b"tail")
+        buffer.close()
+        assert await buffer.get() == b"tail"
+        assert await buffer.get() is None
+
+    def test_feed_nowait_never_blocks_but_enforces_hard_limit(self) -> None:
+        buffer = StdoutBuffer(
+            label="test",
+            high_watermark=4,
+            low_watermark=2,
+            hard_limit=8,
+            coalesce_limit=64,
+        )
+        buffer.feed_nowait("12345")
+        assert buffer.above_high_watermark
+        with pytest.raises(CLIConnectionError):
+            buffer.feed_nowait("6789")
+
+
+class TestDockerStreamDemuxer:
+    def test_reassembles_frames_across_reads(self) -> None:
+        payloads = [(1, b"a" * 10), (2, b"warn"), (1, b"b" * 300_000), (1, b"")]
+        raw = b"".join(
+            DOCKER_FRAME_HEADER.pack(stream_type, len(payload)) + payload
+            for stream_type, payload in payloads
+        )
+        demuxer = DockerStreamDemuxer(max_frame_size=1024 * 1024)
+
+        frames: list[tuple[int, bytes]] = []
+        offset = 0
+        while offset < len(raw):
+            with demuxer.writable() as view:
+                size = min(len(view), 5_000, len(raw) - offset)
+                view[:size] = raw[offset : offset + size]
+            demuxer.commit(size, 5_000)
+            frames.extend(demuxer.frames())
+            offset += size
+
+        assert frames == payloads
+
+
+class TestDockerEvents:
+    async def test_exec_die_event_resolves_waiter(self) -> None:
+        events = DockerEvents(host=None)
+        events._thread = threading.current_thread()  # keep the stream offline
+        waiter = events.wait("exec-1")
+
+        events._dispatch({"Actor": {"Attributes": {"execID": "other"}}})
+        events._dispatch(
+            {"Actor": {"Attributes": {"execID": "exec-1", "exitCode": "137"}}}
+        )
+
+        assert await asyncio.wait_for(waiter, timeout=1) == 137
+        assert events._waiters == {}
+
+
+class TestDockerConnectionManager:
+    def test_container_handles_are_cached_until_invalidated(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(DockerEvents, "_start_consumer", lambda self: None)
+
+        class Container:
+            def __init__(self) -> None:
+                self.status = "exited"
+                self.starts = 0
+
+            def start(self) -> None:
+                self.starts += 1
+                self.status = "running"
+
+            def reload(self) -> None:
+                pass
+
+        lookups: list[str] = []
+        container = Container()
+
+        class Containers:
+            def get(self, name: str) -> Container:
+                lookups.append(name)
+                return container
+
+        class Client:
+            containers = Containers()
+
+        manager = DockerConnectionManager(host=None)
+        manager._client = Client()
+
+        assert manager.get_container("abc") is container
+        assert manager.get_container("abc") is container
+        assert lookups == ["claudex-sandbox-abc"]
+        assert container.starts == 1
+
+        manager.invalidate("abc")
+        manager.get_container("abc")
+        assert len(lookups) == 2
+        manager.close()
+
+    def test_container_events_drop_stopped_containers(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(DockerEvents, "_start_consumer", lambda self: None)
+        manager = DockerConnectionManager(host=None)
+        manager.cache_container("abc", "container-abc")
+        manager.cache_container("def", "container-def")
+        # The same subscription also serves the transports' exec waiters
+        events = manager._events
+        assert events is get_docker_events(None)
+
+        events.connected = True
+        monkeypatch.setattr(
+            docker_connections.settings, "DOCKER_CONTAINER_CACHE_TTL_SECONDS", 0.0
+        )
+        assert manager.cached_container("abc") == "container-abc"
+
+        events._dispatch(
+            {"Action": "exec_die", "Actor": {"Attributes": {"name": "other"}}}
+        )
+        events._dispatch(
+            {"Action": "die", "Actor": {"Attributes": {"name": "claudex-sandbox-abc"}}}
+        )
+        assert manager.cached_container("abc") is None
+        assert manager.cached_container("def") == "container-def"
+
+        # Without the stream only the short TTL applies
+        events.connected = False
+        assert manager.cached_container("def") is None
+        manager.close()
+        assert events._listeners == []
+
+
+class TestModalSandboxTransport:
+    async def test_streams_bytes_and_coalesces_stdin_drains(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setenv("MODAL_TOKEN_ID", "")
+        monkeypatch.setenv("MODAL_TOKEN_SECRET", "")
+        sandbox = FakeModalSandbox(chunk_size=7, rpc_delay=0.01)
+        transport = ModalSandboxTransport(
+            sandbox_id="sbx",
+            api_key="id:secret",
+            prompt="",
+            options=ClaudeAgentOptions(),
+            sandbox=sandbox,
+        )
+        transport.persistent = True
+        await transport.connect()
+        assert sandbox.execs[0][1]["text"] is False
+
+        # Writes made while a drain is in flight are flushed together by the next
+        await asyncio.gather(
+            *(
+                transport.write(
+                    json.dumps({"type": "user", "message": {"content": f"q{n}"}}) + "\n"
+                )
+                for n in range(5)
+            )
+        )
+        process = sandbox.processes[0]
+        assert process.stdin.drains == 2
+        assert len(process.received) == 5
+
+        texts: list[str] = []
+        async for message in transport.read_messages():
+            if message["type"] == "assistant":
+                texts.append(message["message"]["content"][0]["text"])
+            elif len(texts) == 5:
+                break
+        assert texts == [f"echo: q{n}" for n in range(5)]
+
+        await transport.end_input()
+        assert [message async for message in transport.read_messages()] == []
+        assert not transport.is_alive() and process.returncode == 0
+        await transport.close()
+
+
+class TestWarmCLISessions:
+    def test_fingerprint_ignores_rotating_chat_token(self) -> None:
+        def options(token: str, model: str = "sonnet") -> ClaudeAgentOptions:
+            return ClaudeAgentOptions(
+                model=model,
+                resume="session-1",
+                env={"ANTHROPIC_API_KEY": "key"},
+                mcp_servers={
+                    "permission": {
+                        "command": "python3",
+                        "env": {"PERMISSION_MODE": "auto", "CHAT_TOKEN": token},
+                    }
+                },
+            )
+
+        first = launch_fingerprint("docker", "sbx", options("a"))
+
+        assert launch_fingerprint("docker", "sbx", options("b")) == first
+        assert launch_fingerprint("docker", "sbx", options("a", "opus")) != first
+        assert launch_fingerprint("docker", "other", options("a")) != first
+
+
+class TestLaunchProfiles:
+    def test_profile_is_reused_until_settings_change(self) -> None:
+        user_settings = UserSettings(
+            sandbox_provider="docker",
+            custom_env_vars=[{"key": "FOO", "value": "1"}],
+        )
+        key = launch_profile_key(user_settings, model_id="sonnet")
+        options = ClaudeAgentOptions(
+            model="sonnet",
+            resume="stale",
+            system_prompt={"type": "preset", "preset": "claude_code", "append": "x"},
+            env={"FOO": "1"},
+        )
+        profile = LaunchProfile.build(key, "docker", "sbx", options)
+        cache = LaunchProfileCache()
+        cache.put("chat", profile)
+
+        assert cache.get("chat", key) is profile
+        assert "--resume" not in profile.command_line
+        assert profile.command_for("s 1").endswith("--resume 's 1'")
+        assert profile.options_for("s 1").resume == "s 1"
+        assert profile.env["FOO"] == "1"
+
+        user_settings.custom_env_vars = [{"key": "FOO", "value": "2"}]
+        changed = launch_profile_key(user_settings, model_id="sonnet")
+        assert changed != key
+        assert cache.get("chat", changed) is None
+        assert len(cache) == 0
+
+    def test_launch_files_replace_inline_blobs(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(transport_base, "LAUNCH_FILES_DIR", str(tmp_path))
+        cli = tmp_path / "cli"
+        cli.write_text('#!/bin/sh\nprintf "%s\\0" "$@"\n')
+        cli.chmod(0o755)
+        prompt = "Use 'quotes', $HOME and `ticks`\nacross lines"
+        options = ClaudeAgentOptions(
+            cli_path=str(cli),
+            system_prompt={"type": "preset", "preset": "claude_code", "append": prompt},
+            mcp_servers={"permission": {"command": "python3", "args": ["-u"]}},
+        )
+
+        files: dict[str, str] = {}
+        command = build_cli_command(options, files)
+
+        assert prompt not in command and "mcpServers" not in command
+        assert len(files) == 2
+        for path, content in files.items():
+            Path(path).write_text(content)
+        argv = (
+            subprocess.run(["bash", "-c", command], capture_output=True, check=True)
+            .stdout.decode()
+            .split("\0")
+        )
+        assert argv[argv.index("--append-system-prompt") + 1] == prompt
+        mcp_path = argv[argv.index("--mcp-config") + 1]
+        assert json.loads(files[mcp_path])["mcpServers"]["permission"]["args"] == ["-u"]
+
+        # A missing file fails the launch instead of passing an empty argument
+        Path(mcp_path).unlink()
+        result = subprocess.run(["bash", "-c", command], capture_output=True)
+        assert result.returncode == LAUNCH_FILES_MISSING_EXIT_CODE
+        assert result.stdout == b""
+
+        # The archive creates the launch directory and files for the sandbox user
+        with tarfile.open(fileobj=BytesIO(launch_files_tar(files))) as tar:
+            members = {member.name: member for member in tar.getmembers()}
+        assert members[mcp_path.lstrip("/")].uid == 1000
+        assert members[mcp_path.lstrip("/")].mode == 0o600